@@ -0,0 +1,168 @@
+"""
+Album art for the canvas: embedded pictures pulled out of the audio files while they are
+scanned, shrunk to fixed-size thumbnails, and packed into a few sprite-atlas sheets.
+
+  * The scan (scan_library.extract_metadata) takes the picture from the tags it already
+    parsed and records its SHA-1 as the track's "artwork". The thumbnail is made once per
+    distinct picture – an album's tracks share one – and kept under that hash in a
+    content-addressed cache (data/cache/artwork/<size>/ab/abcdef….jpg), so rescans and
+    other libraries reuse it.
+  * prepare_metadata packs the thumbnails of the prepared tracks into sheets of
+    ATLAS_SIZE × ATLAS_SIZE pixels and writes atlas.json next to the prepared output:
+    {"version", "thumb", "sheets": [file names], "uv": {hash: [sheet, u0, v0, u1, v1]}}.
+    Thumbnails go in the order tracks first use them, so an island's covers share sheets.
+
+Pillow is optional: without it scans record no artwork and no atlases are written.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+from mutagen.id3 import ID3Tags
+from mutagen.mp4 import MP4Tags
+
+from instrument import metrics
+
+try:
+    from PIL import Image
+except ImportError:          # optional: only needed for album art
+    Image = None
+
+DEFAULT_ARTWORK_DIR = Path(__file__).parent.parent / "data" / "cache" / "artwork"
+THUMB_SIZE = 64
+ATLAS_SIZE = 2048            # 32 × 32 thumbnails per sheet at THUMB_SIZE 64
+ATLAS_VERSION = 1
+FRONT_COVER = 3              # ID3 / FLAC picture type
+
+_known = set()               # thumbnails known to exist, as (cache dir, hash)
+_known_lock = threading.Lock()
+
+def artwork_available() -> bool:
+    """Whether Pillow is installed, so thumbnails and atlases can be made."""
+    return Image is not None
+
+def _front_first(pictures):
+    """The data of the front cover among (type, data) pairs, else of the first picture."""
+    pictures = list(pictures)
+    for kind, data in pictures:
+        if kind == FRONT_COVER:
+            return data
+    return pictures[0][1] if pictures else None
+
+def embedded_picture(audio) -> bytes:
+    """
+    The embedded cover of a parsed mutagen file (front cover preferred), as encoded image
+    bytes, or None: ID3 APIC frames (MP3, AIFF, WAV), FLAC picture blocks, MP4 covr atoms,
+    and base64 METADATA_BLOCK_PICTURE comments (Ogg).
+    """
+    tags = getattr(audio, "tags", None)
+    if isinstance(tags, ID3Tags):
+        return _front_first((frame.type, frame.data) for frame in tags.getall("APIC"))
+    if isinstance(tags, MP4Tags):
+        covers = tags.get("covr")
+        return bytes(covers[0]) if covers else None
+    if getattr(audio, "pictures", None):
+        return _front_first((picture.type, picture.data) for picture in audio.pictures)
+    if tags is not None and tags.get("metadata_block_picture"):
+        from mutagen.flac import Picture
+
+        pictures = []
+        for value in tags["metadata_block_picture"]:
+            try:
+                picture = Picture(base64.b64decode(value))
+            except Exception:
+                continue
+            pictures.append((picture.type, picture.data))
+        return _front_first(pictures)
+    return None
+
+def thumbnail_path(cache_dir: Path, key: str, size: int = THUMB_SIZE) -> Path:
+    return Path(cache_dir) / str(size) / key[:2] / f"{key}.jpg"
+
+def make_thumbnail(data: bytes, size: int = THUMB_SIZE) -> bytes:
+    """`data` (any image Pillow reads) centre-cropped to a square, scaled to `size` px, as JPEG."""
+    image = Image.open(io.BytesIO(data))
+    # JPEG covers decode at 1/2 … 1/8 scale straight away when that is still big enough
+    image.draft("RGB", (size, size))
+    image = image.convert("RGB")
+    side = min(image.size)
+    left, top = (image.width - side) // 2, (image.height - side) // 2
+    image = image.resize((size, size), Image.LANCZOS, box=(left, top, left + side, top + side))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+def store_artwork(data: bytes, cache_dir: Path, size: int = THUMB_SIZE) -> str:
+    """
+    Record an embedded picture: return its SHA-1 and make sure the thumbnail cache holds
+    its thumbnail. Only the first track with a given picture pays for decoding it. Returns
+    None if Pillow is missing or cannot read the picture.
+    """
+    if Image is None or not data:
+        return None
+    key = hashlib.sha1(data).hexdigest()
+    metrics.count("scan", "artwork")
+    with _known_lock:
+        if (str(cache_dir), key) in _known:
+            return key
+    path = thumbnail_path(cache_dir, key, size)
+    if not path.exists():
+        try:
+            thumb = make_thumbnail(data, size)
+        except Exception:
+            metrics.count("scan", "artwork_errors")
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Another worker may be writing the same picture: write aside, then rename over
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(thumb)
+        os.replace(tmp_path, path)
+        metrics.count("scan", "thumbnails")
+    with _known_lock:
+        _known.add((str(cache_dir), key))
+    return key
+
+def build_atlases(keys, cache_dir: Path, atlas_path: Path, size: int = THUMB_SIZE,
+                  sheet_size: int = ATLAS_SIZE) -> dict:
+    """
+    Pack the cached thumbnails of `keys` (artwork hashes, in order of first use, repeats
+    ignored) into JPEG sheets named atlas_0.jpg, atlas_1.jpg … next to `atlas_path`, and
+    write the atlas manifest (see the module docstring) to `atlas_path`. The last sheet is
+    only as tall as it needs to be. Hashes without a cached thumbnail are left out.
+
+    Returns:
+        dict: the manifest.
+    """
+    if Image is None:
+        raise RuntimeError("album art atlases need Pillow (pip install pillow)")
+    atlas_path = Path(atlas_path)
+    per_row = sheet_size // size
+    per_sheet = per_row * per_row
+
+    keys = [key for key in dict.fromkeys(keys) if key and thumbnail_path(cache_dir, key, size).exists()]
+    manifest = {"version": ATLAS_VERSION, "thumb": size, "sheets": [], "uv": {}}
+    atlas_path.parent.mkdir(parents=True, exist_ok=True)
+    for first in range(0, len(keys), per_sheet):
+        batch = keys[first:first + per_sheet]
+        sheet_index = len(manifest["sheets"])
+        height = -(-len(batch) // per_row) * size
+        sheet = Image.new("RGB", (sheet_size, height))
+        for i, key in enumerate(batch):
+            x, y = (i % per_row) * size, (i // per_row) * size
+            with Image.open(thumbnail_path(cache_dir, key, size)) as thumb:
+                sheet.paste(thumb, (x, y))
+            manifest["uv"][key] = [sheet_index, round(x / sheet_size, 6), round(y / height, 6),
+                                   round((x + size) / sheet_size, 6), round((y + size) / height, 6)]
+        name = f"atlas_{sheet_index}.jpg"
+        sheet.save(atlas_path.with_name(name), "JPEG", quality=85)
+        manifest["sheets"].append(name)
+
+    with atlas_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    metrics.count("atlas", "thumbnails", len(keys))
+    metrics.count("atlas", "sheets", len(manifest["sheets"]))
+    return manifest
@@ -0,0 +1,117 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+CHUNK_MANIFEST = "manifest.json"
+CHUNK_FORMAT_VERSION = 1
+MAX_CHUNK_TRACKS = 2000
+MAX_DEPTH = 16
+
+def _split(xs, ys, idx, region, key, max_tracks, max_depth, leaves):
+    """Recursively split `idx` (track numbers inside `region`) into quadrants until each leaf is small enough."""
+    if len(idx) <= max_tracks or len(key) >= max_depth:
+        if len(idx):
+            leaves.append((key, region, idx))
+        return
+    x0, y0, x1, y1 = region
+    mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+    quadrant = (xs[idx] >= mx).astype(np.int8) + 2 * (ys[idx] >= my).astype(np.int8)
+    # 0 = top-left, 1 = top-right, 2 = bottom-left, 3 = bottom-right (canvas y grows downwards)
+    quads = [(x0, y0, mx, my), (mx, y0, x1, my), (x0, my, mx, y1), (mx, my, x1, y1)]
+    for q, sub in enumerate(quads):
+        _split(xs, ys, idx[quadrant == q], sub, key + str(q), max_tracks, max_depth, leaves)
+
+def quadtree_chunks(tracks: List[dict], max_tracks: int = MAX_CHUNK_TRACKS, max_depth: int = MAX_DEPTH):
+    """
+    Partition tracks by their (x, y) into the leaves of a region quadtree.
+
+    Returns (root_region, leaves) where each leaf is (key, region, track_numbers). Keys are
+    quadrant digits from the root ("" for the root itself, "03" = top-left → bottom-right),
+    regions are (x0, y0, x1, y1) squares, and track numbers keep their input order.
+    """
+    xs = np.array([t["x"] for t in tracks], dtype=float)
+    ys = np.array([t["y"] for t in tracks], dtype=float)
+    if not tracks:
+        return (0.0, 0.0, 0.0, 0.0), []
+    x0, y0 = float(xs.min()), float(ys.min())
+    side = max(float(xs.max()) - x0, float(ys.max()) - y0) or 1.0
+    root = (x0, y0, x0 + side * (1 + 1e-9), y0 + side * (1 + 1e-9))  # max edge lands inside
+    leaves = []
+    _split(xs, ys, np.arange(len(tracks)), root, "", max_tracks, max_depth, leaves)
+    return root, leaves
+
+def write_chunked_output(tracks: List[dict], out_dir: Path, tile_size: float,
+                         max_tracks: int = MAX_CHUNK_TRACKS, max_depth: int = MAX_DEPTH) -> dict:
+    """
+    Write prepared tracks as quadtree chunk files plus a manifest, for viewport-based loading.
+
+    `out_dir/manifest.json` lists every chunk with its file name, quadtree key, `region`
+    (the quadtree square), `bounds` (tight box around its tiles, including `tile_size`),
+    track count and byte size, so a client only fetches chunks whose bounds meet the
+    viewport. Chunk files (`chunk_<key>.json`) hold plain lists of prepared tracks. Chunk
+    files left over from a previous run are removed.
+
+    Returns the manifest.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    root, leaves = quadtree_chunks(tracks, max_tracks, max_depth)
+
+    chunks = []
+    for key, region, idx in leaves:
+        members = [tracks[i] for i in idx]
+        body = json.dumps(members, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"chunk_{key or 'root'}.json"
+        (out_dir / name).write_bytes(body)
+        chunks.append({
+            "key": key,
+            "file": name,
+            "region": list(region),
+            "bounds": [
+                min(t["x"] for t in members), min(t["y"] for t in members),
+                max(t["x"] for t in members) + tile_size, max(t["y"] for t in members) + tile_size,
+            ],
+            "count": len(members),
+            "bytes": len(body),
+        })
+
+    written = {c["file"] for c in chunks}
+    for stale in out_dir.glob("chunk_*.json"):
+        if stale.name not in written:
+            stale.unlink()
+
+    manifest = {
+        "version": CHUNK_FORMAT_VERSION,
+        "tileSize": tile_size,
+        "count": len(tracks),
+        "region": list(root),
+        "chunks": chunks,
+    }
+    tmp = out_dir / (CHUNK_MANIFEST + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir / CHUNK_MANIFEST)
+    return manifest
+
+def load_chunked_output(out_dir: Path, viewport=None) -> List[dict]:
+    """
+    Read tracks back from a chunked output, optionally only the chunks whose bounds
+    intersect `viewport` (x0, y0, x1, y1). Mainly for tests and tooling; the frontend
+    does the same over HTTP.
+    """
+    out_dir = Path(out_dir)
+    with (out_dir / CHUNK_MANIFEST).open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    tracks = []
+    for chunk in manifest["chunks"]:
+        if viewport is not None:
+            bx0, by0, bx1, by1 = chunk["bounds"]
+            vx0, vy0, vx1, vy1 = viewport
+            if bx1 < vx0 or bx0 > vx1 or by1 < vy0 or by0 > vy1:
+                continue
+        with (out_dir / chunk["file"]).open("r", encoding="utf-8") as f:
+            tracks.extend(json.load(f))
+    return tracks
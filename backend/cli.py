@@ -0,0 +1,243 @@
+"""
+Music-viewer command line: one entry point for the whole pipeline.
+
+    python backend/cli.py scan ~/Music --workers 8
+    python backend/cli.py import-rekordbox export.xml --playlist 5star
+    python backend/cli.py merge data/json/scan.json data/json/rekordbox.json
+    python backend/cli.py prepare --columnar --lod
+    python backend/cli.py check-layout
+    python backend/cli.py serve --port 8765
+
+Only the standard library is imported up front. Each subcommand imports the modules it
+runs (mutagen, numpy, requests, plotly …) when it is invoked, and config.json is read on
+first use, so `--help` and usage errors return immediately.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_LIBRARY = BASE_DIR / "data" / "json" / "output.json"
+DEFAULT_PREPARED = BASE_DIR / "frontend" / "public" / "prepared.json"
+DEFAULT_INDEX_CACHE = BASE_DIR / "data" / "cache"
+DEFAULT_REPORT_DIR = BASE_DIR / "data" / "reports"
+DEFAULT_TRACK_DB = BASE_DIR / "data" / "cache" / "tracks.sqlite"
+DEFAULT_ARTWORK_CACHE = BASE_DIR / "data" / "cache" / "artwork"
+
+
+def _instrumented(args, run):
+    """Run `run()` with the --profile / --trace-memory stage set up, then write the --report."""
+    from instrument import metrics
+
+    if args.profile or args.trace_memory:
+        metrics.configure(args.profile, args.trace_memory, args.report.parent if args.report else DEFAULT_REPORT_DIR)
+    run()
+    if args.report:
+        metrics.write_report(args.report)
+
+
+def cmd_scan(args):
+    from scan_library import scan_library
+
+    _instrumented(args, lambda: scan_library(
+        music_dir=args.music_dir,
+        output_path=args.output,
+        manifest_path=args.manifest,
+        workers=args.workers,
+        executor=args.executor,
+        artwork_dir=args.artwork_cache if args.artwork else None,
+    ))
+
+
+def cmd_import_rekordbox(args):
+    from scan_library import ALL_PLAYLISTS, scan_library
+
+    if args.all_playlists:
+        playlist_name = ALL_PLAYLISTS
+    elif args.playlist and len(args.playlist) == 1:
+        playlist_name = args.playlist[0]
+    else:
+        playlist_name = args.playlist
+
+    _instrumented(args, lambda: scan_library(
+        output_path=args.output,
+        rekordbox_xml_path=args.xml,
+        playlist_name=playlist_name,
+        index_cache_dir=args.index_cache,
+    ))
+
+
+def cmd_merge(args):
+    from merge import merge_libraries
+
+    _instrumented(args, lambda: merge_libraries(args.inputs, args.output, args.merge_report))
+
+
+def cmd_prepare(args):
+    import prepare_metadata
+    from youtube import DEFAULT_CACHE_PATH
+
+    youtube_cache = None if args.no_youtube_cache else args.youtube_cache or DEFAULT_CACHE_PATH
+
+    if args.stream:
+        input_ndjson = args.input if args.input.suffix == ".ndjson" else args.input.with_suffix(".ndjson")
+        output_ndjson = args.output.with_suffix(".ndjson")
+        _instrumented(args, lambda: prepare_metadata.prepare_stream(
+            input_ndjson, output_ndjson, youtube_cache, args.concurrency, args.rate,
+            resolve_previews=not args.no_previews,
+            island_layout=args.layout,
+            playlists_dir=args.playlists,
+            layout_report=args.report is not None,
+        ))
+        print(f"✅ Metadata prepared and streamed to {output_ndjson}")
+        return
+
+    chunk_dir = args.output.parent / "chunks" if args.chunked else None
+    _instrumented(args, lambda: prepare_metadata.main(
+        args.input, args.output, youtube_cache, args.concurrency, args.rate,
+        chunk_dir=chunk_dir,
+        columnar_path=args.output.with_suffix(".bin") if args.columnar else None,
+        lod_path=args.output.with_name("lod.json") if args.lod else None,
+        layout_path=prepare_metadata.DEFAULT_LAYOUT_PATH if args.incremental else None,
+        repack=args.repack,
+        neighbours_path=args.output.with_name("neighbours.bin") if args.neighbours else None,
+        neighbours_k=args.neighbours_k,
+        search_path=args.output.with_name("search.bin") if args.search else None,
+        island_layout=args.layout,
+        playlists_dir=args.playlists,
+        atlas_path=args.output.with_name("atlas.json") if args.artwork else None,
+        artwork_dir=args.artwork_cache,
+        layout_report=args.report is not None,
+    ))
+    print(f"✅ Metadata prepared and saved to {chunk_dir or args.output}")
+
+
+def cmd_check_layout(args):
+    from plot import check_layout
+
+    check_layout(args.prepared)
+
+
+def cmd_serve(args):
+    from server import serve
+
+    serve(args.prepared, args.db, args.host, args.port, args.cache_entries, args.verbose)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    def instrumented(stages):
+        options = argparse.ArgumentParser(add_help=False)
+        group = options.add_argument_group("instrumentation")
+        group.add_argument("--report", type=Path,
+                           help="write a JSON report of stage timings, counters and the slowest items here")
+        group.add_argument("--profile", metavar="STAGE", choices=stages,
+                           help=f"run cProfile over one stage ({', '.join(stages)})")
+        group.add_argument("--trace-memory", metavar="STAGE", choices=stages,
+                           help="trace one stage's allocations with tracemalloc")
+        return options
+
+    scan = commands.add_parser("scan", help="read the tags of a folder of audio files",
+                               parents=[instrumented(["scan", "write"])])
+    scan.add_argument("music_dir", type=Path, help="folder of audio files to scan")
+    scan.add_argument("--output", type=Path, default=DEFAULT_LIBRARY,
+                      help="output JSON file; a .ndjson file is written as a stream, one track per line")
+    scan.add_argument("--manifest", type=Path, help="scan manifest for incremental rescans")
+    scan.add_argument("--artwork", action="store_true",
+                      help="also cache a thumbnail of each distinct embedded cover (needs Pillow)")
+    scan.add_argument("--artwork-cache", type=Path, default=DEFAULT_ARTWORK_CACHE,
+                      help="content-addressed thumbnail cache, kept across rescans")
+    scan.add_argument("--workers", type=int, default=1, help="number of parallel tag readers")
+    scan.add_argument("--executor", choices=["thread", "process"], default="thread",
+                      help="thread for network/USB drives, process for CPU-bound local scans")
+    scan.set_defaults(run=cmd_scan)
+
+    rekordbox = commands.add_parser("import-rekordbox", help="import tracks or playlists from a Rekordbox XML export",
+                                    parents=[instrumented(["rekordbox", "write"])])
+    rekordbox.add_argument("xml", type=Path, help="Rekordbox XML export")
+    rekordbox.add_argument("--playlist", nargs="+",
+                           help="playlist(s) to import; with several, --output is a directory")
+    rekordbox.add_argument("--all-playlists", action="store_true",
+                           help="write every playlist to the --output directory")
+    rekordbox.add_argument("--index-cache", type=Path, default=DEFAULT_INDEX_CACHE,
+                           help="where to cache the playlist index")
+    rekordbox.add_argument("--output", type=Path, default=DEFAULT_LIBRARY,
+                           help="output JSON file; a .ndjson file is written as a stream, one track per line")
+    rekordbox.set_defaults(run=cmd_import_rekordbox)
+
+    merge = commands.add_parser("merge", help="merge folder scans and Rekordbox imports into one library",
+                                parents=[instrumented(["load", "merge", "write"])])
+    merge.add_argument("inputs", type=Path, nargs="+",
+                       help="scanned libraries (JSON or NDJSON); earlier ones win when fields differ")
+    merge.add_argument("--output", type=Path, default=DEFAULT_LIBRARY,
+                       help="merged library; a .ndjson file is written one track per line")
+    merge.add_argument("--merge-report", type=Path,
+                       help="write the unmatched and duplicate tracks of each source here (JSON)")
+    merge.set_defaults(run=cmd_merge)
+
+    prepare = commands.add_parser(
+        "prepare", help="lay out the library and write the frontend's track files",
+        parents=[instrumented(["load", "genres", "layout", "youtube", "tracks", "write", "lod", "columnar", "neighbours", "search", "atlas"])],
+    )
+    prepare.add_argument("--input", type=Path, default=DEFAULT_LIBRARY, help="scanned library (JSON)")
+    prepare.add_argument("--output", type=Path, default=DEFAULT_PREPARED, help="prepared track list (JSON)")
+    prepare.add_argument("--chunked", action="store_true",
+                         help="write quadtree chunks and a manifest to a chunks/ folder next to --output")
+    prepare.add_argument("--columnar", action="store_true", help="also write the compact columnar encoding (.bin)")
+    prepare.add_argument("--lod", action="store_true", help="also write level-of-detail island summaries (lod.json)")
+    prepare.add_argument("--neighbours", action="store_true",
+                         help="also write each track's nearest tracks on the canvas (neighbours.bin) for auto-play")
+    prepare.add_argument("--neighbours-k", type=int, default=8, help="neighbours kept per track")
+    prepare.add_argument("--search", action="store_true",
+                         help="also write an artist/title/album search index (search.bin)")
+    prepare.add_argument("--artwork", action="store_true",
+                         help="also pack the scanned album art into sprite sheets (atlas.json, atlas_N.jpg)")
+    prepare.add_argument("--artwork-cache", type=Path, default=DEFAULT_ARTWORK_CACHE,
+                         help="thumbnail cache written by scan --artwork")
+    prepare.add_argument("--layout", choices=["packed", "similarity"],
+                         help="island placement: packed around the centre, or similar genres together "
+                              "(default: islandLayout in config.json, else packed)")
+    prepare.add_argument("--playlists", type=Path,
+                         help="with --layout similarity, a folder of playlists (import-rekordbox --all-playlists) "
+                              "whose shared genres count as similar")
+    prepare.add_argument("--incremental", action="store_true",
+                         help="keep islands and tiles where the previous run put them")
+    prepare.add_argument("--repack", action="store_true", help="with --incremental, re-pack everything once")
+    prepare.add_argument("--stream", action="store_true",
+                         help="NDJSON in, NDJSON out, in constant memory (the .ndjson siblings of --input/--output)")
+    prepare.add_argument("--no-previews", action="store_true", help="with --stream, skip YouTube lookups")
+    prepare.add_argument("--youtube-cache", type=Path, help="YouTube lookup cache (default data/cache/youtube.sqlite)")
+    prepare.add_argument("--no-youtube-cache", action="store_true", help="always ask YouTube")
+    prepare.add_argument("--concurrency", type=int, default=8, help="simultaneous YouTube lookups")
+    prepare.add_argument("--rate", type=float, default=5.0, help="YouTube requests per second")
+    prepare.set_defaults(run=cmd_prepare)
+
+    check = commands.add_parser("check-layout", help="plot the prepared tiles to eyeball the layout")
+    check.add_argument("--prepared", type=Path, default=DEFAULT_PREPARED, help="prepared track list (JSON)")
+    check.set_defaults(run=cmd_check_layout)
+
+    serve = commands.add_parser("serve", help="serve the prepared tracks over HTTP with viewport queries")
+    serve.add_argument("--prepared", type=Path, default=DEFAULT_PREPARED,
+                       help="prepared track list (JSON) or chunked output folder")
+    serve.add_argument("--db", type=Path, default=DEFAULT_TRACK_DB,
+                       help="SQLite database to build from --prepared (rebuilt when it changes)")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (0 for any free port)")
+    serve.add_argument("--cache-entries", type=int, default=256, help="viewport responses kept in memory")
+    serve.add_argument("--verbose", action="store_true", help="log every request")
+    serve.set_defaults(run=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,166 @@
+import gzip
+import json
+import re
+import struct
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:          # optional: only needed for the .br variant
+    brotli = None
+
+MAGIC = b"MVCOL\x00\x00\x01"
+COLUMNAR_VERSION = 1
+# Low-cardinality fields stored once in a dictionary, per track as a small integer code
+DICT_FIELDS = ["genre", "colour", "decade", "album"]
+# Optional dictionary fields, stored only when some track has them and left out of the
+# tracks that do not (older files have none)
+OPTIONAL_DICT_FIELDS = ["artwork"]
+# Everything else that is kept per track, as plain JSON lists
+STRING_FIELDS = ["title", "artist", "date", "tracknumber", "path"]
+YOUTUBE_PREFIX = "https://www.youtube.com/watch?v="
+_MD5_HEX = re.compile(r"[0-9a-f]{32}")
+
+def buy_url(track: dict) -> str:
+    """The Bandcamp search link prepare_metadata builds from artist and title."""
+    return f"https://bandcamp.com/search?q={track.get('artist', '')}+{track.get('title', '')}".replace(" ", "+")
+
+def _dictionary(values):
+    """(distinct values in order of first use, code per value)."""
+    lookup = {}
+    codes = [lookup.setdefault(v, len(lookup)) for v in values]
+    dtype = np.uint8 if len(lookup) <= 0x100 else np.uint16 if len(lookup) <= 0x10000 else np.uint32
+    return list(lookup), np.array(codes, dtype=dtype)
+
+def encode_columnar(tracks: List[dict]) -> bytes:
+    """
+    Encode prepared tracks in the compact columnar format.
+
+    Layout: MAGIC, uint32 header length, JSON header, zero padding to 8 bytes, then the
+    binary arrays the header points at (offsets are relative to the start of that section):
+
+      * DICT_FIELDS    – dictionary in the header, uint8/16/32 code array per track
+                         (also OPTIONAL_DICT_FIELDS, when any track has them)
+      * x, y           – one float32 array, x0 y0 x1 y1 …
+      * id             – 16 raw bytes per track when every id is an md5 hex digest
+      * preview_url    – YouTube video ids in the header
+      * buy_url        – left out, rebuilt from artist and title by the decoder
+
+    Values that do not fit a shortcut (a non-YouTube preview link, a hand-edited buy
+    link) are kept verbatim under "overrides", so decoding is lossless apart from the
+    float32 coordinates, which the decoder rounds back to 2 decimals as written by
+    prepare_metadata (exact for |x|, |y| < 65536).
+    """
+    n = len(tracks)
+    header = {"version": COLUMNAR_VERSION, "count": n, "dicts": {}, "strings": {}, "arrays": {}, "overrides": {}}
+    blobs = []
+
+    def add_array(name, arr):
+        size = sum(len(b) for b in blobs)
+        blobs.append(b"\x00" * (-size % 8))      # keep every array 8-byte aligned
+        header["arrays"][name] = {"dtype": arr.dtype.str, "offset": size + len(blobs[-1]), "length": int(arr.size)}
+        blobs.append(arr.tobytes())
+
+    for field in DICT_FIELDS:
+        values, codes = _dictionary(t.get(field) for t in tracks)
+        header["dicts"][field] = values
+        add_array(field, codes)
+    for field in OPTIONAL_DICT_FIELDS:
+        if any(field in t for t in tracks):
+            values, codes = _dictionary(t.get(field) for t in tracks)
+            header["dicts"][field] = values
+            add_array(field, codes)
+    for field in STRING_FIELDS:
+        header["strings"][field] = [t.get(field) for t in tracks]
+
+    add_array("xy", np.array([(t["x"], t["y"]) for t in tracks], dtype="<f4").reshape(-1))
+
+    ids = [t.get("id") for t in tracks]
+    if all(isinstance(i, str) and _MD5_HEX.fullmatch(i) for i in ids):
+        add_array("id", np.frombuffer(b"".join(bytes.fromhex(i) for i in ids), dtype=np.uint8))
+    else:
+        header["strings"]["id"] = ids
+
+    previews, preview_overrides = [], {}
+    for i, t in enumerate(tracks):
+        url = t.get("preview_url")
+        if url is None or url.startswith(YOUTUBE_PREFIX):
+            previews.append(url and url[len(YOUTUBE_PREFIX):])
+        else:
+            previews.append(None)
+            preview_overrides[i] = url
+    header["strings"]["youtube"] = previews
+    header["overrides"]["preview_url"] = preview_overrides
+    header["overrides"]["buy_url"] = {i: t.get("buy_url") for i, t in enumerate(tracks)
+                                      if t.get("buy_url") != buy_url(t)}
+
+    head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    pad = -(len(MAGIC) + 4 + len(head)) % 8
+    return b"".join([MAGIC, struct.pack("<I", len(head)), head, b"\x00" * pad] + blobs)
+
+def decode_columnar(data: bytes) -> List[dict]:
+    """Decode encode_columnar() output (uncompressed) back into prepared track dicts."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a columnar track file")
+    (head_len,) = struct.unpack_from("<I", data, len(MAGIC))
+    start = len(MAGIC) + 4
+    header = json.loads(data[start:start + head_len].decode("utf-8"))
+    if header["version"] != COLUMNAR_VERSION:
+        raise ValueError(f"unsupported columnar version {header['version']}")
+    body = start + head_len + (-(start + head_len) % 8)
+
+    def array(name):
+        spec = header["arrays"][name]
+        return np.frombuffer(data, dtype=spec["dtype"], count=spec["length"], offset=body + spec["offset"])
+
+    n = header["count"]
+    strings = header["strings"]
+    dict_columns = {f: [header["dicts"][f][c] for c in array(f).tolist()] for f in DICT_FIELDS}
+    xy = [round(v, 2) for v in array("xy").tolist()]
+    if "id" in strings:
+        ids = strings["id"]
+    else:
+        digests = array("id").tobytes().hex()
+        ids = [digests[32 * i:32 * i + 32] for i in range(n)]
+    previews = [video and YOUTUBE_PREFIX + video for video in strings["youtube"]]
+    for i, url in header["overrides"]["preview_url"].items():
+        previews[int(i)] = url
+
+    # buy_url() inlined: this comprehension is the whole decode cost
+    tracks = [
+        {"id": id_, "title": title, "artist": artist, "album": album, "genre": genre, "decade": decade,
+         "date": date, "tracknumber": tracknumber, "path": path, "x": x, "y": y, "colour": colour,
+         "preview_url": preview,
+         "buy_url": f"https://bandcamp.com/search?q={artist}+{title}".replace(" ", "+")}
+        for id_, title, artist, album, genre, decade, date, tracknumber, path, x, y, colour, preview in zip(
+            ids, strings["title"], strings["artist"], dict_columns["album"], dict_columns["genre"],
+            dict_columns["decade"], strings["date"], strings["tracknumber"], strings["path"],
+            xy[0::2], xy[1::2], dict_columns["colour"], previews)
+    ]
+    for i, url in header["overrides"]["buy_url"].items():
+        tracks[int(i)]["buy_url"] = url
+    for field in OPTIONAL_DICT_FIELDS:
+        if field in header["dicts"]:
+            values = header["dicts"][field]
+            for track, code in zip(tracks, array(field).tolist()):
+                if values[code] is not None:
+                    track[field] = values[code]
+    return tracks
+
+def write_columnar_output(tracks: List[dict], path: Path) -> dict:
+    """
+    Write `path` (e.g. prepared.bin) plus precompressed `path.gz` and, when the brotli
+    package is installed, `path.br` for static hosting. Returns {file name: byte size}.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = encode_columnar(tracks)
+    variants = {path: data, path.with_name(path.name + ".gz"): gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants[path.with_name(path.name + ".br")] = brotli.compress(data, quality=11)
+    for target, payload in variants.items():
+        target.write_bytes(payload)
+    return {target.name: len(payload) for target, payload in variants.items()}
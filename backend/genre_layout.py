@@ -0,0 +1,408 @@
+"""
+Genre-proximity island layout: similar genres are placed next to each other.
+
+  1. genre_similarity() builds a weighted graph over the island genres from tracks
+     tagged with several genres and, optionally, from genres sharing a playlist.
+  2. force_layout() places the island centres with a force simulation: every island
+     repels every other (Barnes-Hut, O(n log n) per step), similar genres attract, and
+     gravity keeps the layout round.
+  3. remove_overlaps() pushes overlapping islands apart, then moves any island still
+     overlapping outward along its ray from the centre until it is clear.
+
+similarity_layout() runs the three, layout_quality() scores the result.
+"""
+import json
+import math
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from genres import GenreRegistry, split_genres
+from neighbours import knn_grid
+from spatial_grid import SpatialGrid
+
+THETA = 1.0             # Barnes-Hut opening angle: cells smaller than THETA × distance are one body
+ITERATIONS = 200
+DENSITY = 0.6           # island area / layout area the simulation aims for
+MAX_DEPTH = 16          # quadtree depth (Morton codes of 2 × 16 bits)
+OVERLAP_ITERATIONS = 30     # push rounds before the remaining overlaps are settled one by one
+
+# SIMILARITY GRAPH
+
+def _pairs_within(offsets: np.ndarray, ids: np.ndarray):
+    """(a, b, weight) for every two ids within a segment of the CSR arrays, weighted 1 / (segment length - 1)."""
+    lengths = np.diff(offsets)
+    ends = np.repeat(offsets[1:], lengths)
+    weights = np.repeat(1.0 / np.maximum(lengths - 1, 1), lengths)
+    pos = np.arange(len(ids))
+    a, b, w = [], [], []
+    for step in range(1, int(lengths.max(initial=1))):
+        valid = pos + step < ends
+        a.append(ids[pos[valid]])
+        b.append(ids[pos[valid] + step])
+        w.append(weights[valid])
+    if not a:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    return np.concatenate(a), np.concatenate(b), np.concatenate(w)
+
+def genre_similarity(
+    registry: GenreRegistry,
+    genres: List[str],
+    playlists: Iterable[List[dict]] = None,
+    playlist_weight: float = 1.0,
+):
+    """
+    Similarity graph over `genres` (island genres, by name) from the tracks recorded in
+    `registry` and, optionally, `playlists` (lists of track dicts, e.g. the per-playlist
+    files of `cli.py import-rekordbox --all-playlists`).
+
+    Every track tagged with several genres links each two of them, and every playlist links
+    each two genres it contains (times `playlist_weight`), both weighted 1 / (genres - 1)
+    so one long tag or a mixed playlist does not dominate. Totals are divided by
+    sqrt(tracks of one genre × tracks of the other), so two small genres that always
+    appear together are as similar as two big ones, and scaled to a maximum of 1.
+
+    Returns (i, j, weight): arrays of index pairs i < j into `genres` and their similarity.
+    """
+    node = np.full(len(registry), -1, dtype=np.int64)
+    for k, genre in enumerate(genres):
+        gid = registry.lookup(genre)
+        if gid is not None:
+            node[gid] = k
+
+    offsets, ids = registry.membership()
+    a, b, w = _pairs_within(offsets, ids)
+    if playlists is not None:
+        members = []
+        for tracks in playlists:
+            gids = {registry.lookup(g) for track in tracks for g in split_genres(track.get("genre"))}
+            gids.discard(None)
+            members.append(sorted(gids))
+        if members:
+            p_offsets = np.cumsum([0] + [len(m) for m in members])
+            p_ids = np.fromiter((g for m in members for g in m), dtype=np.int64, count=p_offsets[-1])
+            pa, pb, pw = _pairs_within(p_offsets, p_ids)
+            a, b, w = np.concatenate((a, pa)), np.concatenate((b, pb)), np.concatenate((w, pw * playlist_weight))
+
+    a, b = node[a], node[b]
+    keep = (a >= 0) & (b >= 0) & (a != b)
+    i, j, w = np.minimum(a, b)[keep], np.maximum(a, b)[keep], w[keep]
+    if not len(w):
+        return i, j, w
+
+    # Sum duplicate pairs
+    keys = i * len(genres) + j
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    i, j = keys[starts] // len(genres), keys[starts] % len(genres)
+    w = np.add.reduceat(w[order], starts)
+
+    sizes = np.bincount(ids, minlength=len(registry)).astype(float)
+    size_of = np.ones(len(genres))
+    placed = node >= 0
+    size_of[node[placed]] = np.maximum(sizes[placed], 1)
+    w = w / np.sqrt(size_of[i] * size_of[j])
+    return i, j, w / w.max()
+
+def load_playlists(directory: Path) -> List[List[dict]]:
+    """The playlists written by `cli.py import-rekordbox --all-playlists` (one JSON track list per file)."""
+    playlists = []
+    for path in sorted(Path(directory).glob("*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            playlists.append(json.load(f))
+    return playlists
+
+# FORCE LAYOUT
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Interleave zeros between the low 16 bits of v (for Morton codes)."""
+    v = v.astype(np.uint64)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+class _QuadTree:
+    """
+    Helper for repulsion(): a quadtree over points sorted along a Z-order curve, stored
+    level by level. On each level a cell is a run of points sharing a Morton code prefix,
+    with its size, total mass, centre of mass and the range of its child cells one level
+    down. Levels stop once every cell holds a single point.
+    """
+    def __init__(self, xy: np.ndarray, mass: np.ndarray, max_depth: int = MAX_DEPTH):
+        lo = xy.min(axis=0)
+        self.span = float(max((xy.max(axis=0) - lo).max(), 1e-9)) * (1 + 1e-9)
+        q = np.minimum(((xy - lo) / self.span * (1 << max_depth)).astype(np.int64), (1 << max_depth) - 1)
+        codes = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << np.uint64(1))
+        self.order = np.argsort(codes, kind="stable")
+        self.x, self.y, self.mass = xy[self.order, 0], xy[self.order, 1], mass[self.order]
+        codes = codes[self.order]
+        mx, my = self.x * self.mass, self.y * self.mass
+
+        self.levels = []    # [(starts, sizes, cell of every point, mass, centre of mass x, y)]
+        for depth in range(max_depth + 1):
+            prefix = codes >> np.uint64(2 * (max_depth - depth))
+            starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            sizes = np.diff(np.r_[starts, len(codes)])
+            cell_mass = np.add.reduceat(self.mass, starts)
+            self.levels.append((
+                starts, sizes, np.repeat(np.arange(len(starts)), sizes), cell_mass,
+                np.add.reduceat(mx, starts) / cell_mass, np.add.reduceat(my, starts) / cell_mass,
+            ))
+            if len(starts) == len(codes):
+                break
+        # Child cells of cell c on level L: cells child_lo[c] … child_hi[c] - 1 on level L + 1
+        self.children = [
+            (np.searchsorted(below[0], above[0]), np.searchsorted(below[0], above[0] + above[1]))
+            for above, below in zip(self.levels, self.levels[1:])
+        ]
+
+def repulsion(xy: np.ndarray, mass: np.ndarray, theta: float = THETA) -> np.ndarray:
+    """
+    Force on every point from every other, m_i m_j / d pointing away (Barnes-Hut).
+
+    All points walk the tree together as (point, cell) pairs: a cell that does not contain
+    the point and is small or far enough (side < theta × distance) acts as one body at its
+    centre of mass, any other cell is replaced by its children on the next level. Points
+    still sharing a cell at MAX_DEPTH feel the rest of that cell as one body.
+    """
+    n = len(xy)
+    force = np.zeros((n, 2))
+    if n < 2:
+        return force
+    tree = _QuadTree(np.asarray(xy, dtype=float), np.asarray(mass, dtype=float))
+    points = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)
+    fx, fy = np.zeros(n), np.zeros(n)
+    for depth, (starts, sizes, owner, cell_mass, com_x, com_y) in enumerate(tree.levels):
+        dx = tree.x[points] - com_x[cells]
+        dy = tree.y[points] - com_y[cells]
+        dist2 = dx * dx + dy * dy
+        inside = owner[points] == cells
+        single = sizes[cells] == 1
+        body = cell_mass[cells]
+        last = depth == len(tree.levels) - 1
+        if last:
+            shared = inside & ~single
+            body[shared] -= tree.mass[points[shared]]
+            # The rest of a shared cell sits at (cell mass × centre - own mass × position) / rest
+            own = tree.mass[points[shared]] / body[shared]
+            dx[shared] *= 1 + own
+            dy[shared] *= 1 + own
+            dist2[shared] = dx[shared] ** 2 + dy[shared] ** 2
+            far = ~(inside & single)
+        else:
+            side = tree.span / (1 << depth)
+            far = ~inside & (single | (side * side < theta * theta * dist2))
+        hit = np.flatnonzero(far)
+        scale = tree.mass[points[hit]] * body[hit] / np.maximum(dist2[hit], 1e-12)
+        fx += np.bincount(points[hit], scale * dx[hit], n)
+        fy += np.bincount(points[hit], scale * dy[hit], n)
+        if last:
+            break
+        deeper = ~far & ~single
+        points, cells = points[deeper], cells[deeper]
+        child_lo, child_hi = tree.children[depth]
+        lo, counts = child_lo[cells], child_hi[cells] - child_lo[cells]
+        first = np.cumsum(counts) - counts
+        points = np.repeat(points, counts)
+        cells = np.repeat(lo - first, counts) + np.arange(len(points))
+    force[tree.order, 0] = fx
+    force[tree.order, 1] = fy
+    return force
+
+def force_layout(
+    radii: np.ndarray,
+    edges: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    iterations: int = ITERATIONS,
+    theta: float = THETA,
+    density: float = DENSITY,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Island centres (n, 2) from a force simulation, in units of the mean island radius,
+    centred on (0, 0). Not overlap free: see remove_overlaps().
+
+    Islands repel with m_i m_j / d, masses proportional to island area; edges (i, j, w)
+    pull with w × d; gravity pulls every island toward the middle with m × d, at a
+    strength that settles the layout at about `density` island area per layout area.
+    Moves are capped by a temperature that cools linearly (as in Fruchterman-Reingold).
+    """
+    radii = np.asarray(radii, dtype=float)
+    n = len(radii)
+    rho = radii / radii.mean() if n else radii
+    mass = rho ** 2
+    if n < 2:
+        return np.zeros((n, 2))
+    i, j, w = (np.asarray(a) for a in edges)
+    gravity = density
+
+    # Start on a seeded random disc of about the final size
+    rng = np.random.default_rng(seed)
+    extent = math.sqrt(mass.sum() / density)
+    angle = rng.uniform(0, 2 * math.pi, n)
+    dist = extent * np.sqrt(rng.uniform(0, 1, n))
+    xy = np.column_stack((dist * np.cos(angle), dist * np.sin(angle)))
+
+    for step in range(iterations):
+        force = repulsion(xy, mass, theta)
+        if len(w):
+            pull = (xy[j] - xy[i]) * w[:, None]
+            force[:, 0] += np.bincount(i, pull[:, 0], n) - np.bincount(j, pull[:, 0], n)
+            force[:, 1] += np.bincount(i, pull[:, 1], n) - np.bincount(j, pull[:, 1], n)
+        force -= gravity * mass[:, None] * xy
+        move = force / mass[:, None]
+        length = np.hypot(move[:, 0], move[:, 1])
+        temperature = 0.1 * extent * (1 - step / iterations)
+        xy += move * (np.minimum(length, temperature) / np.maximum(length, 1e-12))[:, None]
+    return xy - (xy * mass[:, None]).sum(axis=0) / mass.sum()
+
+# OVERLAP REMOVAL
+
+def overlapping_pairs(xy: np.ndarray, radii: np.ndarray, gap: float = 0.0):
+    """Index pairs (i, j) of circles closer than `gap` edge to edge (sweep and prune along x)."""
+    reach = radii + gap / 2
+    left = xy[:, 0] - reach
+    order = np.argsort(left, kind="stable")
+    left_sorted = left[order]
+    right_sorted = (xy[:, 0] + reach)[order]
+    ends = np.searchsorted(left_sorted, right_sorted, side="left")
+    counts = np.maximum(ends - np.arange(len(xy)) - 1, 0)
+    total = int(counts.sum())
+    a = np.repeat(np.arange(len(xy)), counts)
+    b = a + 1 + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    i, j = order[a], order[b]
+    d2 = ((xy[i] - xy[j]) ** 2).sum(axis=1)
+    limit = radii[i] + radii[j] + gap - 1e-6
+    hit = d2 < limit * limit
+    return i[hit], j[hit]
+
+def remove_overlaps(
+    centres: np.ndarray,
+    radii: np.ndarray,
+    gap: float,
+    iterations: int = OVERLAP_ITERATIONS,
+) -> np.ndarray:
+    """
+    Move circles until every two are at least `gap` apart, keeping the arrangement.
+
+    Overlapping pairs are pushed apart along the line between them, the smaller circle
+    taking the larger share of the move, for up to `iterations` rounds. Circles that
+    still overlap are then settled one by one from the middle out: each moves outward
+    along its ray from the area-weighted centre until it clears every settled circle.
+    """
+    xy = np.array(centres, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=float)
+    area = radii ** 2
+    for _ in range(iterations):
+        i, j = overlapping_pairs(xy, radii, gap)
+        if not len(i):
+            return xy
+        delta = xy[j] - xy[i]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        coincident = dist < 1e-9
+        delta[coincident] = (1.0, 0.0)
+        dist[coincident] = 1.0
+        push = (radii[i] + radii[j] + gap - dist) / dist
+        share_i = area[j] / (area[i] + area[j])
+        for axis in (0, 1):
+            xy[:, axis] -= np.bincount(i, push * share_i * delta[:, axis], len(xy))
+            xy[:, axis] += np.bincount(j, push * (1 - share_i) * delta[:, axis], len(xy))
+
+    middle = (xy * area[:, None]).sum(axis=0) / area.sum()
+    grid = SpatialGrid(radii.min() + gap)
+    settled = [None] * len(xy)
+    rs = radii.tolist()
+    out = np.hypot(*(xy - middle).T)
+    for k in np.argsort(out, kind="stable").tolist():
+        x, y = xy[k]
+        ux, uy = (x - middle[0], y - middle[1]) if out[k] > 1e-9 else (1.0, 0.0)
+        norm = math.hypot(ux, uy)
+        ux, uy = ux / norm, uy / norm
+        blocker = grid.blocker((x, y), rs[k], settled, rs, gap)
+        while blocker >= 0:
+            # Far intersection of the ray with the blocker's clearance circle
+            bx, by = settled[blocker]
+            reach = rs[k] + rs[blocker] + gap
+            along = (bx - x) * ux + (by - y) * uy
+            off2 = (bx - x) ** 2 + (by - y) ** 2 - along ** 2
+            t = along + math.sqrt(max(reach * reach - off2, 0.0)) + 1e-6
+            x, y = x + t * ux, y + t * uy
+            blocker = grid.blocker((x, y), rs[k], settled, rs, gap, blocker)
+        settled[k] = (x, y)
+        grid.insert(k, (x, y), rs[k])
+    return np.array(settled, dtype=float)
+
+def similarity_layout(
+    radii: List[float],
+    edges,
+    centre: Tuple[float, float] = (0.0, 0.0),
+    island_gap: float = 0.0,
+    iterations: int = ITERATIONS,
+    seed: int = 0,
+) -> List[Tuple[float, float]]:
+    """
+    Non-overlapping island centres with similar genres close together: force_layout()
+    scaled to pixels, remove_overlaps() at `island_gap`, moved to `centre`.
+    Drop-in for prepare_metadata.island_centres() given a genre_similarity() graph.
+    """
+    radii = np.asarray(radii, dtype=float)
+    if not len(radii):
+        return []
+    xy = force_layout(radii, edges, iterations, seed=seed) * (radii.mean() + island_gap / 2)
+    xy = remove_overlaps(xy, radii, island_gap)
+    area = radii ** 2
+    xy += np.asarray(centre, dtype=float) - (xy * area[:, None]).sum(axis=0) / area.sum()
+    return [tuple(p) for p in xy.tolist()]
+
+# QUALITY
+
+def layout_quality(centres, radii, edges, k: int = 5, samples: int = 100000, seed: int = 0) -> dict:
+    """
+    How well a layout puts similar genres together, and how compact it is.
+
+    similar_gap_ratio   – mean edge-to-edge gap between similar genres (weighted by
+                          similarity) over the mean gap between random pairs of islands;
+                          lower is better, about 1 when similarity is ignored
+    neighbour_precision – share of each genre's (up to) k most similar genres that are
+                          among its k nearest islands, averaged over genres with any
+    density             – island area over the area of the smallest circle around the
+                          layout's centroid that holds every island
+    overlaps            – pairs of islands that overlap
+    """
+    xy = np.asarray(centres, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=float)
+    n = len(xy)
+    i, j, w = (np.asarray(a) for a in edges)
+    quality = {"similar_gap_ratio": None, "neighbour_precision": None, "density": None,
+               "overlaps": int(len(overlapping_pairs(xy, radii)[0])) if n else 0}
+    if n == 0:
+        return quality
+    area = radii ** 2
+    middle = (xy * area[:, None]).sum(axis=0) / area.sum()
+    quality["density"] = round(float(area.sum() / (np.hypot(*(xy - middle).T) + radii).max() ** 2), 4)
+    if n < 2 or not len(w):
+        return quality
+
+    def gaps(a, b):
+        return np.hypot(*(xy[a] - xy[b]).T) - radii[a] - radii[b]
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(n, size=samples)
+    b = (a + rng.integers(1, n, size=samples)) % n
+    quality["similar_gap_ratio"] = round(float(np.average(gaps(i, j), weights=w) / gaps(a, b).mean()), 4)
+
+    nearest, _ = knn_grid(xy, k)
+    src, dst, weight = np.r_[i, j], np.r_[j, i], np.r_[w, w]
+    order = np.lexsort((-weight, src))
+    src, dst = src[order], dst[order]
+    bounds = np.searchsorted(src, np.arange(n + 1))
+    scores = []
+    for node in np.flatnonzero(np.diff(bounds)).tolist():
+        similar = dst[bounds[node]:bounds[node + 1]][:nearest.shape[1]]
+        scores.append(np.isin(similar, nearest[node]).mean())
+    quality["neighbour_precision"] = round(float(np.mean(scores)), 4)
+    return quality
@@ -0,0 +1,131 @@
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+UNKNOWN = "unknown"
+FALLBACK_COLOUR = "#cccccc"
+# Assigned to genres without a configured colour, in name order, cycling if needed
+PRIMARY_COLOURS = [
+    "#e6194b", "#3cb44b", "#ffe119", "#4363d8", "#f58231",
+    "#911eb4", "#46f0f0", "#f032e6", "#bcf60c", "#fabebe",
+    "#008080", "#e6beff", "#9a6324", "#fffac8", "#800000",
+    "#aaffc3", "#808000", "#ffd8b1", "#000075", "#808080"
+]
+
+def normalize_genre(name: str) -> str:
+    """Registry key for a genre: whitespace collapsed and casefolded, so "Deep  House" == "deep house"."""
+    return " ".join(name.split()).casefold()
+
+def split_genres(raw) -> List[str]:
+    """Split a tag like "Techno, Minimal" into its genres; missing or empty tags give ["unknown"]."""
+    if not raw:
+        return [UNKNOWN]
+    return [g.strip() for g in raw.split(",") if g.strip()] or [UNKNOWN]
+
+class GenreRegistry:
+    """
+    Interns genre names to small integer ids and records which genres every track has.
+
+    Names are normalised with normalize_genre() and resolved through `aliases`
+    (alias → genre); the first spelling seen is kept for display. `colours` pins
+    colours for some genres (config.json "defaultGenreColors"), every other genre
+    gets PRIMARY_COLOURS in name order.
+
+    Track membership is stored flat, CSR style: the genre ids of track t are
+    `ids[offsets[t]:offsets[t + 1]]`, primary genre first.
+    """
+    def __init__(self, aliases: Optional[Dict[str, str]] = None, colours: Optional[Dict[str, str]] = None,
+                 palette: List[str] = PRIMARY_COLOURS):
+        self.aliases = {normalize_genre(a): g for a, g in (aliases or {}).items()}
+        self.pinned_colours = {normalize_genre(g): c for g, c in (colours or {}).items()}
+        self.palette = palette
+        self.names: List[str] = []      # id -> display name
+        self._ids: Dict[str, int] = {}  # normalised name -> id
+        self._colours = None
+        self._offsets = array("q", [0])
+        self._members = array("q")
+        self._arrays = None     # numpy copies of the two arrays above, rebuilt after new tracks
+        self._by_genre = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"GenreRegistry(genres={len(self.names)}, tracks={self.track_count})"
+
+    def intern(self, name: str) -> int:
+        """Id for `name` (after aliasing), adding the genre if it is new."""
+        key = normalize_genre(name)
+        if key in self.aliases:
+            name = self.aliases[key]
+            key = normalize_genre(name)
+        gid = self._ids.get(key)
+        if gid is None:
+            gid = self._ids[key] = len(self.names)
+            self.names.append(name.strip())
+            self._colours = None
+        return gid
+
+    def key(self, name: str) -> str:
+        """Normalised name after aliasing: the same for every spelling of a genre, unlike its display name."""
+        key = normalize_genre(name)
+        return normalize_genre(self.aliases.get(key, key))
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Id for `name` (after aliasing) or None if it has never been interned."""
+        return self._ids.get(self.key(name))
+
+    def add_track(self, raw_genre) -> List[int]:
+        """Record the next track's genres from its raw tag; returns their ids, primary first, without repeats."""
+        ids = list(dict.fromkeys(self.intern(g) for g in split_genres(raw_genre)))
+        self._members.extend(ids)
+        self._offsets.append(len(self._members))
+        self._arrays = self._by_genre = None
+        return ids
+
+    @property
+    def track_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def genres_of(self, track: int) -> np.ndarray:
+        """Genre ids of track number `track`, primary first."""
+        offsets, ids = self.membership()
+        return ids[offsets[track]:offsets[track + 1]]
+
+    def membership(self):
+        """(offsets, ids) arrays describing every track's genres (see class docstring)."""
+        if self._arrays is None:
+            self._arrays = (np.array(self._offsets, dtype=np.int64), np.array(self._members, dtype=np.int64))
+        return self._arrays
+
+    def primary_ids(self) -> np.ndarray:
+        """Primary genre id of every track."""
+        offsets, ids = self.membership()
+        return ids[offsets[:-1]]
+
+    def tracks_with(self, gid: int) -> np.ndarray:
+        """Numbers of the tracks that have genre `gid` anywhere in their tag, in track order."""
+        if self._by_genre is None:
+            offsets, ids = self.membership()
+            tracks = np.repeat(np.arange(self.track_count), np.diff(offsets))
+            order = np.argsort(ids, kind="stable")
+            bounds = np.searchsorted(ids[order], np.arange(len(self.names) + 1))
+            self._by_genre = (tracks[order], bounds)
+        tracks, bounds = self._by_genre
+        return tracks[bounds[gid]:bounds[gid + 1]]
+
+    @property
+    def colours(self) -> List[str]:
+        """Colour of every genre, by id. Computed once per set of genres."""
+        if self._colours is None:
+            keys = {gid: key for key, gid in self._ids.items()}
+            colours = [self.pinned_colours.get(keys[gid]) for gid in range(len(self.names))]
+            unpinned = sorted((gid for gid, c in enumerate(colours) if c is None), key=lambda gid: self.names[gid])
+            for i, gid in enumerate(unpinned):
+                colours[gid] = self.palette[i % len(self.palette)]
+            self._colours = colours
+        return self._colours
+
+    def colour(self, gid: Optional[int]) -> str:
+        return FALLBACK_COLOUR if gid is None else self.colours[gid]
@@ -0,0 +1,182 @@
+"""
+Lightweight pipeline instrumentation.
+
+The pipeline modules record into the shared `metrics` object:
+
+    with metrics.stage("layout"):                   # wall and CPU time of a stage
+        ...
+    metrics.count("scan", "files")                  # counters, e.g. items, errors, cache hits
+    metrics.observe("scan", path, seconds)          # keeps the slowest N items per stage
+    metrics.gauge("layout", "density", 0.55)        # measured values, e.g. quality scores
+
+and a run ends with metrics.write_report(path) for a machine-readable JSON report.
+Everything is cheap enough to stay on permanently. cProfile and tracemalloc are the
+exception: they are only switched on for one chosen stage (see Metrics.configure).
+"""
+import cProfile
+import heapq
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+REPORT_VERSION = 1
+SLOWEST = 10        # slowest items kept per stage
+PROFILE_TOP = 25    # functions listed in the report for a profiled stage
+TRACE_TOP = 10      # allocation sites listed for a memory-traced stage
+
+
+class Metrics:
+    """Per-stage timings, counters and slowest items, safe to update from worker threads."""
+
+    def __init__(self, slowest: int = SLOWEST):
+        self.slowest = slowest
+        self.profile_stage = None
+        self.trace_stage = None
+        self.profile_dir = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far (the profiling setup is kept)."""
+        self.stages = {}
+        self.started = time.time()
+
+    def configure(self, profile: str = None, trace_memory: str = None, profile_dir: Path = None):
+        """
+        Profile the stage named `profile` with cProfile and/or trace the allocations of the
+        stage named `trace_memory` with tracemalloc. The full profile is dumped to
+        `profile_dir`/<stage>.prof (for snakeviz, pstats …) when a directory is given; the
+        top functions and allocation sites always go into the report.
+
+        cProfile only sees the thread that entered the stage, and neither sees worker processes.
+        """
+        self.profile_stage = profile
+        self.trace_stage = trace_memory
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+
+    def _entry(self, stage: str) -> dict:
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {"calls": 0, "wall": 0.0, "cpu": 0.0, "counters": {}, "slowest": []}
+        return entry
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the block as stage `name`; a stage entered several times adds up."""
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        tracing = name == self.trace_stage and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                entry = self._entry(name)
+                entry["calls"] += 1
+                entry["wall"] += wall
+                entry["cpu"] += cpu
+            if profiler is not None:
+                self._save_profile(name, profiler)
+            if tracing:
+                self._save_trace(name)
+
+    def count(self, stage: str, counter: str, n: int = 1):
+        with self._lock:
+            counters = self._entry(stage)["counters"]
+            counters[counter] = counters.get(counter, 0) + n
+
+    def gauge(self, stage: str, name: str, value):
+        """Record a measured value of a stage (a ratio, a score …); a later value replaces it."""
+        with self._lock:
+            self._entry(stage).setdefault("gauges", {})[name] = value
+
+    def observe(self, stage: str, item, seconds: float):
+        """Record how long one item (a file, a lookup …) took; only the slowest N are kept."""
+        with self._lock:
+            slowest = self._entry(stage)["slowest"]
+            if len(slowest) < self.slowest:
+                heapq.heappush(slowest, (seconds, str(item)))
+            elif seconds > slowest[0][0]:
+                heapq.heapreplace(slowest, (seconds, str(item)))
+
+    def _save_profile(self, name: str, profiler: cProfile.Profile):
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        with self._lock:
+            self._entry(name)["profile"] = out.getvalue().splitlines()
+
+    def _save_trace(self, name: str):
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:TRACE_TOP]
+        tracemalloc.stop()
+        with self._lock:
+            self._entry(name)["memory"] = {
+                "peak_mb": round(peak / 2**20, 2),
+                "top_allocations": [
+                    {"where": str(stat.traceback), "mb": round(stat.size / 2**20, 3), "blocks": stat.count}
+                    for stat in top
+                ],
+            }
+
+    def report(self) -> dict:
+        """Everything recorded so far as a JSON-serialisable dict, stages in order of first use."""
+        with self._lock:
+            stages = {}
+            for name, entry in self.stages.items():
+                out = {
+                    "calls": entry["calls"],
+                    "wall_s": round(entry["wall"], 4),
+                    "cpu_s": round(entry["cpu"], 4),
+                    "counters": dict(entry["counters"]),
+                    "slowest": [{"item": item, "seconds": round(seconds, 4)}
+                                for seconds, item in sorted(entry["slowest"], reverse=True)],
+                }
+                hits = entry["counters"].get("cache_hits", 0)
+                misses = entry["counters"].get("cache_misses", 0)
+                if hits + misses:
+                    out["cache_hit_rate"] = round(hits / (hits + misses), 4)
+                for key in ("gauges", "profile", "memory"):
+                    if key in entry:
+                        out[key] = entry[key]
+                stages[name] = out
+        return {
+            "version": REPORT_VERSION,
+            "started": self.started,
+            "wall_s": round(time.time() - self.started, 4),
+            "stages": stages,
+        }
+
+    def write_report(self, path: Path) -> dict:
+        """Write report() to `path` as JSON, atomically, and print a one-line-per-stage summary."""
+        report = self.report()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        for name, stage in report["stages"].items():
+            if stage["calls"]:
+                print(f"⏱️ {name:<12} {stage['wall_s']:8.2f}s wall {stage['cpu_s']:8.2f}s CPU")
+        print(f"📊 Run report written to {path}")
+        return report
+
+
+# Shared by scan_library, prepare_metadata and youtube
+metrics = Metrics()
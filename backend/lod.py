@@ -0,0 +1,72 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+LOD_VERSION = 1
+# Each level merges tiles on a grid `factor` tile pitches wide, i.e. it suits zoom scales
+# around 1 / factor. Past the last level the viewer only needs the island circles.
+LOD_FACTORS = [2, 4, 8, 16]
+
+def downsample_tiles(positions: np.ndarray, cell: float) -> np.ndarray:
+    """
+    Merge tiles that fall in the same `cell`-sized grid square into one representative.
+
+    Returns an (m, 3) array of (x, y, count): the first tile of each square in island order
+    (the most central one, as islands fill from the centre outwards) and how many tiles
+    it stands for. Representatives keep the order of the tiles they were picked from.
+    """
+    if len(positions) == 0:
+        return np.zeros((0, 3))
+    cells = np.floor(positions / cell).astype(np.int64)
+    _, first, inverse = np.unique(cells, axis=0, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse.reshape(-1), minlength=len(first))
+    order = np.argsort(first)
+    return np.column_stack((positions[first[order]], counts[order]))
+
+def island_summary(island) -> dict:
+    """Aggregate of one island: centroid of its tiles, radius, colour and track count."""
+    positions = np.asarray(island.tile_positions, dtype=float)
+    cx, cy = positions.mean(axis=0)
+    return {
+        "genre": island.genre,
+        "centroid": [round(float(cx), 2), round(float(cy), 2)],
+        "radius": round(island.radius, 2),
+        "colour": island.colour,
+        "count": len(island.tracks),
+    }
+
+def build_lod(islands: List, pitch: float, factors: List[int] = LOD_FACTORS) -> dict:
+    """
+    Level-of-detail summaries for zoomed-out rendering.
+
+    "islands" has one island_summary() per island. "levels" has, for every factor, the
+    grid cell size and per island a downsampled tile list ([x, y, count] rows, see
+    downsample_tiles()), in the same island order, so a viewer zoomed out to about
+    1 / factor draws a few representatives per island instead of every tile.
+    """
+    summaries = [island_summary(island) for island in islands]
+    positions = [np.asarray(island.tile_positions, dtype=float) for island in islands]
+    levels = []
+    for factor in factors:
+        cell = pitch * factor
+        levels.append({
+            "factor": factor,
+            "cell": cell,
+            "tiles": [
+                [[round(x, 2), round(y, 2), int(n)] for x, y, n in downsample_tiles(p, cell).tolist()]
+                for p in positions
+            ],
+        })
+    return {"version": LOD_VERSION, "pitch": pitch, "islands": summaries, "levels": levels}
+
+def write_lod(lod: dict, path: Path):
+    """Write build_lod() output as compact JSON, atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(lod, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -0,0 +1,239 @@
+"""
+Merge several scanned libraries (folder scans, Rekordbox imports) into one, so the same
+file found by two sources becomes a single track.
+
+Folder scans and Rekordbox exports describe tracks differently: a scan has the file's
+`path` and its `date`, Rekordbox a `file_path` URL ("file://localhost/F:/DJ%20MUSIC/…"),
+a `label` and a `track_id`. Sources are joined in order, each against the tracks merged
+so far, through two hash indexes:
+
+  * path         – file:// URLs decoded, separators unified, Unicode-normalised and
+                   casefolded (see normalize_path()), so both spellings of a file meet
+  * artist+title – youtube.normalize_query_key(), for tracks whose file has moved (only
+                   tracks tagged with both an artist and a title)
+
+Fields missing from the first source that has a track are filled in from the others.
+Every merged track gets an explicit, collision-free "id" (see assign_ids()), which
+prepare_metadata.generate_id() uses as is.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from collections import defaultdict, deque
+from pathlib import Path
+from urllib.parse import unquote
+
+from instrument import metrics
+from ndjson import iter_ndjson, write_ndjson
+from youtube import normalize_query_key
+
+_DRIVE = re.compile(r"/[A-Za-z]:/")
+
+def local_path(path: str) -> str:
+    """
+    The filesystem path of a scan `path` or a Rekordbox `file_path`, with "/" separators:
+    "file://localhost/F:/DJ%20MUSIC/a.aiff" → "F:/DJ MUSIC/a.aiff",
+    "file:///Users/me/a.mp3" → "/Users/me/a.mp3", "file://nas/music/a.mp3" → "//nas/music/a.mp3".
+    """
+    if not path:
+        return None
+    if path[:7].lower() == "file://":
+        host, slash, rest = path[7:].partition("/")
+        path = unquote(slash + rest)
+        if host and host.lower() != "localhost":
+            path = "//" + host + path
+        if _DRIVE.match(path):
+            path = path[1:]
+    return path.replace("\\", "/")
+
+def normalize_path(path: str) -> str:
+    """Join key for a path: local_path(), NFC-normalised (macOS stores NFD names) and casefolded."""
+    path = local_path(path)
+    if not path:
+        return None
+    if not path.isascii():
+        path = unicodedata.normalize("NFC", path)
+    return path.casefold()
+
+def _label(track: dict) -> str:
+    return track.get("path") or f"{track.get('artist')} – {track.get('title')}"
+
+def _fill(merged: dict, track: dict):
+    """Copy the fields `merged` lacks (missing, None or empty) from `track`."""
+    for key, value in track.items():
+        if value not in (None, "") and merged.get(key) in (None, ""):
+            merged[key] = value
+
+def assign_ids(tracks: list) -> int:
+    """
+    Give every track an "id": prepare_metadata.generate_id()'s hash of path + title, or of
+    the normalised artist and title for tracks without a file. Tracks whose hash is already
+    taken (the same title twice with no path) are re-hashed with a counter, in list order,
+    so ids are unique and stay the same from run to run. Returns the number re-hashed.
+    """
+    taken = set()
+    collisions = 0
+    for track in tracks:
+        path = track.get("path")
+        base = path + (track.get("title") or "") if path else "\x1f" + normalize_query_key(track)
+        track_id = hashlib.md5(base.encode("utf-8")).hexdigest()
+        n = 1
+        while track_id in taken:
+            track_id = hashlib.md5(f"{base}#{n}".encode("utf-8")).hexdigest()
+            n += 1
+        collisions += n > 1
+        taken.add(track_id)
+        track["id"] = track_id
+    return collisions
+
+def _song_key(track: dict) -> str:
+    """normalize_query_key() of a track with both an artist and a title, else None."""
+    song = normalize_query_key(track)
+    artist, _, title = song.partition("\x1f")
+    return song if artist and title else None
+
+def merge_sources(sources: dict):
+    """
+    Merge the track lists in `sources` (name -> list of track dicts, in priority order).
+
+    A track joins the merged track with the same normalised path; failing that, one with
+    the same artist and title (both non-empty) that no track of its own source has claimed
+    yet; otherwise
+    it is added as a new track. The same file listed twice in one source is a duplicate:
+    it is folded into the first copy.
+
+    Returns:
+        (tracks, report): the merged tracks, each with a "path" (when any source had one),
+        the "sources" it came from and an "id" (see assign_ids()); and a report with per
+        source counts, the tracks only one source has ("unmatched"), "duplicates", and
+        songs present as several different files ("same_song").
+    """
+    merged = []
+    by_path = {}
+    by_key = defaultdict(list)
+    report = {"sources": {}, "unmatched": {}, "duplicates": [], "same_song": []}
+
+    for name, tracks in sources.items():
+        counts = {"tracks": len(tracks), "matched_by_path": 0, "matched_by_artist_title": 0,
+                  "added": 0, "duplicates": 0}
+        claimed = {}     # merged row -> first track of this source joined to it
+        candidates = {}  # song -> deque of the rows with that song this source may still join
+        pending = []
+        # Paths first, so an artist+title match cannot take a row this source has by path
+        for track in tracks:
+            track = dict(track)
+            if not track.get("path") and track.get("file_path"):
+                track["path"] = local_path(track["file_path"])
+            key = normalize_path(track.get("path"))
+            row = by_path.get(key) if key else None
+            if row is None:
+                pending.append((track, key))
+            elif row in claimed:
+                counts["duplicates"] += 1
+                report["duplicates"].append({"source": name, "track": _label(track), "of": _label(merged[row])})
+                _fill(merged[row], track)
+            else:
+                claimed[row] = track
+                counts["matched_by_path"] += 1
+                merged[row]["sources"].append(name)
+                _fill(merged[row], track)
+
+        for track, key in pending:
+            if key and key in by_path:
+                # Added a moment ago for an earlier copy of the same file
+                row = by_path[key]
+                counts["duplicates"] += 1
+                report["duplicates"].append({"source": name, "track": _label(track), "of": _label(merged[row])})
+                _fill(merged[row], track)
+                continue
+            song = _song_key(track)
+            row = None
+            if song in by_key:
+                # Each row leaves the queue once, so a source's lookups stay O(1) overall
+                queue = candidates.get(song)
+                if queue is None:
+                    queue = candidates[song] = deque(by_key[song])
+                while queue and queue[0] in claimed:
+                    queue.popleft()
+                row = queue.popleft() if queue else None
+            if row is None:
+                row = len(merged)
+                counts["added"] += 1
+                merged.append({**track, "sources": [name]})
+                if song:
+                    by_key[song].append(row)
+            else:
+                counts["matched_by_artist_title"] += 1
+                merged[row]["sources"].append(name)
+                _fill(merged[row], track)
+            claimed[row] = track
+            if key:
+                by_path.setdefault(key, row)
+
+        report["sources"][name] = counts
+        for counter, value in counts.items():
+            metrics.count("merge", f"{name}.{counter}", value)
+
+    if len(sources) > 1:
+        for name in sources:
+            report["unmatched"][name] = [_label(t) for t in merged if t["sources"] == [name]]
+    for rows in by_key.values():
+        if len(rows) > 1:
+            report["same_song"].append([_label(merged[row]) for row in rows])
+    report["merged"] = len(merged)
+    report["id_collisions"] = assign_ids(merged)
+    metrics.count("merge", "tracks", len(merged))
+    return merged, report
+
+def load_tracks(path: Path) -> list:
+    """A scanned library: a JSON list, or NDJSON if the file ends in ".ndjson"."""
+    path = Path(path)
+    if path.suffix == ".ndjson":
+        return list(iter_ndjson(path))
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def source_names(paths: list) -> list:
+    """Report names for the input files: their stems, numbered when two are the same."""
+    names = []
+    for path in paths:
+        name = Path(path).stem
+        names.append(name if name not in names else f"{name}.{len(names) + 1}")
+    return names
+
+def merge_libraries(input_paths: list, output_path: Path, report_path: Path = None) -> dict:
+    """
+    Merge the libraries in `input_paths` (highest priority first) into `output_path`
+    (JSON, or NDJSON if it ends in ".ndjson"). The merge report is written to
+    `report_path` if given, and returned.
+    """
+    with metrics.stage("load"):
+        sources = {name: load_tracks(path) for name, path in zip(source_names(input_paths), input_paths)}
+    with metrics.stage("merge"):
+        tracks, report = merge_sources(sources)
+
+    for name, counts in report["sources"].items():
+        print(f"🔗 {name}: {counts['tracks']} tracks, {counts['matched_by_path']} matched by path, "
+              f"{counts['matched_by_artist_title']} by artist and title, {counts['added']} new, "
+              f"{counts['duplicates']} duplicates")
+    if report["unmatched"]:
+        print("🧩 Only in one source: " + ", ".join(f"{name} {len(labels)}" for name, labels in report["unmatched"].items()))
+    if report["same_song"]:
+        print(f"⚠️ {len(report['same_song'])} songs are present as more than one file")
+
+    with metrics.stage("write"):
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.suffix == ".ndjson":
+            write_ndjson(tracks, output_path)
+        else:
+            with output_path.open("w", encoding="utf-8") as f:
+                json.dump(tracks, f, indent=2, ensure_ascii=False)
+        if report_path:
+            report_path = Path(report_path)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with report_path.open("w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📁 {len(tracks)} merged tracks saved to {output_path}")
+    return report
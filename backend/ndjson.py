@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+from typing import Iterable
+
+FLUSH_EVERY = 1000
+
+def write_ndjson(records: Iterable[dict], path: Path, flush_every: int = FLUSH_EVERY) -> int:
+    """
+    Write `records` to `path` as NDJSON (one compact JSON object per line) as they are
+    produced, flushing every `flush_every` records so that a crash midway still leaves
+    every record written so far readable by iter_ndjson(). Returns the number written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+            if count % flush_every == 0:
+                f.flush()
+    return count
+
+def iter_ndjson(path: Path):
+    """
+    Yield the records of an NDJSON file one at a time. A truncated last line (left by a
+    writer that crashed mid-record) is skipped with a warning; damage anywhere else raises.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith("\n"):
+                    raise
+                print(f"⚠️ Ignoring truncated last record in {path}")
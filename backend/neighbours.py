@@ -0,0 +1,157 @@
+"""
+Nearest-neighbour lists over the final tile coordinates, for "auto-play related tracks":
+every track gets the k tracks closest to it on the canvas, on its own island or a
+neighbouring one, precomputed at prepare time so the viewer never scans the library.
+"""
+import struct
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+MAGIC = b"MVKNN\x00\x00\x01"
+DEFAULT_K = 8
+
+def _cell_keys(xy: np.ndarray, lo: np.ndarray, cell: float):
+    """Grid cell of every point as one int64 key (row-major), and the grid's width."""
+    ij = np.floor((xy - lo) / cell).astype(np.int64)
+    width = int(ij[:, 1].max()) + 1
+    return ij[:, 0] * width + ij[:, 1], width
+
+def _cell_size(xy: np.ndarray, lo: np.ndarray, k: int) -> float:
+    """
+    A cell side for which the occupied cells hold k/2 … 4k points on average. The guess
+    from the bounding box is doubled or halved until it does, so points on a line or in
+    far-apart clusters get cells that suit them rather than the box.
+    """
+    n = len(xy)
+    span = np.maximum(xy.max(axis=0) - lo, 1e-9)
+    cell = float(np.sqrt(span[0] * span[1] * k / n)) or float(max(span)) / n
+    for _ in range(64):
+        per_cell = n / len(np.unique(_cell_keys(xy, lo, cell)[0]))
+        if per_cell < k / 2 and per_cell < n:
+            cell *= 2          # at most 4× the points per cell, so this cannot overshoot 4k
+        elif per_cell > 4 * k:
+            cell /= 2
+        else:
+            break
+    return cell
+
+def knn_grid(xy: np.ndarray, k: int = DEFAULT_K, cell: float = None):
+    """
+    Exact k nearest neighbours of every point (itself excluded) through a uniform grid.
+
+    Points are bucketed into square cells of side `cell` (by default sized so an occupied
+    cell holds about k points, see _cell_size()). For the points of one cell, candidates
+    come from the block of cells within R of it; every point outside that block is at
+    least R * cell away, so once the k-th candidate distance is within that bound the
+    answer is exact, and otherwise R doubles (islands leave empty space around edge tiles).
+
+    Returns (indices, distances), both (n, min(k, n - 1)) arrays sorted by distance,
+    ties broken by the lower index.
+    """
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    n = len(xy)
+    k = max(0, min(k, n - 1))
+    if k == 0:
+        return np.zeros((n, 0), dtype=np.int32), np.zeros((n, 0), dtype=np.float32)
+
+    lo = xy.min(axis=0)
+    if cell is None:
+        cell = _cell_size(xy, lo, k)
+    keys, width = _cell_keys(xy, lo, cell)
+    order = np.argsort(keys, kind="stable")
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    buckets = {key: order[a:a + c] for key, a, c in zip(cell_keys.tolist(), starts.tolist(), counts.tolist())}
+
+    indices = np.empty((n, k), dtype=np.int32)
+    distances = np.empty((n, k), dtype=np.float32)
+    for key, members in buckets.items():
+        ci, cj = divmod(key, width)
+        radius = 1
+        while True:
+            if (2 * radius + 1) ** 2 >= len(buckets):
+                candidates = np.arange(n)      # cheaper than walking a mostly empty block
+            else:
+                candidates = np.sort(np.concatenate([
+                    buckets[(ci + di) * width + cj + dj]
+                    for di in range(-radius, radius + 1)
+                    for dj in range(-radius, radius + 1)
+                    if 0 <= cj + dj < width and (ci + di) * width + cj + dj in buckets
+                ]))
+            if len(candidates) > k:
+                d2 = ((xy[members, None, :] - xy[None, candidates, :]) ** 2).sum(axis=2)
+                d2[members[:, None] == candidates[None, :]] = np.inf
+                nearest = np.argsort(d2, axis=1, kind="stable")[:, :k]
+                d = np.sqrt(np.take_along_axis(d2, nearest, axis=1))
+                if d[:, -1].max() <= radius * cell or len(candidates) == n:
+                    indices[members] = candidates[nearest]
+                    distances[members] = d
+                    break
+            radius *= 2
+    return indices, distances
+
+class NeighbourIndex:
+    """
+    k nearest tracks of every prepared track, in the order of the prepared track list.
+
+    related() looks a track id up by binary search over the sorted ids, O(log n), and
+    returns the ids of its neighbours, nearest first.
+    """
+
+    def __init__(self, ids: List[str], neighbours: np.ndarray):
+        self.ids = list(ids)
+        self.neighbours = np.asarray(neighbours, dtype=np.uint32).reshape(len(self.ids), -1)
+        self._id_array = np.array(self.ids)
+        self._by_id = np.argsort(self._id_array, kind="stable")
+        self._sorted_ids = self._id_array[self._by_id]
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def from_tracks(cls, tracks: List[dict], k: int = DEFAULT_K) -> "NeighbourIndex":
+        """Build the index from prepared tracks (each with "id", "x" and "y")."""
+        xy = np.array([(t["x"], t["y"]) for t in tracks], dtype=float).reshape(-1, 2)
+        indices, _ = knn_grid(xy, k)
+        return cls([t["id"] for t in tracks], indices)
+
+    def row(self, track_id: str) -> int:
+        """Position of `track_id` in the prepared track list; KeyError if unknown."""
+        at = int(np.searchsorted(self._sorted_ids, track_id))
+        if at == len(self._sorted_ids) or self._sorted_ids[at] != track_id:
+            raise KeyError(track_id)
+        return int(self._by_id[at])
+
+    def related(self, track_id: str, k: int = None) -> List[str]:
+        """Ids of the (first `k`) tracks nearest to `track_id`, nearest first."""
+        return [self.ids[i] for i in self.neighbours[self.row(track_id), :k].tolist()]
+
+    def encode(self) -> bytes:
+        """
+        MAGIC, uint32 track count n, uint32 k, n 16-byte md5 track ids, then n × k uint32
+        rows into that id list (little-endian). frontend/src/neighbours.js reads it.
+        """
+        ids = b"".join(bytes.fromhex(i) for i in self.ids)
+        return MAGIC + struct.pack("<II", len(self.ids), self.k) + ids + self.neighbours.astype("<u4").tobytes()
+
+    @classmethod
+    def decode(cls, data: bytes) -> "NeighbourIndex":
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a neighbour file")
+        n, k = struct.unpack_from("<II", data, len(MAGIC))
+        start = len(MAGIC) + 8
+        digests = data[start:start + 16 * n].hex()
+        ids = [digests[32 * i:32 * i + 32] for i in range(n)]
+        neighbours = np.frombuffer(data, dtype="<u4", count=n * k, offset=start + 16 * n).reshape(n, k)
+        return cls(ids, neighbours)
+
+    def write(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.encode())
+
+    @classmethod
+    def load(cls, path: Path) -> "NeighbourIndex":
+        return cls.decode(Path(path).read_bytes())
@@ -1,12 +1,14 @@
 import json
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from pathlib import Path
 
-import plotly.graph_objects as go
+# plotly is imported inside the functions: it is slow to import and only needed for plotting
+DEFAULT_PREPARED_PATH = Path(__file__).resolve().parents[1] / "frontend" / "public" / "prepared.json"
+
+def check_layout(prepared_path: Path = DEFAULT_PREPARED_PATH):
+    import plotly.graph_objects as go
 
-def check_layout():
     # Read prepared.json
-    with open(r'H:\REPOSITORIES\music-viewer\frontend\public\prepared.json', 'r') as f:
+    with open(prepared_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
     fig = go.Figure()
@@ -1,37 +1,60 @@
 # imports
+import itertools
 import math
+import os
+import sys
 from pathlib import Path
 import json
 import hashlib
+import heapq
+import numpy as np
 from collections import defaultdict
 from typing import List, Tuple, Literal
 from tqdm import tqdm
-from youtubesearchpython import VideosSearch
 
-from plot import check_layout
-from youtube import get_youtube_url
+from instrument import metrics
+from settings import config_value
+from youtube import resolve_youtube_urls, make_session, TokenBucket, YouTubeCache, DEFAULT_CACHE_PATH
+from genres import GenreRegistry, split_genres
+from genre_layout import genre_similarity, layout_quality, load_playlists, similarity_layout
+from chunks import write_chunked_output
+from columnar import write_columnar_output
+from lod import build_lod, write_lod
+from neighbours import NeighbourIndex, DEFAULT_K
+from search import SearchIndex
+from artwork import DEFAULT_ARTWORK_DIR, artwork_available, build_atlases
+from ndjson import iter_ndjson, write_ndjson
+from spatial_grid import SpatialGrid
 
 # constants
 
-config_path = Path(__file__).parent.parent / "config.json"
-with open(config_path, "r", encoding="utf-8") as f:
-    config = json.load(f)
-
-secrets_path = Path(__file__).parent.parent / "data" / "secrets.json"
-with open(secrets_path, "r", encoding="utf-8") as f:
-    secrets = json.load(f)
-
-TILE_SIZE = config.get("tileSize")
-INNER_GAP = config.get("tileGap")
-ISLAND_GAP = config.get("islandGap")
-CENTRE_X = config.get("centreX")
-CENTRE_Y = config.get("centreY")
+# Layout and colour settings live in config.json, which is only read on first use
+# (see settings.py). The module constants below still work: prepare_metadata.TILE_SIZE …
+_CONFIG_KEYS = {
+    "TILE_SIZE": ("tileSize", None),
+    "INNER_GAP": ("tileGap", None),
+    "ISLAND_GAP": ("islandGap", None),
+    "CENTRE_X": ("centreX", None),
+    "CENTRE_Y": ("centreY", None),
+    "GENRE_COLOURS": ("defaultGenreColors", {}),
+    "GENRE_ALIASES": ("genreAliases", {}),
+}
+
+def __getattr__(name):
+    if name in _CONFIG_KEYS:
+        return config_value(*_CONFIG_KEYS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _canvas_centre() -> Tuple[float, float]:
+    return config_value("centreX"), config_value("centreY")
+
+def _genre_registry() -> GenreRegistry:
+    return GenreRegistry(config_value("genreAliases", {}), config_value("defaultGenreColors", {}))
 
 # CLEAN
 def clean_genre(genre):
-    if not genre:
-        return "unknown"
-    return [g.strip() for g in genre.split(",") if g.strip()]
+    """All genres in a tag, e.g. "Techno, Minimal" → ["Techno", "Minimal"]; ["unknown"] if missing."""
+    return split_genres(genre)
 
 # GENERATE NEW DATA
 def estimate_decade(date_str):
@@ -44,40 +67,56 @@ def estimate_decade(date_str):
         return "unknown"
 
 def generate_id(track):
+    if track.get("id"):
+        return track["id"]   # assigned by merge.assign_ids()
     base = (track.get("path") or "") + (track.get("title") or "")
     return hashlib.md5(base.encode("utf-8")).hexdigest()
 
-def get_genre_colour(genre, genre_groups):
-    # Assign a unique primary colour to each genre, cycling if needed
-    primary_colours = [
-        "#e6194b", "#3cb44b", "#ffe119", "#4363d8", "#f58231",
-        "#911eb4", "#46f0f0", "#f032e6", "#bcf60c", "#fabebe",
-        "#008080", "#e6beff", "#9a6324", "#fffac8", "#800000",
-        "#aaffc3", "#808000", "#ffd8b1", "#000075", "#808080"
-    ]
-    genre_list = sorted(genre_groups.keys())
-    colour_map = {g: primary_colours[i % len(primary_colours)] for i, g in enumerate(genre_list)}
-    return colour_map.get(genre, "#cccccc")
-
-def get_genre_groups(tracks: list) -> defaultdict:
+def prepare_track(track, x, y, colour, preview_url):
+    """The record the frontend gets for one track placed at (x, y)."""
+    prepared = {
+        "id": generate_id(track),
+        "title": track.get("title", "Unknown Title"),
+        "artist": track.get("artist", "Unknown Artist"),
+        "album": track.get("album", ""),
+        "genre": track.get("genre"),
+        "decade": estimate_decade(track.get("date")),
+        "date": track.get("date"),
+        "tracknumber": track.get("tracknumber"),
+        "path": track.get("path"),
+        "x": round(x, 2),
+        "y": round(y, 2),
+        "colour": colour,
+        "preview_url": preview_url,
+        "buy_url": f"https://bandcamp.com/search?q={track.get('artist', '')}+{track.get('title', '')}".replace(" ", "+"),
+    }
+    if track.get("artwork"):
+        prepared["artwork"] = track["artwork"]   # cover hash, looked up in atlas.json
+    return prepared
+
+def get_genre_groups(tracks: list, registry: GenreRegistry = None) -> defaultdict:
     """
-    Groups a list of track dictionaries by their cleaned and normalized genre names.
+    Groups a list of track dictionaries by their primary (first) genre.
 
     Args:
         tracks (list of dict): A list of track dictionaries, each containing at least a "genre" key.
+        registry (GenreRegistry): Registry that interns the genres and records every genre of every
+            track, in the order of `tracks`. A fresh one is used if not given.
 
     Returns:
-        defaultdict: A dictionary where keys are cleaned genre names and values are lists of tracks belonging to each genre.
-
-    Note:
-        This function relies on an external `clean_genre` function to process genre names.
+        defaultdict: A dictionary where keys are genre names and values are lists of tracks
+        whose primary genre it is, in order of first appearance.
     """
+    if registry is None:
+        registry = _genre_registry()
 
-    genre_groups = defaultdict(list)
+    groups_by_id = defaultdict(list)
     for track in tracks:
-        genre = clean_genre(track.get("genre"))
-        primary_genre = genre[0] if isinstance(genre, list) else genre
-        genre_groups[primary_genre].append(track)
+        groups_by_id[registry.add_track(track.get("genre"))[0]].append(track)
+
+    genre_groups = defaultdict(list)
+    for gid, group in groups_by_id.items():
+        genre_groups[registry.names[gid]] = group
     return genre_groups
 
 
@@ -150,9 +189,9 @@ def _axial_to_cart(
 
 
 def island_tile_positions(n: int,
-                     centre: Tuple[float, float] = (CENTRE_X, CENTRE_Y),
-                     tile_sz: float = TILE_SIZE,
-                     gap: float = INNER_GAP) -> List[Tuple[float, float]]:
+                     centre: Tuple[float, float] = None,
+                     tile_sz: float = None,
+                     gap: float = None) -> List[Tuple[float, float]]:
     """
     Return a list of (x, y) centres for `n` square tiles arranged
     compactly around `centre` on a hex/brick grid.
@@ -160,9 +199,9 @@ def island_tile_positions(n: int,
     Args
     ----
     n        : number of tiles (≥1)
-    centre   : (cx, cy) of the island’s centre
-    tile_sz  : tile width/height in pixels
-    gap      : clearance between tile edges in pixels
+    centre   : (cx, cy) of the island’s centre (default: config centreX/centreY)
+    tile_sz  : tile width/height in pixels (default: config tileSize)
+    gap      : clearance between tile edges in pixels (default: config tileGap)
 
     Example
     -------
@@ -170,6 +209,9 @@ def island_tile_positions(n: int,
     """
     if n < 1:
         raise ValueError("Number of tiles must be ≥ 1")
+    centre = _canvas_centre() if centre is None else centre
+    tile_sz = config_value("tileSize") if tile_sz is None else tile_sz
+    gap = config_value("tileGap") if gap is None else gap
 
     cx, cy   = centre
     pitch    = tile_sz + gap          # centre-to-centre spacing
@@ -202,6 +244,72 @@ def island_tile_positions(n: int,
     return coords
 
 
+# Ring-ordered axial (q, r) offsets, grown on demand and shared by every island
+_HEX_DIRECTIONS = np.array([(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)])
+_hex_template = np.zeros((1, 2), dtype=np.int64)
+
+def hex_template(n: int) -> np.ndarray:
+    """
+    Axial (q, r) offsets of the first `n` tiles in the order island_tile_positions()
+    walks them: centre, then ring 1 … R, each starting at its west corner (-R, +R).
+    The template is built once for the largest island asked for; smaller islands
+    get a prefix of it.
+    """
+    global _hex_template
+    if n > len(_hex_template):
+        rings = [_hex_template]
+        for r in range(_hex_rings_needed(len(_hex_template)) + 1, _hex_rings_needed(n) + 1):
+            steps = np.repeat(_HEX_DIRECTIONS, r, axis=0)
+            walk = np.cumsum(steps, axis=0) - steps       # position *before* each step
+            rings.append(walk + (-r, r))
+        _hex_template = np.concatenate(rings)
+    return _hex_template[:n]
+
+
+def all_tile_positions(counts: List[int],
+                       centres: List[Tuple[float, float]],
+                       tile_sz: float = None,
+                       gap: float = None,
+                       slots: np.ndarray = None) -> np.ndarray:
+    """
+    Vectorised island_tile_positions() for many islands at once.
+
+    Args
+    ----
+    counts   : number of tiles per island (each ≥1)
+    centres  : (cx, cy) of each island’s centre
+    tile_sz  : tile width/height in pixels (default: config tileSize)
+    gap      : clearance between tile edges in pixels (default: config tileGap)
+    slots    : optional template slot of every tile (sum(counts) of them, island after
+               island) when tiles do not simply fill slots 0 … count-1 (incremental layout)
+
+    Returns
+    -------
+    (sum(counts), 2) float array: the tiles of island 0, then island 1, …, with the
+    same coordinates island_tile_positions() gives for each island.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.size == 0:
+        return np.zeros((0, 2))
+    if counts.min() < 1:
+        raise ValueError("Number of tiles must be ≥ 1")
+
+    if slots is None:
+        # Index of each tile within its own island: 0 … count-1, island after island
+        starts = np.cumsum(counts) - counts
+        within = np.arange(counts.sum()) - np.repeat(starts, counts)
+    else:
+        within = np.asarray(slots, dtype=np.int64)
+
+    tile_sz = config_value("tileSize") if tile_sz is None else tile_sz
+    gap = config_value("tileGap") if gap is None else gap
+    pitch = tile_sz + gap
+    template = hex_template(int(within.max()) + 1)
+    q = template[:, 0].astype(float)
+    r = template[:, 1].astype(float)
+    # Same expressions as _axial_to_cart(…, "pointy"), so results match bit for bit
+    offsets = np.column_stack((pitch * (1.5 * q), pitch * (_ROOT3 / 2 * q + _ROOT3 * r)))
+    return np.repeat(np.asarray(centres, dtype=float), counts, axis=0) + offsets[within]
 
 
 def _dist(p: Tuple[float, float], q: Tuple[float, float]) -> float:
@@ -239,17 +347,33 @@ def _circle_intersections(c0, r0, c1, r1) -> List[Tuple[float, float]]:
 
 def island_centres(
     radii: List[float],
-    centre: Tuple[float, float] = (CENTRE_X, CENTRE_Y),
-    island_gap: float = ISLAND_GAP
+    centre: Tuple[float, float] = None,
+    island_gap: float = None,
+    placed: List[Tuple[Tuple[float, float], float]] = None,
 ) -> List[Tuple[float, float]]:
     """
     Compute (x, y) centres for islands treated as non-overlapping circles.
 
+    Each new island goes to the position closest to `centre` among the points
+    tangent to one existing island (on its side facing the hub) or to two
+    existing islands.
+
+    Island radii only take a handful of distinct values, so candidates are kept
+    in one heap per radius and extended with the pairs each newly placed island
+    forms with its neighbours (found through a spatial grid).  A candidate that
+    is blocked stays blocked, so it is dropped for good the first time it fails.
+    The result is the same as re-testing every pair for every island.
+
     Parameters
     ----------
     radii       : list of island radii (edge of tiles → centre distance)
-    centre      : fixed position of the first island (usually canvas centre)
-    island_gap  : minimum clearance *between edges* of any two islands
+    centre      : fixed position of the first island (default: the canvas centre
+                  from config)
+    island_gap  : minimum clearance *between edges* of any two islands (default:
+                  config islandGap)
+    placed      : [((x, y), radius)] of islands that already have a position
+                  (incremental layout).  They stay where they are and *radii*
+                  are packed around them, without anchoring one at `centre`.
 
     Returns
     -------
@@ -257,48 +381,72 @@ def island_centres(
     """
     if not radii:
         return []
+    centre = _canvas_centre() if centre is None else centre
+    island_gap = config_value("islandGap") if island_gap is None else island_gap
 
-    # First island is anchored at the given centre
-    centres: List[Tuple[float, float]] = [centre]
-
-    for i in range(1, len(radii)):
+    placed = placed or []
+    if placed:
+        centres: List[Tuple[float, float]] = [tuple(c) for c, _ in placed]
+        radii = [r for _, r in placed] + list(radii)
+    else:
+        # First island is anchored at the given centre
+        centres = [centre]
+    fixed = len(centres)
+
+    grid = SpatialGrid(min(radii) + island_gap)
+    remaining = defaultdict(int)        # radius -> islands still to place
+    for r in radii[fixed:]:
+        remaining[r] += 1
+    heaps = {r: [] for r in remaining}  # radius -> [(dist to hub, generation order, candidate)]
+
+    def add_candidates(i: int):
+        """Push the candidates island `i` creates for every radius still to come."""
+        ci, ri = centres[i], radii[i]
+        wanted = [r for r, left in remaining.items() if left]
+        if not wanted:
+            return
+        neighbours = [(k, radii[k], _dist(centres[k], ci))
+                      for k in grid.near(ci, ri + 2 * (max(wanted) + island_gap))]
+        for r_new in wanted:
+            heap = heaps[r_new]
+            aug_i = ri + r_new + island_gap
+
+            # Candidate tangential to *one* existing island, projected toward the hub
+            vx, vy = centre[0] - ci[0], centre[1] - ci[1]
+            v_len = math.hypot(vx, vy)
+            if v_len != 0:
+                scale = aug_i / v_len
+                cand = (ci[0] + vx * scale, ci[1] + vy * scale)
+                heapq.heappush(heap, (_dist(cand, centre), (0, i, 0, 0), cand))
+
+            # Candidates tangential to *two* existing islands
+            for k, rk, d in neighbours:
+                aug_k = rk + r_new + island_gap
+                if d > aug_i + aug_k or d < abs(aug_i - aug_k):
+                    continue
+                for m, cand in enumerate(_circle_intersections(centres[k], aug_k, ci, aug_i)):
+                    heapq.heappush(heap, (_dist(cand, centre), (1, k, i, m), cand))
+
+    for i in range(fixed):
+        grid.insert(i, centres[i], radii[i])
+        add_candidates(i)
+
+    for i in range(fixed, len(radii)):
         r_new = radii[i]
-        best_pos = None
-        best_dist = float("inf")
+        remaining[r_new] -= 1
+        heap = heaps[r_new]
 
-        # Convenience: augmented radii include mandatory gap
-        aug = [r + r_new + island_gap for r in radii[:i]]
+        # Closest valid candidate wins; ties go to the earliest generated
+        best_pos = None
+        blocked_by = -1
+        while heap:
+            cand = heap[0][2]
+            blocked_by = grid.blocker(cand, r_new, centres, radii, island_gap, blocked_by)
+            if blocked_by < 0:
+                best_pos = cand
+                break
+            heapq.heappop(heap)
 
-        # Candidates tangential to *one* existing island
-        for (cx, cy), aug_r in zip(centres, aug):
-            # Project along line centre→(cx, cy) inward toward the hub
-            vx, vy = centre[0] - cx, centre[1] - cy
-            v_len = math.hypot(vx, vy)
-            if v_len == 0:
-                # Existing island *is* the hub; skip – circle touch will
-                # be handled by two-circle candidates anyway
-                continue
-            scale = aug_r / v_len
-            cand = (cx + vx * scale, cy + vy * scale)
-
-            if _valid(cand, r_new, centres, radii[:i], island_gap):
-                d = _dist(cand, centre)
-                if d < best_dist:
-                    best_dist, best_pos = d, cand
-
-        # Candidates tangential to *two* existing islands
-        n_prev = len(centres)
-        for j in range(n_prev):
-            for k in range(j + 1, n_prev):
-                cA, cB = centres[j], centres[k]
-                rA, rB = aug[j], aug[k]
-
-                for cand in _circle_intersections(cA, rA, cB, rB):
-                    if _valid(cand, r_new, centres, radii[:i], island_gap):
-                        d = _dist(cand, centre)
-                        if d < best_dist:
-                            best_dist, best_pos = d, cand
-                            
         # Fallback — should rarely happen
         if best_pos is None:
             # Place on a ray to the right, just outside outermost ring
@@ -307,35 +455,29 @@ def island_centres(
             best_pos = (centre[0] + max_r + r_new + island_gap, centre[1])
 
         centres.append(best_pos)
+        grid.insert(i, best_pos, r_new)
+        add_candidates(i)
 
-    return centres
-
-def _valid(cand, r_new, centres, radii_so_far, gap) -> bool:
-    """
-    Helper for island_centres(): overlap / clearance test
-    True if `cand` is clear of all existing islands by at least `gap`.
-    """
-    for (px, py), r_old in zip(centres, radii_so_far):
-        if _dist(cand, (px, py)) < r_new + r_old + gap - 1e-6:
-            return False
-    return True
+    return centres[len(placed):]
 
 class Island:
     def __init__(
         self,
         radius: float,
-        tile_positions: list,
+        tile_positions: np.ndarray,
         centre: tuple,
         colour: str,
         tracks: list,
         genre: str, 
+        slots: list = None,
     ):
         self.radius = radius
-        self.tile_positions = tile_positions  # List of (x, y) for each tile
+        self.tile_positions = tile_positions  # (n, 2) array of (x, y) for each tile
         self.centre = centre                  # (x, y) of island centre
         self.colour = colour                  # Colour string (e.g. "#e6194b")
         self.tracks = tracks                  # List of track dicts
         self.genre = genre                  # List of track dicts
+        self.slots = slots if slots is not None else list(range(len(tracks)))  # hex template slot of each tile
 
     def __repr__(self):
         return (
@@ -345,80 +487,470 @@ class Island:
             f"tracks={len(self.tracks)})"
         )
 
-def build_islands_db(genre_groups: defaultdict) -> List[Island]:
+# INCREMENTAL LAYOUT
+LAYOUT_VERSION = 1
+DEFAULT_LAYOUT_PATH = Path(__file__).parent.parent / "data" / "cache" / "layout.json"
+MAX_FRAGMENTATION = 0.3   # share of the previous layout's island area left empty before a re-pack
+
+def load_layout(path: Path):
+    """Previous layout saved by save_layout(), or None if there is none (or it is from another version)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open("r", encoding="utf-8") as f:
+        layout = json.load(f)
+    return layout if layout.get("version") == LAYOUT_VERSION else None
+
+def save_layout(islands: List["Island"], path: Path, registry: GenreRegistry = None):
+    """
+    Save island centres, radii and the slot of every track, for the next incremental layout.
+    Islands are keyed by `registry.key()` of their genre (default: a registry with the
+    config aliases), so a later run that first sees another spelling finds them again.
+    """
+    registry = registry or _genre_registry()
+    layout = {
+        "version": LAYOUT_VERSION,
+        "islands": {
+            registry.key(island.genre): {
+                "centre": list(island.centre),
+                "radius": island.radius,
+                "slots": {generate_id(track): slot for track, slot in zip(island.tracks, island.slots)},
+            }
+            for island in islands
+        },
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(layout, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _keep_slots(tracks: list, previous_slots: dict) -> List[int]:
+    """
+    Helper for incremental_layout(): slot of every track, keeping the slot a track had
+    before and giving new tracks the lowest free ones (holes first, then the next ring).
+    """
+    slots, taken = [], set()
+    for track in tracks:
+        slot = previous_slots.get(generate_id(track))
+        if slot in taken:           # duplicate id: only the first keeps the old slot
+            slot = None
+        slots.append(slot)
+        taken.add(slot)
+    free = (s for s in itertools.count() if s not in taken)
+    return [next(free) if slot is None else slot for slot in slots]
+
+def incremental_layout(
+    genre_groups: defaultdict,
+    previous: dict,
+    centre: Tuple[float, float] = None,
+    island_gap: float = None,
+    max_fragmentation: float = MAX_FRAGMENTATION,
+    registry: GenreRegistry = None,
+):
+    """
+    Lay out islands on top of a previous layout (see load_layout()) instead of from scratch.
+    Genres are matched to the saved islands by `registry.key()`, whatever their spelling.
+
+    Islands that still fit their old circle keep centre, radius and every track's slot;
+    new tracks fill free slots.  An island that outgrows its circle keeps its centre if
+    the bigger circle still clears its neighbours, otherwise it is moved (tiles and all).
+    New and moved islands are packed around the fixed ones by island_centres().
+
+    Returns {genre: (radius, centre, slots)}, or None when the layout has become too
+    fragmented – more than `max_fragmentation` of the previous island area is left
+    empty by removed, shrunk or moved islands – and a full re-pack is due.
+    """
+    centre = _canvas_centre() if centre is None else centre
+    island_gap = config_value("islandGap") if island_gap is None else island_gap
+    registry = registry or _genre_registry()
+    # Re-keyed on load, which also reads layouts saved under display names
+    previous = {registry.key(genre): old for genre, old in previous["islands"].items()}
+    keys = {genre: registry.key(genre) for genre in genre_groups}
+    layout, fixed, grown, movable = {}, [], [], []
+    for genre, tracks in genre_groups.items():
+        old = previous.get(keys[genre])
+        if old is None:
+            layout[genre] = (island_radius(len(tracks)), None, list(range(len(tracks))))
+            movable.append(genre)
+            continue
+        slots = _keep_slots(tracks, old["slots"])
+        needed = island_radius(max(slots) + 1)
+        layout[genre] = (max(old["radius"], needed), tuple(old["centre"]), slots)
+        (fixed if needed <= old["radius"] else grown).append(genre)
+
+    for genre in grown:
+        radius, centre_pos, slots = layout[genre]
+        clear = all(
+            _dist(centre_pos, layout[g][1]) >= radius + layout[g][0] + island_gap - 1e-6
+            for g in fixed + grown if g != genre and layout[g][1] is not None
+        )
+        if clear:
+            fixed.append(genre)
+        else:
+            layout[genre] = (radius, None, slots)
+            movable.append(genre)
+
+    # Area (∝ r²) of the previous layout that is now empty
+    fixed_keys = {keys[genre] for genre in fixed}
+    wasted = sum(old["radius"] ** 2 for key, old in previous.items() if key not in fixed_keys)
+    wasted += sum(layout[g][0] ** 2 - island_radius(len(genre_groups[g])) ** 2 for g in fixed)
+    total = sum(old["radius"] ** 2 for old in previous.values())
+    if total and wasted / total > max_fragmentation:
+        return None
+
+    order = {genre: i for i, genre in enumerate(genre_groups)}
+    movable.sort(key=order.get)
+    placed = [(layout[g][1], layout[g][0]) for g in fixed]
+    for genre, centre_pos in zip(movable, island_centres([layout[g][0] for g in movable], centre, island_gap, placed)):
+        layout[genre] = (layout[genre][0], centre_pos, layout[genre][2])
+    return layout
+
+# GENRE-PROXIMITY LAYOUT
+ISLAND_LAYOUTS = ("packed", "similarity")
+
+def layout_centres(
+    radii: List[float],
+    island_genres: List[str],
+    registry: GenreRegistry,
+    island_layout: str = None,
+    playlists: list = None,
+    layout_report: bool = False,
+) -> List[Tuple[float, float]]:
+    """
+    Centres for a full (not incremental) layout of the islands of `island_genres`.
+
+    `island_layout` (default: config islandLayout, else "packed") is either "packed",
+    island_centres() packing around the canvas centre, or "similarity", where genres that
+    share tracks or `playlists` are placed next to each other (see genre_layout).
+
+    For the similarity layout, or any layout with `layout_report`, the layout's quality
+    (genre_layout.layout_quality()) is printed and recorded as gauges of the "layout" stage
+    of instrument.metrics when `registry` holds the tracks' genres. A packed layout without
+    `layout_report` does not build the similarity graph at all.
+    """
+    island_layout = island_layout or config_value("islandLayout", "packed")
+    if island_layout not in ISLAND_LAYOUTS:
+        raise ValueError(f"unknown island layout {island_layout!r}, expected one of {ISLAND_LAYOUTS}")
+    if island_layout != "similarity" and not layout_report:
+        return island_centres(radii)
+    edges = genre_similarity(registry, island_genres, playlists)
+    if island_layout == "similarity":
+        centres = similarity_layout(radii, edges, _canvas_centre(), config_value("islandGap"))
+    else:
+        centres = island_centres(radii)
+
+    if len(edges[0]):
+        quality = layout_quality(centres, radii, edges)
+        for name, value in quality.items():
+            metrics.gauge("layout", name, value)
+        print(f"🧭 {island_layout.capitalize()} layout: similar genres {quality['similar_gap_ratio']:.2f}x the "
+              f"average gap apart, {quality['neighbour_precision']:.0%} of them among the nearest islands, "
+              f"density {quality['density']:.2f}")
+    return centres
+
+def build_islands_db(
+    genre_groups: defaultdict,
+    registry: GenreRegistry = None,
+    previous_layout: dict = None,
+    max_fragmentation: float = MAX_FRAGMENTATION,
+    island_layout: str = None,
+    playlists: list = None,
+    layout_report: bool = False,
+) -> List[Island]:
     """
     Build a list of Island objects from genre groups.
     
     Args:
         genre_groups (defaultdict): Dictionary where keys are genres and values are lists of tracks.
+        registry (GenreRegistry): Registry the groups were built with, used for island colours.
+        previous_layout (dict): Layout from load_layout(). If given, existing islands and tiles
+            stay where they were (see incremental_layout()) unless the layout is more than
+            `max_fragmentation` fragmented, in which case everything is re-packed.
+        island_layout (str): "packed" or "similarity" for a full layout, see layout_centres().
+            Incremental layouts always pack new and moved islands around the others.
+        playlists (list): Playlists (lists of track dicts) that link genres for the
+            "similarity" layout.
+        layout_report (bool): Score a packed layout too, see layout_centres().
     
     Returns:
         List[Island]: List of Island objects with their properties set.
     """
+    if registry is None:
+        registry = _genre_registry()
+        for genre in genre_groups:
+            registry.intern(genre)
+        if layout_report or (island_layout or config_value("islandLayout", "packed")) == "similarity":
+            # The similarity graph needs every genre of every track
+            for tracks in genre_groups.values():
+                for track in tracks:
+                    registry.add_track(track.get("genre"))
+
+    layout = None
+    if previous_layout is not None:
+        layout = incremental_layout(genre_groups, previous_layout, max_fragmentation=max_fragmentation,
+                                    registry=registry)
+        if layout is None:
+            print("🧭 Layout too fragmented, re-packing all islands")
+
     islands = []
-    radii = [island_radius(len(tracks)) for tracks in genre_groups.values()]
-    centres = island_centres(radii, centre=(CENTRE_X, CENTRE_Y), island_gap=ISLAND_GAP)
-    tile_positions = [island_tile_positions(len(tracks), centre, TILE_SIZE, INNER_GAP) for tracks, centre in zip(genre_groups.values(), centres)]
+    counts = [len(tracks) for tracks in genre_groups.values()]
+    if layout is None:
+        radii = [island_radius(n) for n in counts]
+        centres = layout_centres(radii, list(genre_groups), registry, island_layout, playlists, layout_report)
+        slots = [list(range(n)) for n in counts]
+    else:
+        radii, centres, slots = (list(column) for column in zip(*layout.values())) if layout else ([], [], [])
+    flat_slots = [slot for island_slots in slots for slot in island_slots]
+    all_positions = all_tile_positions(counts, centres, slots=flat_slots)
+    bounds = np.cumsum([0] + counts)
+    tile_positions = [all_positions[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
     
     assert len(radii) == len(centres) == len(tile_positions) == len(genre_groups), "Mismatch in number of radii, centres, and tile positions"
 
-    for (genre, tracks), (radius, centre, positions) in zip(genre_groups.items(), zip(radii, centres, tile_positions)):
-        colour = get_genre_colour(genre, genre_groups)
-        island = Island(radius, positions, centre, colour, tracks, genre)
+    for (genre, tracks), (radius, centre, positions, island_slots) in zip(genre_groups.items(), zip(radii, centres, tile_positions, slots)):
+        colour = registry.colour(registry.lookup(genre))
+        island = Island(radius, positions, centre, colour, tracks, genre, island_slots)
         islands.append(island)
     
     return islands
 
 # MAIN FUNCTION
-def main(input_json: Path, output_json: Path):
-    with input_json.open("r", encoding="utf-8") as f:
-        raw_tracks = json.load(f)
+def main(
+    input_json: Path,
+    output_json: Path,
+    youtube_cache_path: Path = DEFAULT_CACHE_PATH,
+    youtube_concurrency: int = 8,
+    youtube_rate: float = 5.0,
+    chunk_dir: Path = None,
+    columnar_path: Path = None,
+    lod_path: Path = None,
+    layout_path: Path = None,
+    repack: bool = False,
+    neighbours_path: Path = None,
+    neighbours_k: int = DEFAULT_K,
+    search_path: Path = None,
+    island_layout: str = None,
+    playlists_dir: Path = None,
+    atlas_path: Path = None,
+    artwork_dir: Path = DEFAULT_ARTWORK_DIR,
+    layout_report: bool = False,
+):
+    """
+    Prepare the frontend track list. YouTube lookups are cached in `youtube_cache_path`
+    (pass None to always hit YouTube) and resolved `youtube_concurrency` at a time,
+    at most `youtube_rate` requests per second.
+
+    With `chunk_dir`, tracks are written there as quadtree chunk files plus a manifest
+    (see chunks.write_chunked_output) instead of one `output_json`. With `columnar_path`,
+    the compact columnar encoding (see columnar.encode_columnar) is written there too,
+    with precompressed .gz/.br variants. With `lod_path`, level-of-detail island summaries
+    for zoomed-out rendering (see lod.build_lod) are written there.
+
+    With `layout_path`, the layout is incremental: islands and tiles saved there by the
+    previous run keep their positions (see incremental_layout), and the new layout is
+    saved back. `repack` ignores the saved layout and packs everything from scratch.
+
+    With `neighbours_path`, the `neighbours_k` nearest tracks of every track on the canvas
+    are written there for auto-play (see neighbours.NeighbourIndex). With `search_path`,
+    an artist/title/album search index (see search.SearchIndex) is written there.
+
+    `island_layout` picks "packed" or "similarity" island placement (see layout_centres());
+    the playlists in `playlists_dir` (from `cli.py import-rekordbox --all-playlists`) also link genres.
+    `layout_report` scores a packed layout as well (the similarity layout always is).
+
+    With `atlas_path`, the album art thumbnails of the tracks (cached in `artwork_dir` by
+    `cli.py scan --artwork`) are packed into sprite sheets next to it, and the atlas
+    manifest mapping each track's "artwork" hash to its sheet and UVs is written there
+    (see artwork.build_atlases).
+
+    Each step is timed as a stage of instrument.metrics (load, genres, layout, youtube,
+    tracks, write, lod, columnar, neighbours, search, atlas).
+    """
+    with metrics.stage("load"):
+        with input_json.open("r", encoding="utf-8") as f:
+            raw_tracks = json.load(f)
+    metrics.count("load", "tracks", len(raw_tracks))
 
     # Filter out tracks with no genre
     # raw_tracks = [track for track in raw_tracks if track.get("genre") is not None]
 
-    genre_groups = get_genre_groups(raw_tracks)
-
-    islands_db = build_islands_db(genre_groups)
+    with metrics.stage("genres"):
+        genres = _genre_registry()
+        genre_groups = get_genre_groups(raw_tracks, genres)
+    metrics.count("genres", "genres", len(genres))
+
+    with metrics.stage("layout"):
+        previous_layout = load_layout(layout_path) if layout_path and not repack else None
+        playlists = load_playlists(playlists_dir) if playlists_dir else None
+        islands_db = build_islands_db(genre_groups, genres, previous_layout,
+                                      island_layout=island_layout, playlists=playlists,
+                                      layout_report=layout_report)
+        if layout_path:
+            save_layout(islands_db, layout_path, genres)
+    metrics.count("layout", "islands", len(islands_db))
 
     prepared_tracks = []
+    youtube_cache = YouTubeCache(youtube_cache_path) if youtube_cache_path else None
+
+    all_tracks = [track for island in islands_db for track in island.tracks]
+    with metrics.stage("youtube"), tqdm(desc="🎬 Resolving YouTube previews", unit=" lookups") as bar:
+        youtube_urls = iter(resolve_youtube_urls(
+            all_tracks, youtube_cache, concurrency=youtube_concurrency, rate=youtube_rate, progress=bar.update
+        ))
+
+    with metrics.stage("tracks"):
+        for island in tqdm(islands_db, desc="Processing islands"):
+            tile_xy = island.tile_positions.tolist()
+            for i, track in enumerate(tqdm(island.tracks, desc=f"Tracks in {island.genre}", leave=False)):
+                prepared = prepare_track(track, tile_xy[i][0], tile_xy[i][1], island.colour, next(youtube_urls))
+                prepared_tracks.append(prepared)
+    metrics.count("tracks", "tracks", len(prepared_tracks))
+
+    if youtube_cache is not None:
+        print(f"🎬 YouTube cache: {youtube_cache.hits} hits, {youtube_cache.misses} lookups")
+        youtube_cache.close()
+
+    with metrics.stage("write"):
+        if chunk_dir is not None:
+            manifest = write_chunked_output(prepared_tracks, chunk_dir, config_value("tileSize"))
+            print(f"🧩 Wrote {len(manifest['chunks'])} chunks to {chunk_dir}")
+        else:
+            output_json.parent.mkdir(parents=True, exist_ok=True)
+            with output_json.open("w", encoding="utf-8") as f:
+                json.dump(prepared_tracks, f, indent=2, ensure_ascii=False)
+
+    if lod_path is not None:
+        with metrics.stage("lod"):
+            lod = build_lod(islands_db, config_value("tileSize") + config_value("tileGap"))
+            write_lod(lod, lod_path)
+        print(f"🔭 Wrote {len(lod['levels'])} detail levels for {len(lod['islands'])} islands to {lod_path}")
+
+    if columnar_path is not None:
+        with metrics.stage("columnar"):
+            sizes = write_columnar_output(prepared_tracks, columnar_path)
+        print("📦 Columnar output: " + ", ".join(f"{name} {size / 1024:.0f} KB" for name, size in sizes.items()))
+
+    if neighbours_path is not None:
+        with metrics.stage("neighbours"):
+            neighbours = NeighbourIndex.from_tracks(prepared_tracks, neighbours_k)
+            neighbours.write(neighbours_path)
+        print(f"🧲 Wrote the {neighbours.k} nearest neighbours of every track to {neighbours_path}")
+
+    if search_path is not None:
+        with metrics.stage("search"):
+            search = SearchIndex.build(prepared_tracks)
+            size = search.write(search_path)
+        metrics.count("search", "terms", len(search.terms))
+        print(f"🔎 Wrote a search index of {len(search.terms)} terms ({size / 1024:.0f} KB) to {search_path}")
+
+    if atlas_path is not None and not artwork_available():
+        print("⚠️ Pillow is not installed: no album art atlases (pip install pillow)")
+    elif atlas_path is not None:
+        with metrics.stage("atlas"):
+            atlas = build_atlases((t.get("artwork") for t in prepared_tracks), artwork_dir, atlas_path)
+        print(f"🖼️ Packed {len(atlas['uv'])} album covers into {len(atlas['sheets'])} atlas sheets ({atlas_path})")
 
-    for island in tqdm(islands_db, desc="Processing islands"):
-        for i, track in enumerate(tqdm(island.tracks, desc=f"Tracks in {island.genre}", leave=False)):
-            decade = estimate_decade(track.get("date"))
-            youtube_url = get_youtube_url(track) if track.get("artist") and track.get("title") else None
-            prepared = {
-                "id": generate_id(track),
-                "title": track.get("title", "Unknown Title"),
-                "artist": track.get("artist", "Unknown Artist"),
-                "album": track.get("album", ""),
-                "genre": track.get("genre"),
-                "decade": decade,
-                "date": track.get("date"),
-                "tracknumber": track.get("tracknumber"),
-                "path": track.get("path"),
-                "x": round(island.tile_positions[i][0], 2),
-                "y": round(island.tile_positions[i][1], 2),
-                "colour": island.colour,
-                "preview_url": youtube_url,
-                "buy_url": f"https://bandcamp.com/search?q={track.get('artist', '')}+{track.get('title', '')}".replace(" ", "+"),
-            }
-            prepared_tracks.append(prepared)
-
-    output_json.parent.mkdir(parents=True, exist_ok=True)
-    with output_json.open("w", encoding="utf-8") as f:
-        json.dump(prepared_tracks, f, indent=2, ensure_ascii=False)
-    
     print(f"Prepared {len(prepared_tracks)} tracks across {len(islands_db)} islands.")
 
-if __name__ == "__main__":
-    base_dir = Path(__file__).resolve().parents[1]
-    input_json = base_dir / "data" / "json" / "output.json"
-    output_json = base_dir / "frontend" / "public" / "prepared.json"
+# STREAMING PIPELINE
+STREAM_BATCH = 500   # tracks resolved on YouTube (and held in memory) at a time
+
+def prepare_stream(
+    input_ndjson: Path,
+    output_ndjson: Path,
+    youtube_cache_path: Path = DEFAULT_CACHE_PATH,
+    youtube_concurrency: int = 8,
+    youtube_rate: float = 5.0,
+    resolve_previews: bool = True,
+    batch_size: int = STREAM_BATCH,
+    island_layout: str = None,
+    playlists_dir: Path = None,
+    layout_report: bool = False,
+) -> int:
+    """
+    Streaming counterpart of main(): NDJSON tracks in (e.g. from scan_library with an
+    .ndjson output), NDJSON prepared tracks out, written as they are produced.
+
+    The input is read twice. The first pass only interns genres, which gives the track
+    count of every island; the layout is computed from those counts. The second pass
+    places each track on the next free tile of its island, resolves previews
+    `batch_size` tracks at a time and writes them out. Apart from that batch, memory
+    holds the genre registry and one (x, y) per track, whatever the library size, and a
+    crash leaves every track written so far in `output_ndjson`.
+
+    Coordinates and colours match main() (for the same `island_layout` and `playlists_dir`);
+    records come out in input order rather than island by island. Returns the number of
+    tracks written.
+
+    The passes are timed as the "genres", "layout" and "tracks" stages of instrument.metrics;
+    YouTube lookups happen inside "tracks".
+    """
+    with metrics.stage("genres"):
+        genres = _genre_registry()
+        for track in tqdm(iter_ndjson(input_ndjson), desc="🏷️ Counting genres", unit=" tracks"):
+            genres.add_track(track.get("genre"))
+        primary = genres.primary_ids()
+    metrics.count("genres", "genres", len(genres))
+
+    with metrics.stage("layout"):
+        # Islands in order of first appearance, as get_genre_groups() orders them
+        genre_ids, first_seen = np.unique(primary, return_index=True)
+        islands = genre_ids[np.argsort(first_seen)]
+        counts = np.bincount(primary, minlength=len(genres))[islands]
+        radii = [island_radius(int(n)) for n in counts]
+        playlists = load_playlists(playlists_dir) if playlists_dir else None
+        centres = layout_centres(radii, [genres.names[g] for g in islands.tolist()], genres, island_layout,
+                                 playlists, layout_report)
+        positions = all_tile_positions(counts, centres)
+        next_tile = np.zeros(len(genres), dtype=np.int64)   # genre id -> index of its next free tile
+        next_tile[islands] = np.cumsum(counts) - counts
+    metrics.count("layout", "islands", len(islands))
+    print(f"🗺️ Laid out {len(islands)} islands for {len(primary)} tracks")
+
+    youtube_cache = YouTubeCache(youtube_cache_path) if resolve_previews and youtube_cache_path else None
+    # One pooled session and one rate limit for every batch
+    session = make_session(youtube_concurrency) if resolve_previews else None
+    limiter = TokenBucket(youtube_rate, burst=youtube_concurrency)
+
+    def place(batch):
+        if resolve_previews:
+            urls = resolve_youtube_urls([track for _, track in batch], youtube_cache,
+                                        concurrency=youtube_concurrency, rate=youtube_rate,
+                                        session=session, limiter=limiter)
+        else:
+            urls = [None] * len(batch)
+        for (n, track), url in zip(batch, urls):
+            gid = primary[n]
+            x, y = positions[next_tile[gid]].tolist()
+            next_tile[gid] += 1
+            yield prepare_track(track, x, y, genres.colour(int(gid)), url)
+
+    def prepared():
+        batch = []
+        for n, track in enumerate(tqdm(iter_ndjson(input_ndjson), total=len(primary), desc="Processing tracks")):
+            batch.append((n, track))
+            if len(batch) >= batch_size:
+                yield from place(batch)
+                batch = []
+        yield from place(batch)
+
+    try:
+        with metrics.stage("tracks"):
+            count = write_ndjson(prepared(), output_ndjson)
+        metrics.count("tracks", "tracks", count)
+    finally:
+        if session is not None:
+            session.close()
+        if youtube_cache is not None:
+            print(f"🎬 YouTube cache: {youtube_cache.hits} hits, {youtube_cache.misses} lookups")
+            youtube_cache.close()
+    print(f"Prepared {count} tracks across {len(islands)} islands.")
+    return count
 
-    main(input_json, output_json)
-    print(f"✅ Metadata prepared and saved to {output_json}")
-    # check_layout()  # Optional: visualize the layout after preparation
-    # print("✅ Layout checked.")
-    # print("Done.")
+if __name__ == "__main__":
+    # Same as `python backend/cli.py prepare ...`, which owns the options
+    import cli
 
+    cli.main(["prepare", *sys.argv[1:]])
@@ -1,129 +1,682 @@
+import itertools
 import os
+import re
 import json
+import hashlib
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from mutagen import File
-from mutagen.id3 import ID3, ID3NoHeaderError
+from mutagen import File, MutagenError
+from mutagen.aiff import AIFF
+from mutagen.flac import FLAC
+from mutagen.id3 import ID3Tags
+from mutagen.mp3 import MP3
+from mutagen.mp4 import MP4, MP4Tags
+from mutagen.oggvorbis import OggVorbis
+from mutagen.wave import WAVE
 from tqdm import tqdm
 
+from artwork import artwork_available, embedded_picture, store_artwork
+from instrument import metrics
+from ndjson import write_ndjson
+
 SUPPORTED_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.wav', '.aiff', '.aif', '.ogg')
+TAG_FIELDS = ('title', 'artist', 'album', 'genre', 'date', 'tracknumber', 'bpm')
 
-def extract_metadata(file_path):
-    audio = File(str(file_path), easy=True)
-
-    metadata = {
-        'path': str(file_path),
-        'title': None,
-        'artist': None,
-        'album': None,
-        'genre': None,
-        'date': None,
-        'tracknumber': None,
-    }
+# The format mutagen.File() would settle on for each extension, so the file is parsed
+# straight away instead of being scored against every format mutagen knows
+FORMATS = {'.mp3': MP3, '.flac': FLAC, '.m4a': MP4, '.wav': WAVE, '.aiff': AIFF, '.aif': AIFF, '.ogg': OggVorbis}
 
-    if audio:
-        metadata.update({
-            'title': audio.get('title', [None])[0],
-            'artist': audio.get('artist', [None])[0],
-            'album': audio.get('album', [None])[0],
-            'genre': audio.get('genre', [None])[0],
-            'date': audio.get('date', [None])[0],
-            'tracknumber': audio.get('tracknumber', [None])[0],
-        })
-
-    # Fallback for AIFF/ID3 tags
-    if file_path.suffix.lower() in ['.aiff', '.aif']:
-        try:
-            id3 = ID3(str(file_path))
-            metadata['title'] = metadata['title'] or getattr(id3.get("TIT2", None), "text", [None])[0]
-            metadata['artist'] = metadata['artist'] or getattr(id3.get("TPE1", None), "text", [None])[0]
-            metadata['album'] = metadata['album'] or getattr(id3.get("TALB", None), "text", [None])[0]
-            metadata['genre'] = metadata['genre'] or getattr(id3.get("TCON", None), "text", [None])[0]
-            metadata['date'] = metadata['date'] or getattr(id3.get("TDRC", None), "text", [None])[0]
-            metadata['tracknumber'] = metadata['tracknumber'] or getattr(id3.get("TRCK", None), "text", [None])[0]
-        except ID3NoHeaderError:
-            pass  # No ID3 header, continue
+# Native tag keys per tag format; Vorbis comments (FLAC, Ogg) use the field names themselves
+ID3_FRAMES = {'title': 'TIT2', 'artist': 'TPE1', 'album': 'TALB', 'genre': 'TCON', 'date': 'TDRC',
+              'tracknumber': 'TRCK', 'bpm': 'TBPM'}
+MP4_ATOMS = {'title': '\xa9nam', 'artist': '\xa9ART', 'album': '\xa9alb', 'genre': '\xa9gen', 'date': '\xa9day',
+             'tracknumber': 'trkn', 'bpm': 'tmpo'}
 
-    return metadata
+def _open_audio(file_path: Path):
+    """
+    Parse stream info and tags of `file_path` from a single open file. A file whose
+    contents do not match its extension is handed to mutagen.File() on the same handle.
+    """
+    with open(file_path, "rb") as f:
+        kind = FORMATS.get(file_path.suffix.lower())
+        if kind is not None:
+            try:
+                return kind(f)
+            except MutagenError:
+                f.seek(0)
+        return File(f)
+
+def _id3_value(tags, field):
+    frame = tags.get(ID3_FRAMES[field])
+    if frame is None or not frame.text:
+        return None
+    if field == 'genre':
+        # "(17)" and "17" are ID3v1 genre numbers: TCON.genres spells them out
+        return next(iter(frame.genres), None)
+    return str(frame.text[0])
+
+def _mp4_value(tags, field):
+    values = tags.get(MP4_ATOMS[field])
+    if not values:
+        return None
+    if field == 'tracknumber':
+        number, total = values[0]
+        return f"{number}/{total}" if total else str(number)
+    return str(values[0])
+
+def _tag_values(tags) -> dict:
+    if tags is None:
+        return {}
+    if isinstance(tags, ID3Tags):
+        value = _id3_value
+    elif isinstance(tags, MP4Tags):
+        value = _mp4_value
+    else:
+        def value(tags, field):
+            return next(iter(tags.get(field) or ()), None)
+    return {field: value(tags, field) for field in TAG_FIELDS}
+
+def _bpm(text):
+    try:
+        bpm = float(str(text).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    return round(bpm, 2) if bpm > 0 else None
+
+def extract_metadata(file_path, artwork_dir: Path = None):
+    """
+    Tags and stream info of one audio file, read from a single open: title, artist, album,
+    genre, date, tracknumber and bpm from the file's own tag format (ID3 frames, Vorbis
+    comments or MP4 atoms), and length (seconds), bitrate (kbps) and sample_rate (Hz) from
+    the stream headers. Fields the file lacks are None; raises for files mutagen cannot parse.
+
+    With `artwork_dir`, the embedded cover is stored in that thumbnail cache (see
+    artwork.store_artwork) and its hash recorded as "artwork" (None without a cover).
+    """
+    file_path = Path(file_path)
+    audio = _open_audio(file_path)
+
+    metadata = {'path': str(file_path), **dict.fromkeys(TAG_FIELDS),
+                'length': None, 'bitrate': None, 'sample_rate': None}
+    if artwork_dir is not None:
+        metadata['artwork'] = None
+    if audio is None:
+        return metadata
 
-def scan_music_folder(root_dir: Path):
-    music_data = []
-    file_paths = []
+    metadata.update(_tag_values(audio.tags))
+    metadata['bpm'] = _bpm(metadata['bpm'])
+    info = audio.info
+    if getattr(info, 'length', None):
+        metadata['length'] = round(info.length, 3)
+    if getattr(info, 'bitrate', None):
+        metadata['bitrate'] = round(info.bitrate / 1000)
+    metadata['sample_rate'] = getattr(info, 'sample_rate', None) or None
+    if artwork_dir is not None:
+        metadata['artwork'] = store_artwork(embedded_picture(audio), artwork_dir)
+    return metadata
 
-    for dirpath, _, filenames in os.walk(root_dir):
-        for file in filenames:
-            if file.lower().endswith(SUPPORTED_EXTENSIONS):
-                file_paths.append(Path(dirpath) / file)
+def _iter_audio_files(root_dir: Path, errors: list = None):
+    """
+    Walk `root_dir` and yield (path, stat) for every supported audio file.
+    Uses os.scandir so the stat comes from the directory listing where the OS allows it.
 
-    for file_path in tqdm(file_paths, desc="📦 Scanning files"):
+    Entries that cannot be stat'ed (dangling symlinks, files deleted during the walk) are
+    skipped; with `errors`, they are appended to it as (path, message) like read_metadata()'s.
+    """
+    stack = [str(root_dir)]
+    while stack:
+        current = stack.pop()
         try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name)
+        except (PermissionError, FileNotFoundError):
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                stat_result = entry.stat()
+            except OSError as e:
+                metrics.count("scan", "errors")
+                if errors is not None:
+                    errors.append((entry.path, f"{type(e).__name__}: {e}"))
+                continue
+            yield Path(entry.path), stat_result
+        stack.extend(reversed(subdirs))
+
+def _file_signature(stat_result) -> list:
+    """(size, mtime, inode) used to decide whether a file needs re-reading."""
+    return [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino]
+
+def iter_metadata(file_paths, workers: int = 1, executor: str = "thread", total: int = None,
+                  artwork_dir: Path = None):
+    """
+    Run extract_metadata over `file_paths` (any iterable, consumed lazily), optionally on a
+    worker pool, and yield (path, metadata, error) in input order as results come in.
+
+    `metadata` is None and `error` a "Type: message" string for files that could not be read.
+    Only a few batches per worker are ever in flight or waiting to be yielded, so memory
+    does not grow with the number of files. `total` only sizes the progress bar.
+    `artwork_dir` is passed on to extract_metadata().
+
+    Files read and failed are counted under the "scan" stage of instrument.metrics, which
+    also keeps the slowest files.
+    """
+    if workers <= 1:
+        for file_path in tqdm(file_paths, desc="📦 Scanning files", total=total):
+            meta, error, seconds = _extract_one(file_path, artwork_dir)
+            _record_file(file_path, error, seconds)
+            yield file_path, meta, error
+        return
+
+    if executor == "thread":
+        pool_cls = ThreadPoolExecutor
+    elif executor == "process":
+        pool_cls = ProcessPoolExecutor
+    else:
+        raise ValueError("executor must be 'thread' or 'process'")
+
+    # Processes pay a pickling round-trip per task, so hand them files in batches
+    batch_size = 1 if executor == "thread" else 64
+    file_paths = iter(file_paths)
+
+    # Bounded work queue: keep a few batches per worker in flight (or finished but waiting
+    # for an earlier batch) instead of submitting everything at once
+    max_pending = workers * 4
+    with pool_cls(max_workers=workers) as pool, tqdm(total=total, desc="📦 Scanning files") as bar:
+        pending = {}    # future -> (sequence number, batch)
+        finished = {}   # sequence number -> (batch, results), waiting for their turn
+        submitted = next_out = 0
+
+        def submit_next():
+            nonlocal submitted
+            batch = list(itertools.islice(file_paths, batch_size))
+            if batch:
+                pending[pool.submit(_extract_batch, batch, artwork_dir)] = (submitted, batch)
+                submitted += 1
+
+        for _ in range(max_pending):
+            submit_next()
+
+        while pending or finished:
+            if next_out not in finished:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    seq, batch = pending.pop(future)
+                    finished[seq] = (batch, future.result())
+                continue
+            batch, results = finished.pop(next_out)
+            next_out += 1
+            bar.update(len(batch))
+            submit_next()
+            for file_path, (meta, error, seconds) in zip(batch, results):
+                _record_file(file_path, error, seconds)
+                yield file_path, meta, error
+
+def read_metadata(file_paths: list, workers: int = 1, executor: str = "thread", artwork_dir: Path = None):
+    """
+    Run extract_metadata over `file_paths`, optionally on a worker pool.
+
+    Args:
+        file_paths (list of Path): files to read.
+        workers (int): pool size; 1 reads serially in the calling thread.
+        executor (str): "thread" for I/O-bound sources (network shares, USB drives),
+            "process" for CPU-bound tag parsing on fast local disks.
+        artwork_dir (Path): thumbnail cache for embedded covers; None skips album art.
+
+    Returns:
+        (results, errors): `results` is aligned with `file_paths` (None where reading failed),
+        `errors` is a list of (path, message) in input order.
+    """
+    results, errors = [], []
+    for file_path, meta, error in iter_metadata(file_paths, workers, executor, len(file_paths), artwork_dir):
+        results.append(meta)
+        if error is not None:
+            errors.append((str(file_path), error))
+    return results, errors
+
+def _extract_one(file_path, artwork_dir: Path = None) -> tuple:
+    """extract_metadata() returning (metadata, error, seconds) instead of raising."""
+    start = time.perf_counter()
+    try:
+        if artwork_dir is None:
             meta = extract_metadata(file_path)
-            music_data.append(meta)
-        except Exception as e:
-            print(f"⚠️ Skipping {file_path.name} due to error: {e}")
-    return music_data
+        else:
+            meta = extract_metadata(file_path, artwork_dir)
+        error = None
+    except Exception as e:
+        meta, error = None, f"{type(e).__name__}: {e}"
+    return meta, error, time.perf_counter() - start
+
+def _extract_batch(file_paths: list, artwork_dir: Path = None) -> list:
+    """Helper for read_metadata(): worker-side loop returning (metadata, error, seconds) per file."""
+    return [_extract_one(file_path, artwork_dir) for file_path in file_paths]
+
+def _record_file(file_path, error, seconds: float):
+    metrics.count("scan", "files")
+    if error is not None:
+        metrics.count("scan", "errors")
+    metrics.observe("scan", file_path, seconds)
+
+def _report_errors(errors: list, limit: int = 5):
+    if not errors:
+        return
+    print(f"⚠️ Skipped {len(errors)} file(s) that could not be read:")
+    for path, message in errors[:limit]:
+        print(f"   {path}: {message}")
+    if len(errors) > limit:
+        print(f"   … and {len(errors) - limit} more")
+
+MANIFEST_VERSION = 2   # 2: length, bitrate, sample_rate and bpm
+
+def load_scan_manifest(manifest_path: Path, root_dir: Path = None) -> dict:
+    """
+    Load a scan manifest ({path: {"sig": [...], "metadata": {...}}}).
+    Returns an empty manifest if the file is missing, unreadable or was built for another root.
+    """
+    if not manifest_path or not manifest_path.exists():
+        return {}
+    try:
+        with manifest_path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable scan manifest {manifest_path}: {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    if root_dir is not None and manifest.get("root") != str(root_dir):
+        print(f"⚠️ Scan manifest was built for {manifest.get('root')}, starting fresh.")
+        return {}
+    return manifest.get("files", {})
+
+def save_scan_manifest(files: dict, manifest_path: Path, root_dir: Path = None):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(manifest_path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "root": str(root_dir) if root_dir is not None else None,
+            "files": files,
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+def rescan_music_folder(root_dir: Path, manifest_path: Path, workers: int = 1, executor: str = "thread",
+                        artwork_dir: Path = None):
+    """
+    Incrementally scan `root_dir` against the manifest at `manifest_path`.
+
+    Only files whose (size, mtime, inode) changed since the last run are opened;
+    everything else is served from the manifest, and deleted files are dropped. With
+    `artwork_dir`, files last read without album art are read again once.
+
+    Returns:
+        (music_data, changes, errors) where changes counts "added", "changed", "removed"
+        and "unchanged" files, and errors lists (path, message) for files that could not be read.
+    """
+    cached = load_scan_manifest(manifest_path, root_dir)
+    files = {}
+    order = []
+    to_read = []
+    changes = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    walk_errors = []
+
+    for file_path, stat_result in _iter_audio_files(root_dir, walk_errors):
+        key = str(file_path)
+        sig = _file_signature(stat_result)
+        order.append(key)
+        entry = cached.get(key)
+        if entry is not None and entry.get("sig") == sig and (
+                artwork_dir is None or entry.get("metadata") is None or "artwork" in entry["metadata"]):
+            files[key] = entry
+            changes["unchanged"] += 1
+        else:
+            to_read.append((file_path, sig))
+            changes["changed" if entry is not None else "added"] += 1
+
+    seen = set(order)
+    changes["removed"] = sum(1 for key in cached if key not in seen)
+
+    results, errors = read_metadata([file_path for file_path, _ in to_read], workers, executor, artwork_dir)
+    messages = dict(errors)
+    for (file_path, sig), meta in zip(to_read, results):
+        entry = {"sig": sig, "metadata": meta}
+        if meta is None:
+            # Remember the failure so unchanged broken files are not re-read on every run
+            entry["error"] = messages.get(str(file_path))
+        files[str(file_path)] = entry
+
+    save_scan_manifest(files, manifest_path, root_dir)
+
+    music_data = [files[key]["metadata"] for key in order if files[key]["metadata"] is not None]
+    return music_data, changes, walk_errors + errors
+
+def scan_music_folder(root_dir: Path, manifest_path: Path = None, workers: int = 1, executor: str = "thread",
+                      artwork_dir: Path = None):
+    if manifest_path:
+        music_data, changes, errors = rescan_music_folder(root_dir, manifest_path, workers, executor, artwork_dir)
+        _report_errors(errors)
+        for change, n in changes.items():
+            metrics.count("scan", change, n)
+        print(
+            f"🔁 Rescan: {changes['added']} added, {changes['changed']} changed, "
+            f"{changes['removed']} removed, {changes['unchanged']} unchanged"
+        )
+        return music_data
+
+    walk_errors = []
+    file_paths = [file_path for file_path, _ in _iter_audio_files(root_dir, walk_errors)]
+    results, errors = read_metadata(file_paths, workers, executor, artwork_dir)
+    _report_errors(walk_errors + errors)
+    return [meta for meta in results if meta is not None]
+
+def iter_music_folder(root_dir: Path, workers: int = 1, executor: str = "thread", artwork_dir: Path = None):
+    """
+    Streaming scan_music_folder() without a manifest: walk `root_dir` and yield each file's
+    metadata as soon as it is read, in walk order. Unreadable files are reported at the end.
+    """
+    errors = []
+    files = (file_path for file_path, _ in _iter_audio_files(root_dir, errors))
+    for file_path, meta, error in iter_metadata(files, workers, executor, artwork_dir=artwork_dir):
+        if error is None:
+            yield meta
+        else:
+            errors.append((str(file_path), error))
+    _report_errors(errors)
 
 import xml.etree.ElementTree as ET
 
-def parse_rekordbox_xml(xml_path: Path, playlist_filter: str = None):
+def _rekordbox_track(attrib: dict) -> dict:
+    return {
+        "title": attrib.get("Name"),
+        "artist": attrib.get("Artist"),
+        "album": attrib.get("Album"),
+        "genre": attrib.get("Genre"),
+        "label": attrib.get("Label"),
+        "track_id": attrib.get("TrackID"),
+        "file_path": attrib.get("Location"),
+    }
+
+def _iterparse_pruned(xml_path: Path):
+    """
+    Stream (event, element, parent) over a Rekordbox XML export.
+
+    Every element is detached from its parent once its "end" event has been handled,
+    so memory stays flat however large the export is. Only attributes are kept;
+    callers must not hold on to children of an element after its end event.
+    """
+    with open(xml_path, "rb") as f:
+        stack = []
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                yield event, elem, stack[-1] if stack else None
+                stack.append(elem)
+            else:
+                stack.pop()
+                parent = stack[-1] if stack else None
+                yield event, elem, parent
+                if parent is not None:
+                    # Siblings were already removed, so this is the only child: O(1)
+                    parent.remove(elem)
+
+class PlaylistIndex:
+    """
+    Every playlist in a Rekordbox export, read once.
+
+    Playlists are keyed by their full folder path below ROOT, joined with "/"
+    (e.g. "Sets/Warmup"), in the order Rekordbox lists them.
+    """
+    def __init__(self, playlists: dict):
+        self.playlists = playlists            # path -> ordered list of TrackIDs
+        self.membership = defaultdict(list)   # TrackID -> list of playlist paths
+        for path, track_ids in playlists.items():
+            for track_id in dict.fromkeys(track_ids):
+                self.membership[track_id].append(path)
+
+    def resolve(self, name: str) -> str:
+        """Map a full path or a bare playlist name (first match wins) to its full path."""
+        if name in self.playlists:
+            return name
+        for path in self.playlists:
+            if path.rsplit("/", 1)[-1] == name:
+                return path
+        return None
+
+    def track_ids(self, name: str) -> list:
+        path = self.resolve(name)
+        return self.playlists[path] if path else []
+
+    def __len__(self):
+        return len(self.playlists)
+
+    def __repr__(self):
+        return f"PlaylistIndex(playlists={len(self.playlists)}, tracks={len(self.membership)})"
+
+def build_playlist_index(xml_path: Path) -> PlaylistIndex:
+    """Stream the PLAYLISTS tree of a Rekordbox export into a PlaylistIndex."""
+    playlists = {}
+    names = []        # folder path of the NODE currently open
+    current = None    # track list of the playlist currently open
+    in_playlists = False
+    for event, elem, parent in _iterparse_pruned(xml_path):
+        tag = elem.tag
+        if event == "start":
+            if tag == "PLAYLISTS":
+                in_playlists = True
+            elif tag == "NODE" and in_playlists:
+                names.append(elem.get("Name", ""))
+                if elem.get("Type") == "1":
+                    # names[0] is the ROOT folder
+                    current = playlists.setdefault("/".join(names[1:]), [])
+        elif tag == "TRACK" and current is not None and parent is not None and parent.tag == "NODE":
+            current.append(elem.get("Key"))
+        elif tag == "NODE" and in_playlists:
+            names.pop()
+            current = None
+        elif tag == "PLAYLISTS":
+            break
+    return PlaylistIndex(playlists)
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_playlist_index(xml_path: Path, cache_dir: Path = None) -> PlaylistIndex:
+    """
+    Return the PlaylistIndex for `xml_path`, reusing a copy cached in `cache_dir`
+    under the export's SHA-1 so unchanged exports skip the PLAYLISTS pass.
+    """
+    if cache_dir is None:
+        return build_playlist_index(xml_path)
+
+    cache_path = Path(cache_dir) / f"playlists_{_file_digest(xml_path)}.json"
+    if cache_path.exists():
+        metrics.count("rekordbox", "cache_hits")
+        with cache_path.open("r", encoding="utf-8") as f:
+            return PlaylistIndex(json.load(f))
+
+    metrics.count("rekordbox", "cache_misses")
+    index = build_playlist_index(xml_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with cache_path.open("w", encoding="utf-8") as f:
+        json.dump(index.playlists, f, ensure_ascii=False)
+    return index
+
+def _collect_collection_tracks(xml_path: Path, wanted: set = None):
+    """Helper: yield COLLECTION tracks (only TrackIDs in `wanted`, if given), stopping at </COLLECTION>."""
+    for event, elem, parent in _iterparse_pruned(xml_path):
+        if event != "end":
+            continue
+        if elem.tag == "TRACK" and parent is not None and parent.tag == "COLLECTION":
+            track_id = elem.get("TrackID")
+            if track_id and (wanted is None or track_id in wanted):
+                yield _rekordbox_track(elem.attrib)
+        elif elem.tag == "COLLECTION":
+            break
+
+def iter_rekordbox_tracks(xml_path: Path, playlist_filter: str = None, index: PlaylistIndex = None):
+    """
+    Stream track metadata dicts from a Rekordbox XML export without building the full tree.
+
+    Without `playlist_filter`, tracks are yielded in COLLECTION order and parsing stops at the
+    end of the COLLECTION. With a filter, the playlist's TrackIDs are looked up in `index`
+    (built on the fly if not given) and only the tracks it needs are kept, then yielded in
+    playlist order.
+    """
+    if not playlist_filter:
+        yield from _collect_collection_tracks(xml_path)
+        return
+
+    playlists = extract_playlists(xml_path, [playlist_filter], index)
+    for tracks in playlists.values():
+        yield from tracks
+
+def extract_playlists(xml_path: Path, playlist_names: list = None, index: PlaylistIndex = None) -> dict:
+    """
+    Extract several playlists from a Rekordbox export with a single pass over the COLLECTION.
+
+    Args:
+        xml_path (Path): Rekordbox XML export.
+        playlist_names (list of str): full paths or bare names; None extracts every playlist.
+        index (PlaylistIndex): prebuilt index, e.g. from load_playlist_index().
+
+    Returns:
+        dict: playlist path -> list of track dicts in playlist order. Unknown names are skipped.
+    """
+    if index is None:
+        index = build_playlist_index(xml_path)
+
+    if playlist_names is None:
+        paths = list(index.playlists)
+    else:
+        paths = [path for path in (index.resolve(name) for name in playlist_names) if path]
+
+    wanted = {track_id for path in paths for track_id in index.playlists[path]}
+    found = {}
+    if wanted:
+        for track in _collect_collection_tracks(xml_path, wanted):
+            found[track["track_id"]] = track
+
+    return {
+        path: [found[track_id] for track_id in index.playlists[path] if track_id in found]
+        for path in dict.fromkeys(paths)
+    }
+
+def parse_rekordbox_xml(xml_path: Path, playlist_filter: str = None, index: PlaylistIndex = None):
     """
     Parses a Rekordbox XML file and returns a list of track metadata.
     If `playlist_filter` is provided, only tracks from that playlist will be returned.
     """
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    # Build a lookup of TrackID -> track metadata
-    track_dict = {}
-    tracks = root.find("COLLECTION").findall("TRACK")
-    for track in tqdm(tracks, desc="🎼 Parsing Rekordbox tracks"):
-        track_id = track.attrib.get("TrackID")
-        if track_id:
-            track_dict[track_id] = {
-                "title": track.attrib.get("Name"),
-                "artist": track.attrib.get("Artist"),
-                "album": track.attrib.get("Album"),
-                "genre": track.attrib.get("Genre"),
-                "label": track.attrib.get("Label"),
-                "track_id": track_id,
-                "file_path": track.attrib.get("Location"),
-            }
-
-    if playlist_filter:
-        def find_playlist_tracks(node):
-            for child in node.findall("NODE"):
-                if child.attrib.get("Name") == playlist_filter:
-                    return [track.attrib["Key"] for track in child.findall("TRACK")]
-                result = find_playlist_tracks(child)
-                if result:
-                    return result
-            return []
-
-        playlist_node = root.find("PLAYLISTS")
-        track_ids = find_playlist_tracks(playlist_node)
-        return [track_dict[tid] for tid in track_ids if tid in track_dict]
+    return list(tqdm(iter_rekordbox_tracks(xml_path, playlist_filter, index), desc="🎼 Parsing Rekordbox tracks"))
 
-    else:
-        return list(track_dict.values())
+ALL_PLAYLISTS = "*"
+
+def _playlist_slug(path: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", path).strip("_") or "playlist"
+
+def _playlist_file_names(paths) -> dict:
+    """
+    Playlist path -> output file name. Paths whose slugs clash ("Techno/Peak" and "Techno Peak",
+    or names differing only in case) get a short hash of the full path after the first one.
+    """
+    names, taken = {}, set()
+    for path in paths:
+        name = _playlist_slug(path)
+        if name.casefold() in taken:
+            name = f"{name}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+        taken.add(name.casefold())
+        names[path] = f"{name}.json"
+    return names
 
 def scan_library(
     music_dir: Path = None,
     output_path: Path = None,
     rekordbox_xml_path: Path = None,
-    playlist_name: str = None
+    playlist_name: str = None,
+    manifest_path: Path = None,
+    workers: int = 1,
+    executor: str = "thread",
+    index_cache_dir: Path = None,
+    artwork_dir: Path = None
 ):
-    if rekordbox_xml_path:
-        print(f"🎧 Importing from Rekordbox XML: {rekordbox_xml_path}")
-        collection = parse_rekordbox_xml(rekordbox_xml_path, playlist_name)
-    elif music_dir:
-        print(f"🔍 Scanning music folder: {music_dir}")
-        collection = scan_music_folder(music_dir)
-    else:
+    """
+    Scan a music folder or import a Rekordbox export and write the metadata as JSON.
+
+    `playlist_name` may be a single playlist (written to `output_path`), or a list of playlists
+    or ALL_PLAYLISTS, in which case `output_path` is a directory receiving one JSON file per
+    playlist, all extracted from a single parse.
+
+    If `output_path` ends in ".ndjson", tracks are streamed to it one line per track as they
+    are read instead of being collected first (a manifest rescan still loads the manifest).
+
+    With `artwork_dir`, a folder scan also stores embedded album art in that thumbnail
+    cache (see artwork.py) and records each track's cover hash as "artwork".
+    """
+    several = playlist_name == ALL_PLAYLISTS or (playlist_name is not None and not isinstance(playlist_name, str))
+    if rekordbox_xml_path and several:
+        print(f"🎧 Importing playlists from Rekordbox XML: {rekordbox_xml_path}")
+        with metrics.stage("rekordbox"):
+            index = load_playlist_index(rekordbox_xml_path, index_cache_dir)
+            names = None if playlist_name == ALL_PLAYLISTS else list(playlist_name)
+            playlists = extract_playlists(rekordbox_xml_path, names, index)
+        metrics.count("rekordbox", "playlists", len(playlists))
+        metrics.count("rekordbox", "tracks", sum(len(tracks) for tracks in playlists.values()))
+        if output_path:
+            output_path.mkdir(parents=True, exist_ok=True)
+            file_names = _playlist_file_names(playlists)
+            for path, tracks in playlists.items():
+                playlist_path = output_path / file_names[path]
+                with playlist_path.open("w", encoding="utf-8") as f:
+                    json.dump(tracks, f, indent=2, ensure_ascii=False)
+            print(f"📁 {len(playlists)} playlists extracted and saved to {output_path}")
+        else:
+            print(f"✅ {len(playlists)} playlists loaded, but no output path provided.")
+        return
+
+    streaming = output_path is not None and output_path.suffix == ".ndjson"
+    if not (rekordbox_xml_path or music_dir):
         raise ValueError("You must specify either a music directory or a Rekordbox XML file.")
+    source = "rekordbox" if rekordbox_xml_path else "scan"
+    if artwork_dir is not None and not artwork_available():
+        print("⚠️ Pillow is not installed: skipping album art (pip install pillow)")
+        artwork_dir = None
+
+    # A streamed collection is only read while it is written, so both count as the source stage
+    with metrics.stage(source):
+        if rekordbox_xml_path:
+            print(f"🎧 Importing from Rekordbox XML: {rekordbox_xml_path}")
+            index = load_playlist_index(rekordbox_xml_path, index_cache_dir) if playlist_name else None
+            if streaming:
+                collection = iter_rekordbox_tracks(rekordbox_xml_path, playlist_name, index)
+            else:
+                collection = parse_rekordbox_xml(rekordbox_xml_path, playlist_name, index)
+        elif streaming and not manifest_path:
+            print(f"🔍 Scanning music folder: {music_dir}")
+            collection = iter_music_folder(music_dir, workers, executor, artwork_dir)
+        else:
+            print(f"🔍 Scanning music folder: {music_dir}")
+            collection = scan_music_folder(music_dir, manifest_path, workers, executor, artwork_dir)
+
+        if streaming:
+            count = write_ndjson(collection, output_path)
+            metrics.count(source, "tracks", count)
+            print(f"📁 {count} tracks streamed to {output_path}")
 
+    if streaming:
+        return
+    metrics.count(source, "tracks", len(collection))
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(collection, f, indent=2, ensure_ascii=False)
+        with metrics.stage("write"):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with output_path.open("w", encoding="utf-8") as f:
+                json.dump(collection, f, indent=2, ensure_ascii=False)
         print(f"📁 Metadata extracted and saved to {output_path}")
     else:
         print("✅ Collection loaded, but no output path provided.")
@@ -0,0 +1,269 @@
+"""
+Prebuilt search index over artist, title and album, written next to the prepared tracks
+so a search box can answer as-you-type queries without scanning the whole library.
+
+Text is folded the way youtube.normalize_query_key() folds it (casefolded, diacritics
+stripped, split into word characters). The index holds:
+
+  * terms     – the sorted vocabulary, each with the rows (positions in the prepared
+                track list) of the tracks containing it
+  * prefixes  – for every 1- and 2-character prefix, the rows of all tracks with a term
+                starting with it, so the first keystrokes do not union thousands of terms
+  * trigrams  – for every trigram, the terms containing it, for matches inside a word
+                ("mix" finds "remix")
+
+Row and term lists are sorted, delta-encoded and stored as LEB128 varints.
+"""
+import bisect
+import json
+import re
+import struct
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+
+MAGIC = b"MVSRCH\x00\x01"
+SEARCH_VERSION = 1
+SEARCH_FIELDS = ["artist", "title", "album"]
+PREFIX_LEN = 2      # prefixes up to this length get their own row lists
+RESULT_LIMIT = 50
+
+def tokenize(text: str) -> List[str]:
+    """Casefolded, diacritic-free word tokens: "Beyoncé – Halo (Remix)" → ["beyonce", "halo", "remix"]."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return re.findall(r"\w+", text)
+
+def trigrams(term: str) -> set:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+def encode_postings(lists: Iterable[Iterable[int]]):
+    """
+    Delta + varint encode sorted integer lists into one blob.
+    Returns (blob, offsets) with list i at blob[offsets[i]:offsets[i + 1]].
+    """
+    out = bytearray()
+    offsets = [0]
+    for values in lists:
+        previous = 0
+        for value in values:
+            delta = value - previous
+            previous = value
+            while delta >= 0x80:
+                out.append(delta & 0x7F | 0x80)
+                delta >>= 7
+            out.append(delta)
+        offsets.append(len(out))
+    return bytes(out), np.array(offsets, dtype=np.uint32)
+
+def decode_postings(blob: np.ndarray, offsets: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """
+    Lists lo … hi-1 written by encode_postings(), concatenated. They sit next to each other
+    in the blob (e.g. every term of a prefix range), so they are decoded in one go.
+    """
+    start, end = int(offsets[lo]), int(offsets[hi])
+    chunk = blob[start:end]
+    if chunk.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    last = np.flatnonzero(chunk < 0x80)                 # final byte of every varint
+    if last.size == chunk.size:                         # all single-byte deltas (dense lists)
+        deltas = chunk.astype(np.int64)
+    else:
+        first = np.concatenate(([0], last[:-1] + 1))
+        shift = 7 * (np.arange(chunk.size) - np.repeat(first, last - first + 1))
+        deltas = np.add.reduceat((chunk & 0x7F).astype(np.int64) << shift, first)
+    values = np.cumsum(deltas)
+    if hi - lo > 1:
+        # Deltas restart at every list: subtract the running total where each list begins
+        list_starts = np.searchsorted(last, offsets[lo:hi].astype(np.int64) - start)
+        base = np.concatenate(([0], values[list_starts[1:] - 1]))
+        values -= np.repeat(base, np.diff(np.append(list_starts, len(values))))
+    return values
+
+class SearchIndex:
+    """
+    Search over prepared tracks. search() returns track ids of tracks matching every
+    query word, best matches first (see search_rows() for the ranking).
+    """
+
+    def __init__(self, header: dict, ids: List[str], arrays: dict):
+        self.count = header["count"]
+        self.terms = header["terms"]
+        self.prefixes = header["prefixes"]
+        self.trigrams = header["trigrams"]
+        self.ids = ids
+        self._blob = arrays["postings"]
+        self._term_offsets = arrays["term_offsets"]
+        self._prefix_offsets = arrays["prefix_offsets"]
+        self._trigram_offsets = arrays["trigram_offsets"]
+        self._prefix_ids = {p: i for i, p in enumerate(self.prefixes)}
+        self._trigram_ids = {t: i for i, t in enumerate(self.trigrams)}
+        self._term_ids = {t: i for i, t in enumerate(self.terms)}
+
+    @classmethod
+    def build(cls, tracks: List[dict], fields: List[str] = SEARCH_FIELDS) -> "SearchIndex":
+        """Index `fields` of prepared tracks (each with an md5 "id"), rows in list order."""
+        rows_of = defaultdict(list)
+        for row, track in enumerate(tracks):
+            words = set()
+            for field in fields:
+                words.update(tokenize(track.get(field)))
+            for word in words:
+                rows_of[word].append(row)
+        terms = sorted(rows_of)
+
+        prefix_rows = defaultdict(set)
+        trigram_terms = defaultdict(list)
+        for term_id, term in enumerate(terms):
+            for n in range(1, PREFIX_LEN + 1):
+                if len(term) >= n:
+                    prefix_rows[term[:n]].update(rows_of[term])
+            for gram in sorted(trigrams(term)):
+                trigram_terms[gram].append(term_id)
+        prefixes = sorted(prefix_rows)
+        grams = sorted(trigram_terms)
+
+        blob = bytearray()
+        arrays = {}
+        for name, lists in (
+            ("term_offsets", (rows_of[t] for t in terms)),
+            ("prefix_offsets", (sorted(prefix_rows[p]) for p in prefixes)),
+            ("trigram_offsets", (trigram_terms[g] for g in grams)),
+        ):
+            part, offsets = encode_postings(lists)
+            arrays[name] = offsets + len(blob)
+            blob += part
+        arrays["postings"] = np.frombuffer(bytes(blob), dtype=np.uint8)
+        header = {"count": len(tracks), "terms": terms, "prefixes": prefixes, "trigrams": grams}
+        return cls(header, [t["id"] for t in tracks], arrays)
+
+    def _lists(self, offsets: np.ndarray, lo: int, hi: int = None) -> np.ndarray:
+        return decode_postings(self._blob, offsets, lo, lo + 1 if hi is None else hi)
+
+    def _term_range(self, prefix: str) -> range:
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\U0010ffff")
+        return range(lo, hi)
+
+    def _word_scores(self, word: str) -> np.ndarray:
+        """
+        Per row: 2 if a term of the track is `word`, 1 if one starts with it, 0 if one
+        contains it (words of 3+ characters only), -1 for no match. Each class of match
+        is a superset of the one above, so later assignments only raise scores.
+        """
+        scores = np.full(self.count, -1, dtype=np.int8)
+        term_id = self._term_ids.get(word)
+        if len(word) <= PREFIX_LEN:
+            prefix_id = self._prefix_ids.get(word)
+            if prefix_id is not None:
+                scores[self._lists(self._prefix_offsets, prefix_id)] = 1
+        else:
+            matching = self._term_range(word)
+            grams = trigrams(word)
+            if all(g in self._trigram_ids for g in grams):
+                # Terms holding every trigram of the word, then the ones that really contain it
+                lists = sorted((self._lists(self._trigram_offsets, self._trigram_ids[g]) for g in grams), key=len)
+                candidates = lists[0]
+                for other in lists[1:]:
+                    candidates = candidates[np.isin(candidates, other, assume_unique=True)]
+                for t in candidates.tolist():
+                    if t not in matching and word in self.terms[t]:
+                        scores[self._lists(self._term_offsets, t)] = 0
+            if matching:
+                scores[self._lists(self._term_offsets, matching.start, matching.stop)] = 1
+        if term_id is not None:
+            scores[self._lists(self._term_offsets, term_id)] = 2
+        return scores
+
+    def search_rows(self, query: str, limit: int = RESULT_LIMIT) -> np.ndarray:
+        """
+        Rows of the tracks matching every word of `query`, as a prefix of one of their
+        words or (for words of 3+ characters) anywhere inside one.
+
+        Ranked by how well the words match: 2 points per word matching a whole term,
+        1 per word matching a term's start, 0 inside a term; ties keep track order.
+        """
+        words = tokenize(query)
+        if not words:
+            return np.zeros(0, dtype=np.int64)
+        total = np.zeros(self.count, dtype=np.int16)
+        matched = np.ones(self.count, dtype=bool)
+        for word in dict.fromkeys(words):
+            scores = self._word_scores(word)
+            matched &= scores >= 0
+            total += scores
+        rows = np.flatnonzero(matched)
+        scores = total[rows]
+        # Few distinct scores: take rows score by score instead of sorting them all
+        ranked, found = [], 0
+        for score in np.unique(scores)[::-1].tolist():
+            if found >= limit:
+                break
+            best = rows[scores == score][:limit - found]
+            ranked.append(best)
+            found += len(best)
+        return np.concatenate(ranked) if ranked else rows
+
+    def search(self, query: str, limit: int = RESULT_LIMIT) -> List[str]:
+        """Track ids for `query`, best first; see search_rows()."""
+        return [self.ids[row] for row in self.search_rows(query, limit).tolist()]
+
+    def encode(self) -> bytes:
+        """
+        MAGIC, uint32 header length, JSON header (vocabulary, prefixes, trigrams and where
+        each array lives), zero padding to 8 bytes, then the arrays: 16-byte md5 track ids,
+        uint32 offsets of every term / prefix / trigram list into the postings blob, and
+        the blob itself.
+        """
+        arrays = {
+            "ids": np.frombuffer(b"".join(bytes.fromhex(i) for i in self.ids), dtype=np.uint8),
+            "term_offsets": self._term_offsets,
+            "prefix_offsets": self._prefix_offsets,
+            "trigram_offsets": self._trigram_offsets,
+            "postings": self._blob,
+        }
+        header = {"version": SEARCH_VERSION, "count": self.count, "terms": self.terms,
+                  "prefixes": self.prefixes, "trigrams": self.trigrams, "arrays": {}}
+        blobs, size = [], 0
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<"))
+            pad = -size % 8
+            blobs.append(b"\x00" * pad)
+            header["arrays"][name] = {"dtype": arr.dtype.str, "offset": size + pad, "length": int(arr.size)}
+            blobs.append(arr.tobytes())
+            size += pad + arr.nbytes
+        head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        pad = -(len(MAGIC) + 4 + len(head)) % 8
+        return b"".join([MAGIC, struct.pack("<I", len(head)), head, b"\x00" * pad] + blobs)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "SearchIndex":
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a search index")
+        (head_len,) = struct.unpack_from("<I", data, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(data[start:start + head_len].decode("utf-8"))
+        if header["version"] != SEARCH_VERSION:
+            raise ValueError(f"unsupported search index version {header['version']}")
+        body = start + head_len + (-(start + head_len) % 8)
+        arrays = {
+            name: np.frombuffer(data, dtype=spec["dtype"], count=spec["length"], offset=body + spec["offset"])
+            for name, spec in header["arrays"].items()
+        }
+        digests = arrays.pop("ids").tobytes().hex()
+        ids = [digests[32 * i:32 * i + 32] for i in range(header["count"])]
+        return cls(header, ids, arrays)
+
+    def write(self, path: Path) -> int:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = self.encode()
+        path.write_bytes(data)
+        return len(data)
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchIndex":
+        return cls.decode(Path(path).read_bytes())
@@ -0,0 +1,361 @@
+"""
+Optional local track server: the prepared library in SQLite, with an R-tree over the
+tile bounds, so a client fetches the tracks in view instead of all of prepared.json.
+
+    python backend/cli.py serve                      # http://127.0.0.1:8765
+
+    GET /tracks?bbox=x0,y0,x1,y1&zoom=z    tracks whose tiles meet the box. Zoomed out
+                                           (zoom below 1/2) there is one track per LOD grid
+                                           cell (see lod.py), with how many it stands for
+    GET /tracks/{id}                       one prepared track
+
+Every response has an ETag made of the library digest and the normalised request, so a
+client revalidating with If-None-Match gets a 304 before the database is touched.
+Bodies are gzipped for clients that accept it, and the most recent viewport responses
+are kept, already compressed, in an in-process LRU. The database is rebuilt whenever
+the prepared library changes.
+"""
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from chunks import CHUNK_MANIFEST, load_chunked_output
+from instrument import metrics
+from lod import LOD_FACTORS
+from settings import BASE_DIR, config_value
+
+DB_VERSION = 1
+DEFAULT_DB_PATH = BASE_DIR / "data" / "cache" / "tracks.sqlite"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_ENTRIES = 256         # viewport responses kept in the LRU
+GZIP_MIN_BYTES = 1024       # smaller bodies are sent as they are
+
+# DATABASE
+
+def library_digest(prepared: Path) -> str:
+    """SHA-1 of the prepared library: prepared.json, or every file of a chunked output folder."""
+    prepared = Path(prepared)
+    files = sorted(prepared.glob("*.json")) if prepared.is_dir() else [prepared]
+    digest = hashlib.sha1()
+    for path in files:
+        digest.update(path.name.encode("utf-8"))
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def load_prepared(prepared: Path) -> List[dict]:
+    """Tracks of prepared.json, or of a chunked output folder (see chunks.write_chunked_output)."""
+    prepared = Path(prepared)
+    if (prepared / CHUNK_MANIFEST).exists():
+        return load_chunked_output(prepared)
+    with prepared.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_database(tracks: List[dict], db_path: Path, digest: str,
+                   tile_size: float = None, tile_gap: float = None) -> Path:
+    """
+    Write `tracks` to a fresh SQLite database at `db_path`, atomically:
+
+      tracks(rowid, id, x, y, data)   one row per track in prepared order, data = compact JSON
+      tile_bounds                     R-tree of every tile's box, keyed by tracks.rowid
+      meta(key, value)                version, library digest, tile pitch and grid origin
+    """
+    tile_size = config_value("tileSize") if tile_size is None else tile_size
+    tile_gap = config_value("tileGap") if tile_gap is None else tile_gap
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_name(db_path.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE tracks (rowid INTEGER PRIMARY KEY, id TEXT NOT NULL, x REAL NOT NULL,
+                                 y REAL NOT NULL, data TEXT NOT NULL);
+            CREATE VIRTUAL TABLE tile_bounds USING rtree (id, min_x, max_x, min_y, max_y);
+        """)
+        conn.executemany(
+            "INSERT INTO tracks VALUES (?, ?, ?, ?, ?)",
+            ((row, t["id"], t["x"], t["y"], json.dumps(t, ensure_ascii=False, separators=(",", ":")))
+             for row, t in enumerate(tracks)),
+        )
+        conn.executemany(
+            "INSERT INTO tile_bounds VALUES (?, ?, ?, ?, ?)",
+            ((row, t["x"], t["x"] + tile_size, t["y"], t["y"] + tile_size) for row, t in enumerate(tracks)),
+        )
+        conn.execute("CREATE INDEX tracks_id ON tracks (id)")
+        meta = {
+            "version": DB_VERSION,
+            "digest": digest,
+            "count": len(tracks),
+            "tile_size": tile_size,
+            "pitch": tile_size + tile_gap,
+            # Grid cells for zoomed-out queries count from here, so coordinates are never negative
+            "origin_x": min((t["x"] for t in tracks), default=0.0),
+            "origin_y": min((t["y"] for t in tracks), default=0.0),
+        }
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", ((k, json.dumps(v)) for k, v in meta.items()))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+    return db_path
+
+def read_meta(db_path: Path) -> Optional[dict]:
+    """The meta table of a database written by build_database(), or None if it is missing or unreadable."""
+    if not Path(db_path).exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True)
+        try:
+            return {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return None
+
+def open_database(prepared: Path, db_path: Path = DEFAULT_DB_PATH) -> Path:
+    """Database for the prepared library at `prepared`, (re)built if it is missing or out of date."""
+    digest = library_digest(prepared)
+    meta = read_meta(db_path)
+    if meta is None or meta.get("version") != DB_VERSION or meta.get("digest") != digest:
+        tracks = load_prepared(prepared)
+        build_database(tracks, db_path, digest)
+        print(f"🗃️ Indexed {len(tracks)} tracks from {prepared} into {db_path}")
+    return Path(db_path)
+
+# QUERIES
+
+def lod_factor(zoom: float) -> Optional[int]:
+    """Level-of-detail factor (lod.LOD_FACTORS) for a viewer zoom scale, None for full detail."""
+    factors = [f for f in LOD_FACTORS if f * zoom <= 1]
+    return max(factors) if factors else None
+
+class TrackStore:
+    """Read-only queries against a database from build_database(), one connection per thread."""
+
+    _VIEWPORT = "SELECT id FROM tile_bounds WHERE max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.meta = read_meta(self.db_path)
+        if self.meta is None:
+            raise FileNotFoundError(f"no track database at {self.db_path}")
+        self._local = threading.local()
+
+    @property
+    def digest(self) -> str:
+        return self.meta["digest"]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(
+                f"file:{self.db_path.as_posix()}?mode=ro", uri=True, check_same_thread=False
+            )
+        return conn
+
+    def cell(self, zoom: float) -> Optional[float]:
+        """Grid cell size for `zoom`: one track is returned per cell, None returns every track."""
+        factor = lod_factor(zoom)
+        return None if factor is None else self.meta["pitch"] * factor
+
+    def viewport(self, bbox, zoom: float = 1.0) -> bytes:
+        """
+        JSON body for the tracks whose tiles meet `bbox` (x0, y0, x1, y1), in prepared order:
+        {"count": tracks in view, "cell": null, "tracks": [...]}. Zoomed out, "tracks" holds
+        the first track of every `cell`-sized grid square and "counts" how many each stands for.
+        """
+        x0, y0, x1, y1 = bbox
+        cell = self.cell(zoom)
+        conn = self._conn()
+        if cell is None:
+            rows = conn.execute(f"SELECT data FROM tracks WHERE rowid IN ({self._VIEWPORT}) ORDER BY rowid",
+                                (x0, x1, y0, y1)).fetchall()
+            data, counts = [r[0] for r in rows], None
+        else:
+            rows = conn.execute(
+                f"""SELECT t.data, g.n FROM (
+                        SELECT MIN(rowid) AS first, COUNT(*) AS n FROM tracks WHERE rowid IN ({self._VIEWPORT})
+                        GROUP BY CAST((x - ?) / ? AS INTEGER), CAST((y - ?) / ? AS INTEGER)
+                    ) AS g JOIN tracks AS t ON t.rowid = g.first ORDER BY g.first""",
+                (x0, x1, y0, y1, self.meta["origin_x"], cell, self.meta["origin_y"], cell),
+            ).fetchall()
+            data, counts = [r[0] for r in rows], [r[1] for r in rows]
+        head = {"count": len(data) if counts is None else sum(counts), "cell": cell}
+        body = json.dumps(head, separators=(",", ":"))[:-1] + ',"tracks":[' + ",".join(data) + "]"
+        if counts is not None:
+            body += ',"counts":' + json.dumps(counts, separators=(",", ":"))
+        return (body + "}").encode("utf-8")
+
+    def track(self, track_id: str) -> Optional[bytes]:
+        """JSON body of the track with `track_id` (the first, should ids repeat), None if unknown."""
+        row = self._conn().execute("SELECT data FROM tracks WHERE id = ? ORDER BY rowid LIMIT 1",
+                                   (track_id,)).fetchone()
+        return row[0].encode("utf-8") if row else None
+
+# HTTP
+
+class ResponseCache:
+    """Thread-safe LRU of request key -> (ETag, body, gzipped body or None)."""
+
+    def __init__(self, entries: int = CACHE_ENTRIES):
+        self.entries = entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: str, item):
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+def _compress(body: bytes) -> Optional[bytes]:
+    return gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_BYTES else None
+
+def _accepts_gzip(header: str) -> bool:
+    for coding in (header or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+class TrackRequestHandler(BaseHTTPRequestHandler):
+    """Routes GET /tracks and /tracks/{id} to the server's TrackStore (see make_server())."""
+
+    protocol_version = "HTTP/1.1"   # keep-alive; every response has a Content-Length
+    # Headers and body are separate writes; with Nagle on, the body waits for the client's
+    # delayed ACK (~40 ms) on every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        metrics.count("serve", "requests")
+        try:
+            if url.path == "/tracks":
+                self._viewport(parse_qs(url.query))
+            elif url.path.startswith("/tracks/") and url.path.count("/") == 2:
+                self._track(unquote(url.path[len("/tracks/"):]))
+            else:
+                self._error(404, "not found")
+        except ValueError as e:
+            self._error(400, str(e))
+
+    def _viewport(self, query: dict):
+        bbox = [float(v) for v in query.get("bbox", [""])[0].split(",") if v]
+        if len(bbox) != 4 or not all(math.isfinite(v) for v in bbox) or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError("bbox must be x0,y0,x1,y1 with x0 <= x1 and y0 <= y1")
+        zoom = float(query.get("zoom", ["1"])[0])
+        if not math.isfinite(zoom) or zoom <= 0:
+            raise ValueError("zoom must be a positive number")
+        store = self.server.store
+        # Zoom levels that share a grid get the same response, cached once
+        key = f"tracks?bbox={','.join(map(repr, bbox))}&cell={store.cell(zoom)!r}"
+        etag = self._etag(key)
+        if self._not_modified(etag):
+            return
+        item = self.server.cache.get(key)
+        metrics.count("serve", "cache_misses" if item is None else "cache_hits")
+        if item is None:
+            body = store.viewport(bbox, zoom)
+            item = (etag, body, _compress(body))
+            self.server.cache.put(key, item)
+        self._send(200, item[1], item[2], etag)
+
+    def _track(self, track_id: str):
+        etag = self._etag(f"tracks/{track_id}")
+        if self._not_modified(etag):
+            return
+        body = self.server.store.track(track_id)
+        if body is None:
+            self._error(404, f"unknown track {track_id}")
+            return
+        self._send(200, body, _compress(body), etag)
+
+    def _etag(self, key: str) -> str:
+        return f'"{self.server.store.digest[:16]}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}"'
+
+    def _not_modified(self, etag: str) -> bool:
+        tags = [t.strip() for t in (self.headers.get("If-None-Match") or "").split(",")]
+        if etag not in tags and "*" not in tags:
+            return False
+        metrics.count("serve", "not_modified")
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def _error(self, status: int, message: str):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"), None, None)
+
+    def _send(self, status: int, body: bytes, gzipped: Optional[bytes], etag: Optional[str]):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")    # always revalidate, cheap with the ETag
+        if gzipped is not None and _accepts_gzip(self.headers.get("Accept-Encoding")):
+            body = gzipped
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(store: TrackStore, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                cache_entries: int = CACHE_ENTRIES, verbose: bool = False) -> ThreadingHTTPServer:
+    """HTTP server for `store`, one thread per connection; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), TrackRequestHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.cache = ResponseCache(cache_entries)
+    server.verbose = verbose
+    return server
+
+def serve(prepared: Path, db_path: Path = DEFAULT_DB_PATH, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          cache_entries: int = CACHE_ENTRIES, verbose: bool = False):
+    """Index `prepared` if needed and serve it until interrupted."""
+    store = TrackStore(open_database(prepared, db_path))
+    server = make_server(store, host, port, cache_entries, verbose)
+    print(f"🛰️ Serving {store.meta['count']} tracks on http://{host}:{server.server_address[1]}/tracks", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        counters = metrics.report()["stages"].get("serve", {}).get("counters", {})
+        if counters:
+            print("🛰️ " + ", ".join(f"{name} {n}" for name, n in counters.items()))
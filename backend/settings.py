@@ -0,0 +1,29 @@
+"""
+config.json (layout and colour settings shared with the frontend) and the optional
+data/secrets.json, each read once, on first use rather than at import time.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CONFIG_PATH = BASE_DIR / "config.json"
+SECRETS_PATH = BASE_DIR / "data" / "secrets.json"
+
+@lru_cache(maxsize=None)
+def load_config(path: Path = CONFIG_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def load_secrets(path: Path = SECRETS_PATH) -> dict:
+    """API keys and the like. Nothing in the pipeline needs them, so a missing file is just empty."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def config_value(key: str, default=None):
+    """One config.json setting, e.g. config_value("tileSize")."""
+    return load_config().get(key, default)
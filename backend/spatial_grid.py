@@ -0,0 +1,76 @@
+"""
+Spatial index over circles of very different sizes, shared by the island placement
+routines so that overlap tests only look at nearby islands.
+"""
+import math
+from collections import defaultdict
+from typing import Tuple
+
+class SpatialGrid:
+    """
+    Hierarchical uniform grid over placed islands (circles), used by
+    prepare_metadata.island_centres() and genre_layout.remove_overlaps().
+    Islands are bucketed by centre on the level whose cell size is at least their
+    radius (cells double in size per level), so a query only looks at the few
+    cells around a point on each level instead of at every island.
+    """
+    def __init__(self, base_cell: float):
+        self.base_cell = base_cell
+        self.levels = {}   # level -> {(gx, gy): [island indices]}
+        self._order = []   # [(cell size, cells)], largest level first
+
+    def insert(self, idx: int, centre: Tuple[float, float], radius: float):
+        level = max(0, math.ceil(math.log2(max(radius, 1e-9) / self.base_cell)))
+        cell = self.base_cell * 2 ** level
+        if level not in self.levels:
+            self.levels[level] = defaultdict(list)
+            self._order = [(self.base_cell * 2 ** lv, self.levels[lv])
+                           for lv in sorted(self.levels, reverse=True)]
+        cells = self.levels[level]
+        cells[(math.floor(centre[0] / cell), math.floor(centre[1] / cell))].append(idx)
+
+    def _cells_near(self, point: Tuple[float, float], reach: float):
+        """
+        Yield the member lists of every cell that may hold an island within `reach` of `point`,
+        largest islands and nearest cells first, so that callers looking for any hit stop early.
+        """
+        for cell, cells in self._order:
+            gx, gy = math.floor(point[0] / cell), math.floor(point[1] / cell)
+            rings = math.ceil(reach / cell) + 1   # islands on this level extend up to one cell from their centre
+            if (2 * rings + 1) ** 2 > len(cells):
+                yield from cells.values()
+                continue
+            members = cells.get((gx, gy))
+            if members:
+                yield members
+            for d in range(1, rings + 1):
+                for dx in range(-d, d + 1):
+                    for dy in ((-d, d) if abs(dx) != d else range(-d, d + 1)):
+                        members = cells.get((gx + dx, gy + dy))
+                        if members:
+                            yield members
+
+    def near(self, point: Tuple[float, float], reach: float) -> list:
+        """Indices of islands whose edge may come within `reach` of `point` (a superset)."""
+        found = []
+        for members in self._cells_near(point, reach):
+            found.extend(members)
+        return found
+
+    def blocker(self, cand, r_new, centres, radii, gap, hint=-1) -> int:
+        """
+        Overlap / clearance test: index of an island that `cand` does not clear by
+        at least `gap`, or -1 if it is clear of all of them.  Island `hint` (usually
+        the previous blocker) is tried first, then the grid, stopping at the first hit.
+        """
+        x, y = cand
+        if hint >= 0:
+            cx, cy = centres[hint]
+            if math.hypot(x - cx, y - cy) < r_new + radii[hint] + gap - 1e-6:
+                return hint
+        for members in self._cells_near(cand, r_new + gap):
+            for j in members:
+                cx, cy = centres[j]
+                if math.hypot(x - cx, y - cy) < r_new + radii[j] + gap - 1e-6:
+                    return j
+        return -1
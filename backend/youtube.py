@@ -1,31 +1,234 @@
 import requests
 import json
 import re
-import urllib.parse
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
 
-# TODO: optimise this -- a bit slow at the moment (~150 tracks takes about a minute)
-def get_youtube_url(track):
-    query = f"{track['artist']} {track['title']}"
-    search_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote_plus(query)}"
+from instrument import metrics
 
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "data" / "cache" / "youtube.sqlite"
+HIT_TTL = 180 * 24 * 3600   # found videos rarely disappear
+MISS_TTL = 14 * 24 * 3600   # retry "no result" lookups every couple of weeks
 
-    response = requests.get(search_url, headers=headers)
-    if response.status_code != 200:
-        print("Failed to fetch search results.")
-        return None
+SEARCH_URL = "https://www.youtube.com/results"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0"
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class YouTubeLookupError(Exception):
+    """Raised when a search could not be completed (network error, blocked or unfamiliar page)."""
+
+def normalize_query_key(track) -> str:
+    """
+    Cache key for a track: artist and title casefolded, diacritics stripped and
+    punctuation/whitespace collapsed, so "Beyoncé – Halo" and "beyonce halo" share an entry.
+    """
+    def norm(text):
+        text = text or ""
+        if not text.isascii():
+            text = unicodedata.normalize("NFKD", text)
+            text = "".join(c for c in text if not unicodedata.combining(c))
+        return " ".join(re.findall(r"\w+", text.casefold()))
+    return f"{norm(track.get('artist'))}\x1f{norm(track.get('title'))}"
+
+class YouTubeCache:
+    """
+    On-disk (SQLite) cache of YouTube lookups keyed by normalize_query_key().
+
+    Stores hits and misses with separate TTLs. Pinned entries are manual overrides:
+    they never expire and are never overwritten by a lookup. Pinning `None` marks a
+    track as "no preview".
+    """
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, hit_ttl: float = HIT_TTL, miss_ttl: float = MISS_TTL):
+        self.path = Path(path)
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " pinned INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, track):
+        """Return (found, url). `found` is False when the track must be looked up."""
+        row = self.conn.execute(
+            "SELECT url, fetched_at, pinned FROM lookups WHERE key = ?", (normalize_query_key(track),)
+        ).fetchone()
+        if row is not None:
+            url, fetched_at, pinned = row
+            ttl = self.hit_ttl if url else self.miss_ttl
+            if pinned or time.time() - fetched_at < ttl:
+                self.hits += 1
+                return True, url
+        self.misses += 1
+        return False, None
+
+    def put(self, track, url):
+        """Record a lookup result (None for "no video found"). Pinned entries are left alone."""
+        self.conn.execute(
+            "INSERT INTO lookups (key, url, fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET url = excluded.url, fetched_at = excluded.fetched_at "
+            "WHERE pinned = 0",
+            (normalize_query_key(track), url, time.time()),
+        )
+        self.conn.commit()
+
+    def pin(self, track, url):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO lookups (key, url, fetched_at, pinned) VALUES (?, ?, ?, 1)",
+            (normalize_query_key(track), url, time.time()),
+        )
+        self.conn.commit()
+
+    def unpin(self, track):
+        self.conn.execute("DELETE FROM lookups WHERE key = ? AND pinned = 1", (normalize_query_key(track),))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TokenBucket:
+    """Thread-safe token bucket: allows `rate` acquisitions per second with bursts of up to `burst`."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """A requests session whose connection pool can serve `pool_size` concurrent lookups."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+def _fetch_results_page(query, session=None, base_url=SEARCH_URL, timeout=10.0,
+                        retries=0, backoff=1.0, limiter: TokenBucket = None) -> requests.Response:
+    """
+    GET the search results page for `query`, retrying on 429/5xx and connection errors
+    with exponential backoff (honouring Retry-After when given).
+
+    The 200 response is returned unread (streamed) so the caller can stop early; close it when done.
+    """
+    http = session or requests
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        delay = backoff * 2 ** attempt
+        try:
+            response = http.get(base_url, params={"search_query": query}, headers=HEADERS,
+                                timeout=timeout, stream=True)
+        except requests.RequestException as e:
+            error = YouTubeLookupError(f"Failed to fetch search results: {e}")
+        else:
+            if response.status_code == 200:
+                return response
+            response.close()
+            error = YouTubeLookupError(f"Failed to fetch search results (HTTP {response.status_code}).")
+            if response.status_code not in RETRY_STATUSES:
+                raise error
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+        if attempt < retries:
+            time.sleep(delay)
+    raise error
+
+_INITIAL_DATA = b"var ytInitialData = "
+_INITIAL_DATA_END = b";</script>"
+_VIDEO_RENDERER = b'"videoRenderer"'
+_VIDEO_ID = re.compile(rb'"videoRenderer"\s*:\s*\{\s*"videoId"\s*:\s*"([A-Za-z0-9_-]{11})"')
+_VIDEO_ID_MAX_LEN = 64  # longest span _VIDEO_ID can match without unusual whitespace
+
+def extract_first_video_id(chunks):
+    """
+    Fast path for _search_youtube(): scan a results page chunk by chunk and stop at the
+    first `"videoRenderer":{"videoId":"…"` inside ytInitialData, without decoding or
+    JSON-parsing the rest of the page.
+
+    Returns:
+        (video_id, body): `video_id` is None when the page does not look as expected; `body`
+        then holds the complete page (all chunks read) for parse_initial_data() to decide.
+    """
+    chunks = iter(chunks)
+    buf = bytearray()
+    data_start = -1
+    scan_from = 0
+    for chunk in chunks:
+        buf += chunk
+        if data_start < 0:
+            data_start = buf.find(_INITIAL_DATA, max(0, scan_from - len(_INITIAL_DATA)))
+            if data_start < 0:
+                scan_from = len(buf)
+                continue
+            scan_from = data_start + len(_INITIAL_DATA)
+
+        hit = buf.find(_VIDEO_RENDERER, scan_from)
+        if hit < 0:
+            if buf.find(_INITIAL_DATA_END, data_start) >= 0:
+                break  # blob ended without a video: let the full parser decide
+            scan_from = max(scan_from, len(buf) - len(_VIDEO_RENDERER))
+            continue
+        if len(buf) - hit < _VIDEO_ID_MAX_LEN:
+            scan_from = hit
+            continue  # wait for the rest of the renderer
+        match = _VIDEO_ID.match(buf, hit)
+        if match and buf.find(_INITIAL_DATA_END, data_start, hit) < 0:
+            return match.group(1).decode("ascii"), bytes(buf)
+        break  # unfamiliar layout
 
+    # Fall back: hand the complete page to the full parser
+    for chunk in chunks:
+        buf += chunk
+    return None, bytes(buf)
+
+def parse_initial_data(text: str):
+    """
+    Full parse of a results page: decode the whole ytInitialData blob and walk it.
+    Returns the first video id, or None if the search had no video results.
+    """
     # Extract ytInitialData from response text
-    match = re.search(r"var ytInitialData = ({.*?});</script>", response.text, re.DOTALL)
+    match = re.search(r"var ytInitialData = ({.*?});</script>", text, re.DOTALL)
     if not match:
-        print("Could not find ytInitialData in page.")
-        return None
-
-    data = json.loads(match.group(1))
+        raise YouTubeLookupError("Could not find ytInitialData in page.")
 
     try:
+        data = json.loads(match.group(1))
         contents = data["contents"]["twoColumnSearchResultsRenderer"]["primaryContents"]\
                     ["sectionListRenderer"]["contents"]
 
@@ -34,10 +237,149 @@ def get_youtube_url(track):
             for item in items:
                 video = item.get("videoRenderer")
                 if video:
-                    video_id = video.get("videoId")
-                    return f"https://www.youtube.com/watch?v={video_id}"
+                    return video.get("videoId")
     except Exception as e:
-        print(f"Error parsing JSON: {e}")
-        return None
+        raise YouTubeLookupError(f"Error parsing JSON: {e}")
 
     return None
+
+def _search_youtube(track, session=None, base_url=SEARCH_URL, timeout=10.0,
+                    retries=0, backoff=1.0, limiter: TokenBucket = None):
+    """
+    Return the first video URL for the track, or None if the search had no video results.
+    Raises YouTubeLookupError if the search itself failed, so that failures are not cached.
+    Every search is counted and timed under the "youtube" stage of instrument.metrics.
+    """
+    query = f"{track['artist']} {track['title']}"
+    start = time.perf_counter()
+    metrics.count("youtube", "lookups")
+    try:
+        response = _fetch_results_page(query, session, base_url, timeout, retries, backoff, limiter)
+        with response:
+            try:
+                video_id, body = extract_first_video_id(response.iter_content(chunk_size=64 * 1024))
+            except requests.RequestException as e:
+                raise YouTubeLookupError(f"Failed to read search results: {e}")
+            if video_id is None:
+                video_id = parse_initial_data(body.decode("utf-8", errors="replace"))
+    except YouTubeLookupError:
+        metrics.count("youtube", "errors")
+        raise
+    finally:
+        metrics.observe("youtube", query, time.perf_counter() - start)
+
+    return f"https://www.youtube.com/watch?v={video_id}" if video_id else None
+
+def get_youtube_url(track, cache: YouTubeCache = None, session=None, base_url: str = SEARCH_URL):
+    if cache is not None:
+        found, url = cache.get(track)
+        metrics.count("youtube", "cache_hits" if found else "cache_misses")
+        if found:
+            return url
+
+    try:
+        url = _search_youtube(track, session, base_url)
+    except YouTubeLookupError as e:
+        print(e)
+        return None
+
+    if cache is not None:
+        cache.put(track, url)
+    return url
+
+def resolve_youtube_urls(
+    tracks: list,
+    cache: YouTubeCache = None,
+    concurrency: int = 8,
+    rate: float = 5.0,
+    retries: int = 3,
+    backoff: float = 1.0,
+    timeout: float = 10.0,
+    base_url: str = SEARCH_URL,
+    progress=None,
+    session: requests.Session = None,
+    limiter: TokenBucket = None,
+) -> list:
+    """
+    Resolve YouTube URLs for a whole track list concurrently.
+
+    Args:
+        tracks (list of dict): tracks with "artist" and "title"; tracks missing either resolve to None.
+        cache (YouTubeCache): consulted first; new results are written back (from the calling thread).
+        concurrency (int): maximum simultaneous requests, sharing one pooled session.
+        rate (float): requests per second allowed by the token bucket (retries included).
+        retries (int): extra attempts on 429/5xx responses and connection errors.
+        backoff (float): base delay in seconds, doubled on every retry.
+        timeout (float): per-request timeout in seconds.
+        base_url (str): search endpoint, overridable for tests.
+        progress (callable): called with the number of finished lookups, e.g. a tqdm bar's update.
+        session (requests.Session): pooled session to use (see make_session()), left open;
+            by default one is made for this call. Callers resolving batch after batch pass
+            one session and one `limiter` so connections and the rate limit carry over.
+        limiter (TokenBucket): rate limiter to use instead of a new one for `rate`.
+
+    Returns:
+        list: URL or None for each input track, in input order.
+    """
+    urls = [None] * len(tracks)
+    pending = {}  # normalized key -> indices of tracks sharing that lookup
+
+    for i, track in enumerate(tracks):
+        if not (track.get("artist") and track.get("title")):
+            continue
+        if cache is not None:
+            found, url = cache.get(track)
+            metrics.count("youtube", "cache_hits" if found else "cache_misses")
+            if found:
+                urls[i] = url
+                continue
+        pending.setdefault(normalize_query_key(track), []).append(i)
+
+    if not pending:
+        return urls
+
+    limiter = limiter or TokenBucket(rate, burst=concurrency)
+    failures = 0
+    own_session = make_session(concurrency) if session is None else nullcontext(session)
+    with own_session as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(_search_youtube, tracks[indices[0]], session, base_url, timeout, retries, backoff, limiter): indices
+            for indices in pending.values()
+        }
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                url = future.result()
+            except Exception:
+                # A lookup error or anything unexpected: one track fails, not the whole run
+                failures += 1
+                continue
+            finally:
+                if progress is not None:
+                    progress(len(indices))
+            for i in indices:
+                urls[i] = url
+            if cache is not None:
+                cache.put(tracks[indices[0]], url)
+
+    if failures:
+        print(f"⚠️ {failures} YouTube lookup(s) failed and will be retried on the next run.")
+    return urls
+
+if __name__ == "__main__":
+    # Manual overrides:  python youtube.py pin "Artist" "Title" https://www.youtube.com/watch?v=...
+    #                    python youtube.py pin "Artist" "Title"        (pin "no preview")
+    #                    python youtube.py unpin "Artist" "Title"
+    if len(sys.argv) < 4 or sys.argv[1] not in ("pin", "unpin"):
+        print("usage: youtube.py pin|unpin ARTIST TITLE [URL]")
+        sys.exit(1)
+    command, artist, title = sys.argv[1:4]
+    track = {"artist": artist, "title": title}
+    with YouTubeCache() as cache:
+        if command == "pin":
+            url = sys.argv[4] if len(sys.argv) > 4 else None
+            cache.pin(track, url)
+            print(f"📌 Pinned {artist} – {title} → {url}")
+        else:
+            cache.unpin(track)
+            print(f"🗑️ Unpinned {artist} – {title}")
@@ -0,0 +1,63 @@
+"""
+Album art cost on a synthetic library where every album embeds a ~150 KB cover.
+
+    python benchmarks/bench_artwork.py --tracks 10000 --covers 500
+
+Times the tag scan without art, with art into an empty thumbnail cache (one thumbnail per
+distinct cover), with art into the warm cache (a rescan), and a per-track thumbnail
+baseline; then packs the atlases and compares the browser's image requests and bytes
+with loading one thumbnail per cover.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import artwork
+from artwork import build_atlases, embedded_picture, make_thumbnail, thumbnail_path
+from scan_library import _iter_audio_files, _open_audio, read_metadata
+from tests.synthetic import write_audio_library
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--covers", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_audio_library(tmp / "music", args.tracks, covers=args.covers)
+        paths = [path for path, _ in _iter_audio_files(tmp / "music")]
+        print(f"{len(paths)} files, {args.covers} distinct covers")
+
+        def timed(label, run):
+            t0 = time.perf_counter()
+            result = run()
+            print(f"{label:<34} {time.perf_counter() - t0:7.2f}s")
+            return result
+
+        timed("scan, no artwork", lambda: read_metadata(paths))
+        results, _ = timed("scan + artwork, empty cache", lambda: read_metadata(paths, artwork_dir=tmp / "art"))
+        artwork._known.clear()
+        timed("scan + artwork, warm cache", lambda: read_metadata(paths, artwork_dir=tmp / "art"))
+        timed("baseline: thumbnail every track", lambda: [make_thumbnail(embedded_picture(_open_audio(p)))
+                                                          for p in paths])
+
+        keys = [r["artwork"] for r in results]
+        manifest = timed("atlas sheets", lambda: build_atlases(keys, tmp / "art", tmp / "out" / "atlas.json"))
+        distinct = list(dict.fromkeys(keys))
+        thumb_bytes = sum(thumbnail_path(tmp / "art", key).stat().st_size for key in distinct)
+        sheet_bytes = sum((tmp / "out" / name).stat().st_size for name in manifest["sheets"])
+        print(f"browser: {len(distinct)} thumbnail requests, {thumb_bytes / 1024:.0f} KB  ->  "
+              f"{len(manifest['sheets']) + 1} atlas requests, {sheet_bytes / 1024:.0f} KB "
+              f"+ atlas.json {(tmp / 'out' / 'atlas.json').stat().st_size / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare file opens and wall time of scan_library.extract_metadata (one open, native tag
+frames, stream info) against the previous reader (mutagen.File(easy=True), then a second
+open of AIFF files through ID3() for the tags the easy layer misses).
+
+    python benchmarks/bench_audio_reader.py --tracks 10000 --aiff-share 0.5
+
+Opens are counted with an audit hook on "open" events for files under the library folder.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mutagen import File
+from mutagen.id3 import ID3, ID3NoHeaderError
+
+from scan_library import _iter_audio_files, extract_metadata
+from tests.synthetic import write_audio_library
+
+OPENS = {"root": None, "count": 0}
+
+
+def _count_opens(event, args):
+    if event == "open" and OPENS["root"] and str(args[0]).startswith(OPENS["root"]):
+        OPENS["count"] += 1
+
+
+def legacy_extract_metadata(file_path):
+    """The double-open reader this benchmark is measured against."""
+    audio = File(str(file_path), easy=True)
+    metadata = {'path': str(file_path), 'title': None, 'artist': None, 'album': None, 'genre': None,
+                'date': None, 'tracknumber': None}
+    if audio:
+        for key in ('title', 'artist', 'album', 'genre', 'date', 'tracknumber'):
+            metadata[key] = audio.get(key, [None])[0]
+    if file_path.suffix.lower() in ['.aiff', '.aif']:
+        try:
+            id3 = ID3(str(file_path))
+            for key, frame in (('title', 'TIT2'), ('artist', 'TPE1'), ('album', 'TALB'), ('genre', 'TCON'),
+                               ('date', 'TDRC'), ('tracknumber', 'TRCK')):
+                metadata[key] = metadata[key] or getattr(id3.get(frame, None), "text", [None])[0]
+        except ID3NoHeaderError:
+            pass
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--aiff-share", type=float, nargs="+", default=[0.0, 0.5])
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many passes")
+    args = parser.parse_args()
+    sys.addaudithook(_count_opens)
+
+    per = 10000 / args.tracks
+    print(f"{'aiff':>5} {'reader':>8} {'opens/10k':>10} {'s/10k':>7} {'tagged':>7} {'length':>7}")
+    for share in args.aiff_share:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_audio_library(Path(tmp), args.tracks, aiff_share=share)
+            paths = [path for path, _ in _iter_audio_files(Path(tmp))]
+            OPENS["root"] = tmp
+            for name, reader in (("legacy", legacy_extract_metadata), ("single", extract_metadata)):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    OPENS["count"] = 0
+                    t0 = time.perf_counter()
+                    results = [reader(path) for path in paths]
+                    best = min(best, time.perf_counter() - t0)
+                tagged = sum(1 for r in results if r["title"] and r["genre"])
+                timed = sum(1 for r in results if r.get("length"))
+                print(f"{share:>5.0%} {name:>8} {OPENS['count'] * per:>10.0f} {best * per:>7.2f} "
+                      f"{tagged:>7} {timed:>7}")
+            OPENS["root"] = None
+
+
+if __name__ == "__main__":
+    main()
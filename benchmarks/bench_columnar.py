@@ -0,0 +1,55 @@
+"""
+Benchmark: size and parse time of prepared.json versus the columnar encoding.
+
+    python benchmarks/bench_columnar.py                          # frontend/public/prepared.json
+    python benchmarks/bench_columnar.py --input other_export.json
+
+Sizes are shown raw, gzip -9 and (if the brotli package is installed) brotli -11. Parse
+time is Python json.loads versus decode_columnar, both rebuilding the full track dicts.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from columnar import brotli, decode_columnar, encode_columnar
+
+DEFAULT_INPUT = Path(__file__).resolve().parents[1] / "frontend" / "public" / "prepared.json"
+
+
+def sizes(data: bytes):
+    out = {"raw": len(data), "gzip": len(gzip.compress(data, 9))}
+    if brotli is not None:
+        out["brotli"] = len(brotli.compress(data, quality=11))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", type=Path, default=DEFAULT_INPUT)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    json_bytes = args.input.read_bytes()
+    tracks = json.loads(json_bytes)
+    columnar_bytes = encode_columnar(tracks)
+    assert decode_columnar(columnar_bytes) == tracks
+
+    print(f"{len(tracks)} tracks from {args.input.name}")
+    json_sizes, columnar_sizes = sizes(json_bytes), sizes(columnar_bytes)
+    for kind in json_sizes:
+        print(f"  {kind:>6}: json {json_sizes[kind] / 1024:8.1f} KB   columnar {columnar_sizes[kind] / 1024:8.1f} KB"
+              f"   {json_sizes[kind] / columnar_sizes[kind]:5.1f}x smaller")
+
+    parse_json = min(timeit.repeat(lambda: json.loads(json_bytes), number=1, repeat=args.repeat))
+    parse_columnar = min(timeit.repeat(lambda: decode_columnar(columnar_bytes), number=1, repeat=args.repeat))
+    print(f"  parse: json {parse_json * 1e3:7.2f} ms   columnar {parse_columnar * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: island placement with genre proximity (genre_layout.similarity_layout) against
+the greedy packing (prepare_metadata.island_centres) on synthetic libraries, with the
+runtime and layout quality (genre_layout.layout_quality) of each.
+
+    python benchmarks/bench_genre_layout.py                          # 200, 1k and 5k genres
+    python benchmarks/bench_genre_layout.py --genres 2000 --tracks 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from genre_layout import genre_similarity, layout_quality, similarity_layout
+from prepare_metadata import _genre_registry, get_genre_groups, island_centres, island_radius
+from tests.synthetic import scan_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--genres", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--tracks", type=int, help="tracks per library (default: 100 per genre, at most 100k)")
+    args = parser.parse_args()
+
+    print(f"{'genres':>7} {'layout':<11} {'time':>8} {'gap ratio':>10} {'precision':>10} {'density':>8}")
+    for n_genres in args.genres:
+        n_tracks = args.tracks or min(100 * n_genres, 100000)
+        registry = _genre_registry()
+        groups = get_genre_groups(list(scan_records(n_tracks, n_genres, related_genres=True)), registry)
+        radii = [island_radius(len(tracks)) for tracks in groups.values()]
+
+        t0 = time.perf_counter()
+        edges = genre_similarity(registry, list(groups))
+        graph = time.perf_counter() - t0
+        for name, place in (
+            ("packed", lambda: island_centres(radii, (0, 0), 20)),
+            ("similarity", lambda: similarity_layout(radii, edges, (0, 0), 20)),
+        ):
+            t0 = time.perf_counter()
+            centres = place()
+            elapsed = time.perf_counter() - t0 + (graph if name == "similarity" else 0)
+            quality = layout_quality(centres, radii, edges)
+            assert quality["overlaps"] == 0
+            print(f"{len(groups):>7} {name:<11} {elapsed:7.2f}s {quality['similar_gap_ratio']:>10.3f} "
+                  f"{quality['neighbour_precision']:>10.1%} {quality['density']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: island_centres packing over random heavy-tailed island radii, against the
+original all-pairs packing where that still finishes in reasonable time.
+
+    python benchmarks/bench_island_centres.py                     # 100, 1k and 5k islands
+    python benchmarks/bench_island_centres.py --sizes 200 --legacy-max 200
+
+Compactness is reported as the radius of the smallest hub-centred circle holding every
+island, and as the share of that circle covered by islands.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from prepare_metadata import island_centres
+from tests.test_layout import legacy_island_centres, random_radii
+
+HUB = (0.0, 0.0)
+GAP = 20.0
+
+
+def compactness(radii, centres):
+    extent = max(math.hypot(x - HUB[0], y - HUB[1]) + r for (x, y), r in zip(centres, radii))
+    fill = sum(r * r for r in radii) / (extent * extent)
+    return extent, fill
+
+
+def run(fn, radii):
+    start = time.perf_counter()
+    centres = fn(radii, HUB, GAP)
+    return time.perf_counter() - start, centres
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--legacy-max", type=int, default=100,
+                        help="largest size to also run the all-pairs packing on (it is ~O(n^4))")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        radii = random_radii(n, args.seed)
+        elapsed, centres = run(island_centres, radii)
+        extent, fill = compactness(radii, centres)
+        line = f"{n:>6} islands: grid {elapsed:8.2f} s   extent {extent:9.0f} px   fill {fill:5.1%}"
+        if n <= args.legacy_max:
+            legacy_elapsed, legacy_centres = run(legacy_island_centres, radii)
+            same = "same layout" if legacy_centres == centres else "DIFFERENT layout"
+            line += f"   | legacy {legacy_elapsed:8.2f} s ({legacy_elapsed / elapsed:5.1f}x, {same})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Time merge.merge_sources() joining a folder scan with a Rekordbox import of the same
+synthetic library.
+
+    python benchmarks/bench_merge.py --tracks 100000
+
+The Rekordbox side lists most files under their file:// URL (a share of them with the
+drive letter and folders in different case), some files as moved elsewhere (joined by
+artist and title), some files the scan does not have, and a few duplicate entries.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from merge import merge_sources
+from tests.synthetic import synthetic_tracks
+
+
+def sources(n_tracks: int, seed: int = 0):
+    rng = random.Random(seed)
+    scan, rekordbox = [], []
+    for i, track in enumerate(synthetic_tracks(n_tracks + n_tracks // 10, seed=seed)):
+        extra = track.pop("rekordbox")
+        path = track["path"]
+        if i < n_tracks:
+            scan.append(track)
+        roll = rng.random()
+        if i < n_tracks and roll < 0.1:
+            continue                                  # not in Rekordbox
+        if i < n_tracks and roll < 0.2:
+            path = path.replace("F:/DJ MUSIC/", "E:/Old Music/")     # moved since the import
+        elif roll < 0.4:
+            path = path.upper()
+        entry = {
+            "title": track["title"], "artist": track["artist"], "album": track["album"],
+            "genre": track["genre"], "label": extra["Label"], "track_id": extra["TrackID"],
+            "file_path": "file://localhost/" + quote(path, safe="/:"),
+        }
+        rekordbox.append(entry)
+        if roll > 0.99:
+            rekordbox.append(dict(entry))             # listed twice
+    return scan, rekordbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'tracks':>8} {'rekordbox':>10} {'merged':>8} {'by path':>8} {'by a+t':>8} {'dupes':>6} {'seconds':>8}")
+    for n in args.tracks:
+        scan, rekordbox = sources(n)
+        t0 = time.perf_counter()
+        tracks, report = merge_sources({"scan": scan, "rekordbox": rekordbox})
+        seconds = time.perf_counter() - t0
+        counts = report["sources"]["rekordbox"]
+        print(f"{n:>8} {len(rekordbox):>10} {len(tracks):>8} {counts['matched_by_path']:>8} "
+              f"{counts['matched_by_artist_title']:>8} {counts['duplicates']:>6} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: building the nearest-neighbour lists over a laid-out synthetic library, and
+answering "what plays next" from them versus scanning every track per query, which is
+what the viewer would otherwise do.
+
+    python benchmarks/bench_neighbours.py --tracks 100000 --k 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neighbours import NeighbourIndex
+from prepare_metadata import build_islands_db, get_genre_groups, prepare_track
+from tests.synthetic import scan_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=100000)
+    parser.add_argument("--genres", type=int, default=400)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=100000)
+    args = parser.parse_args()
+
+    islands = build_islands_db(get_genre_groups(list(scan_records(args.tracks, args.genres))))
+    tracks = [
+        prepare_track(track, x, y, island.colour, None)
+        for island in islands
+        for track, (x, y) in zip(island.tracks, island.tile_positions.tolist())
+    ]
+    print(f"laid out {len(tracks)} tracks on {len(islands)} islands")
+
+    t0 = time.perf_counter()
+    index = NeighbourIndex.from_tracks(tracks, args.k)
+    build = time.perf_counter() - t0
+    size = len(index.encode())
+    print(f"build k={args.k}: {build:6.2f}s   file {size / 1e6:.1f} MB")
+
+    rng = np.random.default_rng(0)
+    ids = [tracks[i]["id"] for i in rng.integers(len(tracks), size=args.queries)]
+    t0 = time.perf_counter()
+    for track_id in ids:
+        index.related(track_id)
+    indexed = (time.perf_counter() - t0) / len(ids)
+
+    # The alternative: find the track, then measure the distance to every other track
+    xy = np.array([(t["x"], t["y"]) for t in tracks])
+    row = {t["id"]: i for i, t in enumerate(tracks)}
+    sample = ids[:200]
+    t0 = time.perf_counter()
+    for track_id in sample:
+        d2 = ((xy - xy[row[track_id]]) ** 2).sum(axis=1)
+        d2[row[track_id]] = np.inf
+        np.argpartition(d2, args.k)[:args.k]
+    scan = (time.perf_counter() - t0) / len(sample)
+
+    print(f"related(): {indexed * 1e6:8.1f} us/query   full scan: {scan * 1e6:8.1f} us/query   "
+          f"{scan / indexed:6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare peak memory and wall time of the streaming Rekordbox importer against the
+previous ET.parse implementation on a generated export.
+
+    python benchmarks/bench_rekordbox_import.py --tracks 200000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.synthetic import write_rekordbox_xml
+
+
+def legacy_parse_rekordbox_xml(xml_path, playlist_filter=None):
+    """The ET.parse implementation this benchmark is measured against."""
+    root = ET.parse(xml_path).getroot()
+    track_dict = {}
+    for track in root.find("COLLECTION").findall("TRACK"):
+        track_id = track.attrib.get("TrackID")
+        if track_id:
+            track_dict[track_id] = {
+                "title": track.attrib.get("Name"),
+                "artist": track.attrib.get("Artist"),
+                "album": track.attrib.get("Album"),
+                "genre": track.attrib.get("Genre"),
+                "label": track.attrib.get("Label"),
+                "track_id": track_id,
+                "file_path": track.attrib.get("Location"),
+            }
+    if playlist_filter:
+        def find_playlist_tracks(node):
+            for child in node.findall("NODE"):
+                if child.attrib.get("Name") == playlist_filter:
+                    return [track.attrib["Key"] for track in child.findall("TRACK")]
+                result = find_playlist_tracks(child)
+                if result:
+                    return result
+            return []
+        track_ids = find_playlist_tracks(root.find("PLAYLISTS"))
+        return [track_dict[tid] for tid in track_ids if tid in track_dict]
+    return list(track_dict.values())
+
+
+def run_one(impl: str, xml_path: str, playlist: str):
+    """Child-process entry point so each implementation gets a clean peak RSS."""
+    from scan_library import iter_rekordbox_tracks
+
+    t0 = time.perf_counter()
+    if impl == "legacy":
+        count = len(legacy_parse_rekordbox_xml(xml_path, playlist or None))
+    elif impl == "stream":
+        # Consume the generator without materialising a list, as a streaming caller would
+        count = sum(1 for _ in iter_rekordbox_tracks(Path(xml_path), playlist or None))
+    else:
+        count = len(list(iter_rekordbox_tracks(Path(xml_path), playlist or None)))
+    elapsed = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"count": count, "seconds": elapsed, "peak_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=200000)
+    parser.add_argument("--playlist-size", type=int, default=5000)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = Path(tmp) / "export.xml"
+        write_rekordbox_xml(xml_path, args.tracks, star_playlist_size=args.playlist_size)
+        size_mb = xml_path.stat().st_size / 1e6
+        print(f"generated {args.tracks} tracks, {size_mb:.0f} MB")
+
+        for playlist in ("", "5star"):
+            for impl in ("legacy", "stream", "list"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", impl, str(xml_path), playlist],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                label = f"{impl} ({'playlist' if playlist else 'all tracks'})"
+                print(f"{label:>24}: {result['count']:7d} tracks  {result['seconds']:6.2f}s  "
+                      f"peak RSS {result['peak_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
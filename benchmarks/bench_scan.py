@@ -0,0 +1,51 @@
+"""
+Time scan_music_folder tag extraction on a synthetic tagged library.
+
+    python benchmarks/bench_scan.py --tracks 10000 --workers 1 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scan_library import read_metadata, _iter_audio_files
+from tests.synthetic import write_audio_library
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--executor", choices=["thread", "process", "both"], default="both")
+    args = parser.parse_args()
+
+    executors = ["thread", "process"] if args.executor == "both" else [args.executor]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        write_audio_library(root, args.tracks)
+        print(f"generated {args.tracks} tagged files in {time.perf_counter() - t0:.1f}s")
+        paths = [path for path, _ in _iter_audio_files(root)]
+
+        baseline = None
+        for executor in executors:
+            for workers in args.workers:
+                if workers == 1 and executor != executors[0]:
+                    continue
+                t0 = time.perf_counter()
+                results, errors = read_metadata(paths, workers=workers, executor=executor)
+                elapsed = time.perf_counter() - t0
+                baseline = baseline or elapsed
+                label = "serial" if workers == 1 else f"{executor} x{workers}"
+                print(f"{label:>12}: {elapsed:6.2f}s  {len(paths) / elapsed:8.0f} files/s  "
+                      f"speedup {baseline / elapsed:4.2f}x  errors={len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: build time, size and query latency of the search index on a synthetic
+library, for an as-you-type query mix (every prefix of a word, two-word queries and
+words matched inside other words), against a linear scan of the track list.
+
+    python benchmarks/bench_search.py --tracks 100000
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from prepare_metadata import prepare_track
+from search import SEARCH_FIELDS, SearchIndex, tokenize
+from tests.synthetic import scan_records
+
+
+def query_mix(tracks, n, seed=0):
+    """Queries as typed: every prefix of one or two words of a random track, some infixes."""
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < n:
+        track = rng.choice(tracks)
+        words = [w for field in SEARCH_FIELDS for w in tokenize(track.get(field))]
+        word = rng.choice(words)
+        kind = rng.random()
+        if kind < 0.6:
+            queries += [word[:i] for i in range(1, len(word) + 1)]
+        elif kind < 0.9:
+            first, second = rng.sample(words, 2) if len(words) > 1 else (word, word)
+            queries += [f"{first} {second[:i]}" for i in range(1, len(second) + 1)]
+        else:
+            queries.append(word[1:] if len(word) > 3 else word)
+    return queries[:n]
+
+
+def linear_scan(tracks, query):
+    words = tokenize(query)
+    return [t["id"] for t in tracks
+            if all(any(w in token for token in tokenize(" ".join(str(t.get(f) or "") for f in SEARCH_FIELDS)))
+                   for w in words)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    tracks = [prepare_track(t, 0.0, 0.0, "#fff", None) for t in scan_records(args.tracks, max(20, args.tracks // 250))]
+
+    t0 = time.perf_counter()
+    index = SearchIndex.build(tracks)
+    build = time.perf_counter() - t0
+    data = index.encode()
+    t0 = time.perf_counter()
+    index = SearchIndex.decode(data)
+    load = time.perf_counter() - t0
+    print(f"{len(tracks)} tracks, {len(index.terms)} terms: build {build:.2f}s, load {load * 1000:.0f} ms, "
+          f"{len(data) / 1e6:.1f} MB raw, {len(gzip.compress(data, 6)) / 1e6:.1f} MB gzip")
+
+    latencies = []
+    for query in query_mix(tracks, args.queries):
+        t0 = time.perf_counter()
+        index.search(query)
+        latencies.append(time.perf_counter() - t0)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    print(f"index:       p50 {p50:6.2f} ms   p90 {p90:6.2f} ms   p99 {p99:6.2f} ms   max {max(latencies) * 1000:6.1f} ms")
+
+    sample = query_mix(tracks, 5, seed=1)
+    t0 = time.perf_counter()
+    for query in sample:
+        linear_scan(tracks, query)
+    print(f"linear scan: {(time.perf_counter() - t0) / len(sample) * 1000:6.0f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Per-stage pipeline benchmarks on synthetic libraries (see tests/synthetic.py) of
+1k, 10k and 100k tracks, with pytest-benchmark:
+
+    python -m pytest benchmarks/bench_stages.py --benchmark-autosave
+    python -m pytest benchmarks/bench_stages.py --benchmark-compare      # against the last saved run
+
+Each stage is its own benchmark group, so the report lists the sizes side by side.
+Pick sizes with BENCH_SIZES, e.g. BENCH_SIZES=1000,10000 for a quick run (generating the
+100k-file audio library alone takes a few minutes). YouTube lookups are served from a
+pre-filled cache, so nothing touches the network.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from columnar import encode_columnar
+from ndjson import write_ndjson
+from neighbours import NeighbourIndex
+from prepare_metadata import (
+    all_tile_positions, build_islands_db, get_genre_groups, island_centres,
+    island_radius, main as prepare_main, prepare_stream,
+)
+from scan_library import parse_rekordbox_xml, scan_music_folder
+from search import SearchIndex
+from youtube import YouTubeCache
+from tests.synthetic import scan_records, write_audio_library, write_rekordbox_xml
+
+SIZES = [int(n) for n in os.environ.get("BENCH_SIZES", "1000,10000,100000").split(",")]
+
+
+def n_genres(n_tracks: int) -> int:
+    """Bigger libraries are spread over more genres, as real ones are."""
+    return max(20, n_tracks // 250)
+
+
+def rounds(n_tracks: int) -> int:
+    return 5 if n_tracks <= 1000 else 3 if n_tracks <= 10000 else 1
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda n: f"{n // 1000}k")
+def size(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def library(size, tmp_path_factory):
+    """Scan output for `size` tracks as JSON and NDJSON, plus a YouTube cache holding all of them."""
+    root = tmp_path_factory.mktemp(f"library_{size}")
+    tracks = list(scan_records(size, n_genres(size)))
+    (root / "library.json").write_text(json.dumps(tracks, ensure_ascii=False), encoding="utf-8")
+    write_ndjson(tracks, root / "library.ndjson")
+    with YouTubeCache(root / "youtube.sqlite") as cache:
+        for i, track in enumerate(tracks):
+            cache.put(track, f"https://www.youtube.com/watch?v={i:011d}")
+    return root, tracks
+
+
+@pytest.fixture(scope="session")
+def rekordbox_xml(size, tmp_path_factory):
+    return write_rekordbox_xml(tmp_path_factory.mktemp(f"rekordbox_{size}") / "export.xml",
+                               size, n_genres(size))
+
+
+@pytest.fixture(scope="session")
+def audio_folder(size, tmp_path_factory):
+    return write_audio_library(tmp_path_factory.mktemp(f"audio_{size}"), size, n_genres(size))
+
+
+def run(benchmark, size, fn, *args, **kwargs):
+    return benchmark.pedantic(fn, args, kwargs, rounds=rounds(size), iterations=1)
+
+
+@pytest.mark.benchmark(group="scan_music_folder")
+def test_scan_music_folder(benchmark, size, audio_folder):
+    tracks = run(benchmark, size, scan_music_folder, audio_folder)
+    assert len(tracks) == size
+
+
+@pytest.mark.benchmark(group="parse_rekordbox_xml")
+def test_parse_rekordbox_xml(benchmark, size, rekordbox_xml):
+    tracks = run(benchmark, size, parse_rekordbox_xml, rekordbox_xml)
+    assert len(tracks) == size
+
+
+@pytest.mark.benchmark(group="parse_rekordbox_xml[5star]")
+def test_parse_rekordbox_playlist(benchmark, size, rekordbox_xml):
+    tracks = run(benchmark, size, parse_rekordbox_xml, rekordbox_xml, "5star")
+    assert len(tracks) == max(1, size // 20)
+
+
+@pytest.mark.benchmark(group="get_genre_groups")
+def test_get_genre_groups(benchmark, size, library):
+    _, tracks = library
+    groups = run(benchmark, size, get_genre_groups, tracks)
+    assert sum(len(group) for group in groups.values()) == size
+
+
+@pytest.mark.benchmark(group="island_centres")
+def test_island_centres(benchmark, size, library):
+    _, tracks = library
+    radii = [island_radius(len(group)) for group in get_genre_groups(tracks).values()]
+    centres = run(benchmark, size, island_centres, radii)
+    assert len(centres) == len(radii)
+
+
+@pytest.mark.benchmark(group="all_tile_positions")
+def test_all_tile_positions(benchmark, size, library):
+    _, tracks = library
+    counts = [len(group) for group in get_genre_groups(tracks).values()]
+    centres = [(0.0, 0.0)] * len(counts)
+    positions = run(benchmark, size, all_tile_positions, counts, centres)
+    assert len(positions) == size
+
+
+@pytest.mark.benchmark(group="build_islands_db")
+def test_build_islands_db(benchmark, size, library):
+    _, tracks = library
+    groups = get_genre_groups(tracks)
+    islands = run(benchmark, size, build_islands_db, groups)
+    assert sum(len(island.tracks) for island in islands) == size
+
+
+@pytest.mark.benchmark(group="prepare_metadata.main")
+def test_prepare_main(benchmark, size, library):
+    root, _ = library
+    run(benchmark, size, prepare_main, root / "library.json", root / "prepared.json", root / "youtube.sqlite")
+    with (root / "prepared.json").open(encoding="utf-8") as f:
+        assert len(json.load(f)) == size
+
+
+@pytest.mark.benchmark(group="prepare_stream")
+def test_prepare_stream(benchmark, size, library):
+    root, _ = library
+    count = run(benchmark, size, prepare_stream, root / "library.ndjson", root / "prepared.ndjson",
+                root / "youtube.sqlite")
+    assert count == size
+
+
+def prepared_tracks(root):
+    if not (root / "prepared.json").exists():
+        prepare_main(root / "library.json", root / "prepared.json", root / "youtube.sqlite")
+    with (root / "prepared.json").open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.benchmark(group="encode_columnar")
+def test_encode_columnar(benchmark, size, library):
+    data = run(benchmark, size, encode_columnar, prepared_tracks(library[0]))
+    assert data
+
+
+@pytest.mark.benchmark(group="neighbours")
+def test_neighbours(benchmark, size, library):
+    index = run(benchmark, size, NeighbourIndex.from_tracks, prepared_tracks(library[0]))
+    assert len(index.ids) == size
+
+
+@pytest.mark.benchmark(group="search")
+def test_search_index(benchmark, size, library):
+    index = run(benchmark, size, SearchIndex.build, prepared_tracks(library[0]))
+    assert index.count == size
@@ -0,0 +1,93 @@
+"""
+Compare peak memory of the in-memory prepare step (json.load → group → layout → one
+list → json.dump, as prepare_metadata.main does minus YouTube) against prepare_stream()
+over NDJSON, at a few library sizes. YouTube lookups are skipped in both.
+
+    python benchmarks/bench_streaming.py --tracks 20000 100000 300000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_library(json_path: Path, ndjson_path: Path, n_tracks: int):
+    # Written record by record: the parent must stay small, as a child's peak RSS
+    # counts the parent's size at fork time
+    from ndjson import write_ndjson
+    from tests.synthetic import scan_records
+
+    def tracks():
+        return scan_records(n_tracks, n_genres=150, seed=n_tracks)
+
+    write_ndjson(tracks(), ndjson_path)
+    with json_path.open("w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, track in enumerate(tracks()):
+            f.write(("," if i else "") + json.dumps(track, indent=2, ensure_ascii=False) + "\n")
+        f.write("]\n")
+
+
+def in_memory(input_json: Path, output_json: Path) -> int:
+    from prepare_metadata import build_islands_db, get_genre_groups, prepare_track
+
+    with input_json.open("r", encoding="utf-8") as f:
+        raw_tracks = json.load(f)
+    islands = build_islands_db(get_genre_groups(raw_tracks))
+    prepared = [
+        prepare_track(track, x, y, island.colour, None)
+        for island in islands
+        for track, (x, y) in zip(island.tracks, island.tile_positions.tolist())
+    ]
+    with output_json.open("w", encoding="utf-8") as f:
+        json.dump(prepared, f, indent=2, ensure_ascii=False)
+    return len(prepared)
+
+
+def run_one(impl: str, tmp: str):
+    """Child-process entry point so each implementation gets a clean peak RSS."""
+    from prepare_metadata import prepare_stream
+
+    tmp = Path(tmp)
+    t0 = time.perf_counter()
+    if impl == "in-memory":
+        count = in_memory(tmp / "library.json", tmp / "prepared.json")
+    else:
+        count = prepare_stream(tmp / "library.ndjson", tmp / "prepared.ndjson", resolve_previews=False)
+    elapsed = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"count": count, "seconds": elapsed, "peak_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[20000, 100000, 300000])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(*args.child)
+        return
+
+    for n_tracks in args.tracks:
+        with tempfile.TemporaryDirectory() as tmp:
+            make_library(Path(tmp) / "library.json", Path(tmp) / "library.ndjson", n_tracks)
+            for impl in ("in-memory", "stream"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", impl, tmp],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                print(f"{n_tracks:>8} tracks  {impl:>9}: {result['seconds']:6.2f}s  peak RSS {result['peak_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
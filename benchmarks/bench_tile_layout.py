@@ -0,0 +1,52 @@
+"""
+Benchmark: tile coordinates for every island, one island_tile_positions() walk per island
+versus the template-based all_tile_positions() that lays out all tiles in one array.
+
+    python benchmarks/bench_tile_layout.py                 # ~100k tiles over 2,000 islands
+    python benchmarks/bench_tile_layout.py --tiles 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from prepare_metadata import all_tile_positions, island_tile_positions
+
+
+def island_sizes(total, islands, seed):
+    # Heavy-tailed like real genre sizes, scaled to roughly `total` tiles
+    rng = random.Random(seed)
+    weights = [rng.paretovariate(1.2) for _ in range(islands)]
+    scale = total / sum(weights)
+    return [max(1, round(w * scale)) for w in weights]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tiles", type=int, default=100_000)
+    parser.add_argument("--islands", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    counts = island_sizes(args.tiles, args.islands, args.seed)
+    centres = [(i * 5000.0, i * 2500.0) for i in range(len(counts))]
+
+    def per_island():
+        return [xy for n, c in zip(counts, centres) for xy in island_tile_positions(n, c, 100, 10)]
+
+    def vectorised():
+        return all_tile_positions(counts, centres, 100, 10)
+
+    assert [tuple(xy) for xy in vectorised().tolist()] == per_island()
+    loop = min(timeit.repeat(per_island, number=1, repeat=args.repeat))
+    vec = min(timeit.repeat(vectorised, number=1, repeat=args.repeat))
+    print(f"{sum(counts)} tiles, {len(counts)} islands (largest {max(counts)}): "
+          f"per-island {loop * 1e3:8.1f} ms   all at once {vec * 1e3:7.1f} ms   {loop / vec:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
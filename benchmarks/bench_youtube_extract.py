@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: first-video extraction from YouTube results pages, full regex + json.loads
+parse versus the incremental fast path.
+
+    python benchmarks/bench_youtube_extract.py                  # synthetic ~1 MB pages
+    python benchmarks/bench_youtube_extract.py --pages saved/   # real pages saved as *.html
+"""
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from youtube import extract_first_video_id, parse_initial_data
+from tests.youtube_stub import results_page
+
+CHUNK = 64 * 1024
+
+
+def synthetic_pages():
+    # Roughly the shape of a live results page: ~300 KB of player/config scripts, then a
+    # ~700 KB ytInitialData with 20 heavy video renderers and an ad slot in front.
+    ids = [f"vid{i:08d}" for i in range(20)]
+    return {
+        "typical": results_page(ids, padding=2000, preamble=300_000, video_payload=35_000).encode("utf-8"),
+        "ad-heavy": results_page(ids, padding=150_000, preamble=300_000, video_payload=25_000).encode("utf-8"),
+        "no results": results_page([], preamble=300_000).encode("utf-8"),
+    }
+
+
+def full_path(page: bytes):
+    # What _search_youtube did before: decode the whole response, then regex + json.loads
+    return parse_initial_data(page.decode("utf-8"))
+
+
+def fast_path(page: bytes):
+    chunks = (page[i:i + CHUNK] for i in range(0, len(page), CHUNK))
+    video_id, body = extract_first_video_id(chunks)
+    if video_id is None:
+        return parse_initial_data(body.decode("utf-8"))
+    return video_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=Path, help="directory of saved results pages (*.html)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {p.name: p.read_bytes() for p in sorted(args.pages.glob("*.html"))}
+    else:
+        pages = synthetic_pages()
+
+    for name, page in pages.items():
+        assert full_path(page) == fast_path(page), name
+        full = min(timeit.repeat(lambda: full_path(page), number=1, repeat=args.repeat))
+        fast = min(timeit.repeat(lambda: fast_path(page), number=1, repeat=args.repeat))
+        print(f"{name:>12} ({len(page) / 1e6:4.2f} MB): full {full * 1e3:7.2f} ms   "
+              f"fast {fast * 1e3:7.2f} ms   {full / fast:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
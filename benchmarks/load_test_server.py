@@ -0,0 +1,163 @@
+"""
+Load test for the local track server (backend/server.py): starts `cli.py serve` on a
+synthetic prepared library, runs keep-alive clients against it for a while and reports
+requests per second and p50 / p99 latency per kind of request.
+
+    python benchmarks/load_test_server.py --tracks 100000 --clients 8 --duration 20
+    python benchmarks/load_test_server.py --url http://127.0.0.1:8765     # a running server
+
+The request mix is what a panning and zooming viewer sends: viewports around random
+points at a few zoom levels, the same few "hot" viewports again and again (start view,
+favourite areas), revalidations with If-None-Match, and single-track lookups.
+"""
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND.parent))
+
+from prepare_metadata import build_islands_db, get_genre_groups, prepare_track
+from tests.synthetic import scan_records
+
+SCREEN = (1920, 1080)
+ZOOMS = [1.0, 0.5, 0.25, 0.1]
+MIX = [("viewport", 0.5), ("hot", 0.2), ("revalidate", 0.15), ("track", 0.15)]
+
+
+def write_library(path: Path, n_tracks: int, n_genres: int) -> list:
+    islands = build_islands_db(get_genre_groups(list(scan_records(n_tracks, n_genres))))
+    tracks = [
+        prepare_track(track, x, y, island.colour, None)
+        for island in islands
+        for track, (x, y) in zip(island.tracks, island.tile_positions.tolist())
+    ]
+    path.write_text(json.dumps(tracks), encoding="utf-8")
+    return tracks
+
+
+def start_server(prepared: Path, db: Path):
+    """`cli.py serve` on a free port; returns (process, host, port) once it is listening."""
+    process = subprocess.Popen(
+        [sys.executable, str(BACKEND / "cli.py"), "serve", "--prepared", str(prepared), "--db", str(db),
+         "--port", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    for line in process.stdout:
+        if "http://" in line:
+            address = urlsplit(line.split()[-1])
+            return process, address.hostname, address.port
+    raise RuntimeError("server exited before listening")
+
+
+def viewport(rng, xs, ys, zoom):
+    """Query string of a screen-sized viewport around a random track, at `zoom`."""
+    i = rng.randrange(len(xs))
+    w, h = SCREEN[0] / zoom, SCREEN[1] / zoom
+    # Clients snap the view to a coarse grid while panning, as tile-based maps do
+    step = 256 / zoom
+    x0, y0 = (xs[i] - w / 2) // step * step, (ys[i] - h / 2) // step * step
+    return f"/tracks?bbox={x0:g},{y0:g},{x0 + w:g},{y0 + h:g}&zoom={zoom:g}"
+
+
+def client(host, port, seed, deadline, xs, ys, ids, hot, results):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port)
+    seen = {}   # path -> ETag
+    kinds, weights = zip(*MIX)
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        headers = {"Accept-Encoding": "gzip"}
+        if kind == "viewport":
+            path = viewport(rng, xs, ys, rng.choice(ZOOMS))
+        elif kind == "hot":
+            path = rng.choice(hot)
+        elif kind == "revalidate" and seen:
+            path = rng.choice(list(seen))
+            headers["If-None-Match"] = seen[path]
+        else:
+            kind, path = "track", f"/tracks/{rng.choice(ids)}"
+        t0 = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - t0
+        if response.status == 200 and kind != "track" and len(seen) < 1000:
+            seen[path] = response.getheader("ETag")
+        results.append((kind, elapsed, len(body), response.status))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=100000)
+    parser.add_argument("--genres", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--url", help="test a running server instead (its library must be the synthetic one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = Path(tmp) / "prepared.json"
+        t0 = time.perf_counter()
+        tracks = write_library(prepared, args.tracks, args.genres)
+        print(f"library: {len(tracks)} tracks ({time.perf_counter() - t0:.1f}s)")
+        process = None
+        if args.url:
+            address = urlsplit(args.url)
+            host, port = address.hostname, address.port
+        else:
+            t0 = time.perf_counter()
+            process, host, port = start_server(prepared, Path(tmp) / "tracks.sqlite")
+            print(f"server: http://{host}:{port} (indexed in {time.perf_counter() - t0:.1f}s)")
+
+        try:
+            xs = [t["x"] for t in tracks]
+            ys = [t["y"] for t in tracks]
+            ids = [t["id"] for t in tracks]
+            rng = random.Random(1)
+            hot = [viewport(rng, xs, ys, rng.choice(ZOOMS)) for _ in range(10)]
+            results = []
+            deadline = time.perf_counter() + args.duration
+            threads = [
+                threading.Thread(target=client, args=(host, port, seed, deadline, xs, ys, ids, hot, results))
+                for seed in range(args.clients)
+            ]
+            t0 = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - t0
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    errors = sum(1 for r in results if r[3] not in (200, 304))
+    print(f"{len(results)} requests in {elapsed:.1f}s with {args.clients} clients: "
+          f"{len(results) / elapsed:,.0f} requests/s, {sum(r[2] for r in results) / elapsed / 1e6:.1f} MB/s, "
+          f"{errors} errors")
+    print(f"{'kind':<11} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'avg KB':>8}")
+    for kind in [k for k, _ in MIX] + ["all"]:
+        rows = [r for r in results if kind in (r[0], "all")]
+        if not rows:
+            continue
+        latency = np.array([r[1] for r in rows]) * 1000
+        print(f"{kind:<11} {len(rows):>9} {np.percentile(latency, 50):>8.2f} {np.percentile(latency, 99):>8.2f} "
+              f"{np.mean([r[2] for r in rows]) / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+// Album art sprite atlases written by backend/artwork.py (atlas.json plus atlas_N.jpg
+// sheets next to prepared.json). Every cover is one cell of a sheet, so the canvas loads
+// a handful of images however many tracks have art.
+
+const VERSION = 1;
+
+export async function loadAtlas(baseUrl) {
+  const res = await fetch(baseUrl + "atlas.json");
+  if (!res.ok) return null;
+  const manifest = await res.json();
+  if (manifest.version !== VERSION) {
+    throw new Error(`unsupported atlas version ${manifest.version}`);
+  }
+
+  const sheets = manifest.sheets.map((name) => {
+    const image = new window.Image();
+    image.src = baseUrl + name;
+    return image;
+  });
+
+  // { image, crop } for a track's cover, ready for a Konva <Image image crop />, or null.
+  // UVs are fractions of the sheet, so crops are resolved once the sheet has loaded.
+  const sprite = (track) => {
+    const uv = track.artwork && manifest.uv[track.artwork];
+    if (!uv) return null;
+    const [sheet, u0, v0, u1, v1] = uv;
+    const image = sheets[sheet];
+    const w = image.naturalWidth;
+    const h = image.naturalHeight;
+    return { image, crop: { x: u0 * w, y: v0 * h, width: (u1 - u0) * w, height: (v1 - v0) * h } };
+  };
+
+  return { thumb: manifest.thumb, sheets, sprite };
+}
@@ -0,0 +1,78 @@
+// Decoder for the compact columnar track file written by backend/columnar.py
+// (prepared.bin). Returns the same track objects as prepared.json.
+
+const MAGIC = [0x4d, 0x56, 0x43, 0x4f, 0x4c, 0x00, 0x00, 0x01]; // "MVCOL\0\0\1"
+const VERSION = 1;
+const YOUTUBE_PREFIX = "https://www.youtube.com/watch?v=";
+const HEX = Array.from({ length: 256 }, (_, b) => b.toString(16).padStart(2, "0"));
+const TYPED_ARRAYS = {
+  "|u1": Uint8Array,
+  "<u2": Uint16Array,
+  "<u4": Uint32Array,
+  "<f4": Float32Array,
+};
+
+// Same string as the Python f-string in prepare_metadata (which prints a missing value as "None")
+const py = (value) => (value === null ? "None" : value ?? "");
+
+export function buyUrl(track) {
+  return `https://bandcamp.com/search?q=${py(track.artist)}+${py(track.title)}`.replaceAll(" ", "+");
+}
+
+export function decodeColumnar(buffer) {
+  const bytes = new Uint8Array(buffer);
+  if (!MAGIC.every((b, i) => bytes[i] === b)) {
+    throw new Error("not a columnar track file");
+  }
+  const headLen = new DataView(buffer).getUint32(MAGIC.length, true);
+  const start = MAGIC.length + 4;
+  const header = JSON.parse(new TextDecoder().decode(bytes.subarray(start, start + headLen)));
+  if (header.version !== VERSION) {
+    throw new Error(`unsupported columnar version ${header.version}`);
+  }
+  const body = start + headLen + ((8 - ((start + headLen) % 8)) % 8);
+
+  const array = (name) => {
+    const spec = header.arrays[name];
+    const Type = TYPED_ARRAYS[spec.dtype];
+    return new Type(buffer, body + spec.offset, spec.length);
+  };
+
+  const { count, strings, dicts, overrides } = header;
+  const codes = {};
+  for (const field of Object.keys(dicts)) codes[field] = array(field);
+  const xy = array("xy");
+  const digests = strings.id ? null : array("id");
+  const hex = (i) => {
+    let out = "";
+    for (let j = 16 * i; j < 16 * i + 16; j++) out += HEX[digests[j]];
+    return out;
+  };
+  const round2 = (v) => Math.round(v * 100) / 100;
+
+  const tracks = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const video = strings.youtube[i];
+    const track = {
+      id: digests ? hex(i) : strings.id[i],
+      title: strings.title[i],
+      artist: strings.artist[i],
+      album: dicts.album[codes.album[i]],
+      genre: dicts.genre[codes.genre[i]],
+      decade: dicts.decade[codes.decade[i]],
+      date: strings.date[i],
+      tracknumber: strings.tracknumber[i],
+      path: strings.path[i],
+      x: round2(xy[2 * i]),
+      y: round2(xy[2 * i + 1]),
+      colour: dicts.colour[codes.colour[i]],
+      preview_url: overrides.preview_url[i] ?? (video ? YOUTUBE_PREFIX + video : null),
+    };
+    track.buy_url = overrides.buy_url[i] ?? buyUrl(track);
+    // Optional column: only tracks with album art carry an "artwork" hash
+    const artwork = dicts.artwork ? dicts.artwork[codes.artwork[i]] : null;
+    if (artwork !== null) track.artwork = artwork;
+    tracks[i] = track;
+  }
+  return tracks;
+}
@@ -0,0 +1,35 @@
+// Reader for the nearest-neighbour file written by backend/neighbours.py
+// (neighbours.bin): the k tracks closest to each track on the canvas, for auto-play.
+
+const MAGIC = [0x4d, 0x56, 0x4b, 0x4e, 0x4e, 0x00, 0x00, 0x01]; // "MVKNN\0\0\1"
+const HEX = Array.from({ length: 256 }, (_, b) => b.toString(16).padStart(2, "0"));
+
+export function decodeNeighbours(buffer) {
+  const bytes = new Uint8Array(buffer);
+  if (!MAGIC.every((b, i) => bytes[i] === b)) {
+    throw new Error("not a neighbour file");
+  }
+  const view = new DataView(buffer);
+  const count = view.getUint32(MAGIC.length, true);
+  const k = view.getUint32(MAGIC.length + 4, true);
+  const start = MAGIC.length + 8;
+
+  const ids = new Array(count);
+  const rows = new Map();
+  for (let i = 0; i < count; i++) {
+    let id = "";
+    for (let j = start + 16 * i; j < start + 16 * i + 16; j++) id += HEX[bytes[j]];
+    ids[i] = id;
+    if (!rows.has(id)) rows.set(id, i);
+  }
+  const neighbours = new Uint32Array(buffer, start + 16 * count, count * k);
+
+  // Ids of the tracks nearest to `id`, nearest first ([] for an unknown id)
+  const related = (id, limit = k) => {
+    const row = rows.get(id);
+    if (row === undefined) return [];
+    return Array.from(neighbours.subarray(row * k, row * k + Math.min(limit, k)), (i) => ids[i]);
+  };
+
+  return { k, ids, neighbours, related };
+}
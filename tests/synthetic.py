@@ -0,0 +1,220 @@
+"""
+Synthetic libraries for tests and benchmarks: Rekordbox XML exports shaped like
+data/demo_rekordbox.xml and folders of small tagged audio files.
+
+    python tests/synthetic.py rekordbox data/synthetic.xml --tracks 100000 --genres 300
+    python tests/synthetic.py audio data/synthetic_music --tracks 10000
+"""
+import argparse
+import io
+import random
+import struct
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import quoteattr
+
+# Four silent MPEG-1 layer III frames: the smallest file mutagen reads as a valid MP3
+SILENT_MP3 = (b"\xff\xfb\x90\x00" + b"\x00" * 413) * 4
+
+def silent_aiff(frames: int = 441) -> bytes:
+    """An uncompressed 16-bit stereo 44.1 kHz AIFF of `frames` silent sample frames."""
+    # COMM: channels, sample frames, bits per sample, then 44100 as an 80-bit extended float
+    comm = struct.pack(">hIh", 2, frames, 16) + b"\x40\x0e\xac\x44" + b"\x00" * 6
+    ssnd = struct.pack(">II", 0, 0) + b"\x00" * (frames * 4)
+    body = b"AIFF" + b"COMM" + struct.pack(">I", len(comm)) + comm + b"SSND" + struct.pack(">I", len(ssnd)) + ssnd
+    return b"FORM" + struct.pack(">I", len(body)) + body
+
+BASE_GENRES = [
+    "House", "Deep House", "Tech House", "Techno", "Detroit Techno", "Electro", "Leftfield",
+    "Progressive House", "Goa Trance", "Italo House", "Tribal House", "Downtempo", "Dub",
+    "Bleep", "Disco", "Ambient", "Drum & Bass", "Jungle", "Garage", "Acid House",
+]
+KEYS = ["Am", "Dm", "Em", "Gm", "Cm", "Fm", "Bbm", "Dbm", "C", "F", "G", "Eb"]
+
+def genre_names(n_genres: int) -> list:
+    """`n_genres` distinct genre names, the demo export's genres first."""
+    names = list(BASE_GENRES[:n_genres])
+    i = 0
+    while len(names) < n_genres:
+        names.append(f"{BASE_GENRES[i % len(BASE_GENRES)]} {i // len(BASE_GENRES) + 2}")
+        i += 1
+    return names
+
+def synthetic_tracks(n_tracks: int, n_genres: int = 50, seed: int = 0, related_genres: bool = False):
+    """
+    Yield `n_tracks` track dicts in scan_library's output shape (title, artist, album,
+    genre, date, path), plus the extra Rekordbox fields under "rekordbox".
+
+    Genre popularity is Zipf-like (a few big genres, a long tail of small ones) and about
+    a third of the tracks carry two or three comma-separated genres, as in the demo export.
+    The extra genres are drawn at random, or with `related_genres` from near the first one
+    in genre_names() order (House with Deep House and Tech House …), so genres have related
+    neighbours for the similarity layout to find.
+    """
+    rng = random.Random(seed)
+    genres = genre_names(n_genres)
+    weights = [1 / (rank + 1) for rank in range(n_genres)]
+    for i in range(n_tracks):
+        first = rng.choices(range(n_genres), weights)[0]
+        picked = [genres[first]]
+        if rng.random() < 0.35:
+            if related_genres:
+                picked += [genres[(first + rng.choice((-3, -2, -1, 1, 2, 3))) % n_genres]
+                           for _ in range(rng.randint(1, 2))]
+            else:
+                picked += rng.sample(genres, rng.randint(1, 2))
+        artist = f"Artist {rng.randrange(max(1, n_tracks // 8))}"
+        title = f"Track {i} ({rng.choice(['Original Mix', 'Extended Mix', 'Dub', 'Edit'])})"
+        bpm = rng.uniform(100, 140)
+        yield {
+            "title": title,
+            "artist": artist,
+            "album": f"Album {rng.randrange(max(1, n_tracks // 4))}",
+            "genre": ", ".join(dict.fromkeys(picked)),
+            "date": str(rng.randint(1975, 2025)),
+            "path": f"F:/DJ MUSIC/SYNTHETIC/{artist} - {title}.aiff",
+            "rekordbox": {
+                "TrackID": str(10_000_000 + i),
+                "Label": f"Label {rng.randrange(max(1, n_tracks // 40))}",
+                "TotalTime": str(rng.randint(240, 540)),
+                "AverageBpm": f"{bpm:.2f}",
+                "Tonality": rng.choice(KEYS),
+                "TrackNumber": str(rng.randint(1, 12)),
+            },
+        }
+
+def scan_records(n_tracks: int, n_genres: int = 50, seed: int = 0, related_genres: bool = False):
+    """synthetic_tracks() without the Rekordbox extras: exactly what scan_library writes."""
+    for track in synthetic_tracks(n_tracks, n_genres, seed, related_genres):
+        del track["rekordbox"]
+        yield track
+
+def write_rekordbox_xml(path: Path, n_tracks: int, n_genres: int = 50, n_playlists: int = 20,
+                        star_playlist_size: int = None, seed: int = 0) -> Path:
+    """
+    Write a Rekordbox XML export with `n_tracks` tracks, streamed so any size fits in memory.
+
+    Playlists: a top-level "5star" playlist (as in the demo export) with `star_playlist_size`
+    tracks (default 5%), a "Genres" folder with one playlist per genre for the biggest
+    genres, and `n_playlists` set playlists nested up to three folders deep under "Sets".
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed + 1)
+    star = star_playlist_size if star_playlist_size is not None else max(1, n_tracks // 20)
+    by_genre = {}
+    ids = []
+
+    with path.open("w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n\n<DJ_PLAYLISTS Version="1.0.0">\n')
+        f.write('  <PRODUCT Name="rekordbox" Version="6.8.5" Company="AlphaTheta"/>\n')
+        f.write(f'  <COLLECTION Entries="{n_tracks}">\n')
+        for track in synthetic_tracks(n_tracks, n_genres, seed):
+            rb = track["rekordbox"]
+            ids.append(rb["TrackID"])
+            by_genre.setdefault(track["genre"].split(",")[0], []).append(rb["TrackID"])
+            location = "file://localhost/" + quote(track["path"], safe="/:")
+            f.write(
+                f'    <TRACK TrackID="{rb["TrackID"]}" Name={quoteattr(track["title"])} '
+                f'Artist={quoteattr(track["artist"])} Composer="" Album={quoteattr(track["album"])} '
+                f'Grouping="" Genre={quoteattr(track["genre"])} Kind="AIFF File" Size="62498124" '
+                f'TotalTime="{rb["TotalTime"]}" DiscNumber="0" TrackNumber="{rb["TrackNumber"]}" '
+                f'Year="{track["date"]}" AverageBpm="{rb["AverageBpm"]}" DateAdded="2025-07-01" '
+                f'BitRate="1411" SampleRate="44100" Comments="" PlayCount="0" Rating="0" '
+                f'Location={quoteattr(location)} Remixer="" Tonality="{rb["Tonality"]}" '
+                f'Label={quoteattr(rb["Label"])} Mix="">\n'
+                f'      <TEMPO Inizio="0.296" Bpm="{rb["AverageBpm"]}" Metro="4/4" Battito="1"/>\n'
+                f'    </TRACK>\n'
+            )
+        f.write("  </COLLECTION>\n  <PLAYLISTS>\n")
+
+        def playlist(indent, name, keys):
+            f.write(f'{indent}<NODE Name={quoteattr(name)} Type="1" KeyType="0" Entries="{len(keys)}">\n')
+            for key in keys:
+                f.write(f'{indent}  <TRACK Key="{key}"/>\n')
+            f.write(f"{indent}</NODE>\n")
+
+        biggest = sorted(by_genre, key=lambda g: -len(by_genre[g]))[:10]
+        f.write('    <NODE Type="0" Name="ROOT" Count="3">\n')
+        playlist("      ", "5star", rng.sample(ids, min(star, len(ids))))
+        f.write(f'      <NODE Type="0" Name="Genres" Count="{len(biggest)}">\n')
+        for genre in biggest:
+            playlist("        ", genre, by_genre[genre])
+        f.write("      </NODE>\n")
+        f.write(f'      <NODE Type="0" Name="Sets" Count="{n_playlists}">\n')
+        for p in range(n_playlists):
+            depth = p % 3
+            for d in range(depth):
+                f.write(f'{"  " * (4 + d)}<NODE Type="0" Name="Folder {p}.{d}" Count="1">\n')
+            playlist("  " * (4 + depth), f"Set {p}", rng.sample(ids, min(len(ids), rng.randint(10, 60))))
+            for d in reversed(range(depth)):
+                f.write(f'{"  " * (4 + d)}</NODE>\n')
+        f.write("      </NODE>\n    </NODE>\n  </PLAYLISTS>\n</DJ_PLAYLISTS>\n")
+    return path
+
+def cover_images(n_covers: int, size: int = 600, seed: int = 0) -> list:
+    """`n_covers` distinct noisy JPEG covers of `size` px (roughly 100 KB each, like real ones)."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    covers = []
+    for _ in range(n_covers):
+        tint = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+        noise = Image.effect_noise((size, size), rng.uniform(30, 90)).convert("RGB")
+        out = io.BytesIO()
+        Image.blend(tint, noise, 0.4).save(out, "JPEG", quality=90)
+        covers.append(out.getvalue())
+    return covers
+
+def write_audio_library(root: Path, n_tracks: int, n_genres: int = 50, seed: int = 0,
+                        files_per_folder: int = 200, aiff_share: float = 0.0, covers: int = 0) -> Path:
+    """
+    Write `n_tracks` tiny ID3-tagged audio files under `root`, spread over artist folders,
+    with the same tags synthetic_tracks() produces plus the BPM. Files are MP3s (about 2 KB
+    each), except an `aiff_share` of them, which are AIFFs (about 4 KB) as in DJ libraries.
+    With `covers`, each album embeds one of that many distinct front covers (needs Pillow).
+    """
+    from mutagen.aiff import AIFF
+    from mutagen.id3 import APIC, ID3, TALB, TBPM, TCON, TDRC, TIT2, TPE1
+
+    root = Path(root)
+    aiff_every = round(1 / aiff_share) if aiff_share else 0
+    images = cover_images(covers, seed=seed) if covers else []
+    for i, track in enumerate(synthetic_tracks(n_tracks, n_genres, seed)):
+        folder = root / f"folder_{i // files_per_folder:04d}"
+        if i % files_per_folder == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+        if aiff_every and i % aiff_every == 0:
+            path = folder / f"{i:07d}.aiff"
+            path.write_bytes(silent_aiff())
+            audio = AIFF(path)
+            audio.add_tags()
+            tags = audio.tags
+        else:
+            path = folder / f"{i:07d}.mp3"
+            path.write_bytes(SILENT_MP3)
+            tags = ID3()
+        for frame, key in ((TIT2, "title"), (TPE1, "artist"), (TALB, "album"), (TCON, "genre"), (TDRC, "date")):
+            tags.add(frame(encoding=3, text=track[key]))
+        tags.add(TBPM(encoding=3, text=track["rekordbox"]["AverageBpm"]))
+        if images:
+            album = int(track["album"].rsplit(" ", 1)[1])
+            tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=images[album % len(images)]))
+        tags.save(path)
+    return root
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=["rekordbox", "audio"])
+    parser.add_argument("output", type=Path, help="XML file (rekordbox) or folder (audio) to write")
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--genres", type=int, default=50)
+    parser.add_argument("--playlists", type=int, default=20, help="nested set playlists (rekordbox)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.kind == "rekordbox":
+        write_rekordbox_xml(args.output, args.tracks, args.genres, args.playlists, seed=args.seed)
+    else:
+        write_audio_library(args.output, args.tracks, args.genres, args.seed)
+    print(f"✅ Wrote {args.tracks} synthetic tracks to {args.output}")
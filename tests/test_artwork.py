@@ -0,0 +1,119 @@
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+Image = pytest.importorskip("PIL.Image")
+
+import artwork
+import prepare_metadata
+from artwork import build_atlases, embedded_picture, store_artwork, thumbnail_path
+from instrument import metrics
+from scan_library import rescan_music_folder, scan_library
+from youtube import YouTubeCache
+from tests.synthetic import cover_images, write_audio_library
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache_memory(monkeypatch):
+    monkeypatch.setattr(artwork, "_known", set())
+
+
+class Parsed:
+    def __init__(self, tags=None, pictures=None):
+        self.tags = tags
+        self.pictures = pictures or []
+
+
+def test_embedded_picture_prefers_the_front_cover():
+    from mutagen.flac import Picture, VCFLACDict
+    from mutagen.id3 import APIC, ID3
+    from mutagen.mp4 import MP4Cover, MP4Tags
+
+    id3 = ID3()
+    id3.add(APIC(encoding=3, mime="image/jpeg", type=4, desc="back", data=b"back"))
+    id3.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="front", data=b"front"))
+    assert embedded_picture(Parsed(id3)) == b"front"
+
+    mp4 = MP4Tags()
+    mp4["covr"] = [MP4Cover(b"front", MP4Cover.FORMAT_JPEG)]
+    assert embedded_picture(Parsed(mp4)) == b"front"
+
+    picture = Picture()
+    picture.type, picture.data = 3, b"front"
+    assert embedded_picture(Parsed(VCFLACDict(), [picture])) == b"front"
+    ogg = VCFLACDict()
+    ogg["METADATA_BLOCK_PICTURE"] = base64.b64encode(picture.write()).decode("ascii")
+    assert embedded_picture(Parsed(ogg)) == b"front"
+
+    assert embedded_picture(Parsed(ID3())) is None and embedded_picture(Parsed()) is None
+
+
+def test_thumbnails_are_made_once_per_picture(tmp_path):
+    cover = cover_images(1)[0]
+    metrics.reset()
+    keys = {store_artwork(cover, tmp_path) for _ in range(5)}
+    assert len(keys) == 1
+    path = thumbnail_path(tmp_path, keys.pop())
+    assert Image.open(path).size == (artwork.THUMB_SIZE, artwork.THUMB_SIZE)
+
+    artwork._known.clear()                      # a later run reuses the cached file
+    store_artwork(cover, tmp_path)
+    counters = metrics.report()["stages"]["scan"]["counters"]
+    assert counters["artwork"] == 6 and counters["thumbnails"] == 1
+    assert store_artwork(b"not an image", tmp_path) is None
+
+
+def test_atlas_sheets_and_uvs(tmp_path):
+    keys = [store_artwork(cover, tmp_path / "cache") for cover in cover_images(5)]
+    manifest = build_atlases(keys + keys[:2] + [None, "0" * 40], tmp_path / "cache", tmp_path / "out" / "atlas.json",
+                             sheet_size=128)
+
+    assert manifest["sheets"] == ["atlas_0.jpg", "atlas_1.jpg"]
+    assert Image.open(tmp_path / "out" / "atlas_1.jpg").size == (128, 64)
+    assert list(manifest["uv"]) == keys
+    assert manifest["uv"][keys[3]] == [0, 0.5, 0.5, 1.0, 1.0]
+    assert manifest["uv"][keys[4]] == [1, 0.0, 0.0, 0.5, 1.0]
+    assert json.loads((tmp_path / "out" / "atlas.json").read_text()) == manifest
+
+    # The cell holds the thumbnail (up to JPEG noise)
+    sheet = Image.open(tmp_path / "out" / "atlas_0.jpg").convert("RGB")
+    cell = sheet.crop((64, 0, 128, 64))
+    thumb = Image.open(thumbnail_path(tmp_path / "cache", keys[1])).convert("RGB")
+    diff = sum(abs(a - b) for a, b in zip(cell.tobytes(), thumb.tobytes()))
+    assert diff / (64 * 64 * 3) < 8
+
+
+def test_scan_and_prepare_write_atlases(tmp_path):
+    write_audio_library(tmp_path / "music", 40, n_genres=4, covers=3)
+    library = tmp_path / "library.json"
+    scan_library(music_dir=tmp_path / "music", output_path=library, artwork_dir=tmp_path / "art")
+    tracks = json.loads(library.read_text(encoding="utf-8"))
+    assert len({t["artwork"] for t in tracks}) == 3
+    with YouTubeCache(tmp_path / "youtube.sqlite") as cache:
+        for track in tracks:
+            cache.put(track, None)
+
+    prepare_metadata.main(library, tmp_path / "out" / "prepared.json", tmp_path / "youtube.sqlite",
+                          atlas_path=tmp_path / "out" / "atlas.json", artwork_dir=tmp_path / "art")
+
+    prepared = json.loads((tmp_path / "out" / "prepared.json").read_text(encoding="utf-8"))
+    atlas = json.loads((tmp_path / "out" / "atlas.json").read_text(encoding="utf-8"))
+    assert all(t["artwork"] in atlas["uv"] for t in prepared)
+    assert atlas["sheets"] == ["atlas_0.jpg"] and (tmp_path / "out" / "atlas_0.jpg").exists()
+
+
+def test_rescan_reads_files_scanned_without_artwork_again(tmp_path):
+    write_audio_library(tmp_path / "music", 6, covers=2)
+    manifest = tmp_path / "manifest.json"
+    rescan_music_folder(tmp_path / "music", manifest)
+    _, changes, _ = rescan_music_folder(tmp_path / "music", manifest, artwork_dir=tmp_path / "art")
+    assert changes["changed"] == 6
+    tracks, changes, _ = rescan_music_folder(tmp_path / "music", manifest, artwork_dir=tmp_path / "art")
+    assert changes["unchanged"] == 6 and all(t["artwork"] for t in tracks)
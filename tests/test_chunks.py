@@ -0,0 +1,54 @@
+import json
+import os
+import random
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from chunks import load_chunked_output, quadtree_chunks, write_chunked_output
+
+
+def make_tracks(n, seed=0):
+    rng = random.Random(seed)
+    return [{"id": str(i), "x": round(rng.uniform(-5000, 5000), 2), "y": round(rng.uniform(-3000, 3000), 2)}
+            for i in range(n)]
+
+
+def test_leaves_partition_tracks_and_respect_limit():
+    tracks = make_tracks(1000)
+    root, leaves = quadtree_chunks(tracks, max_tracks=50)
+    numbers = sorted(i for _, _, idx in leaves for i in idx.tolist())
+    assert numbers == list(range(1000))
+    for key, (x0, y0, x1, y1), idx in leaves:
+        assert len(idx) <= 50
+        assert list(idx) == sorted(idx)
+        for i in idx:
+            assert x0 <= tracks[i]["x"] < x1 and y0 <= tracks[i]["y"] < y1
+
+
+def test_identical_positions_stop_at_max_depth():
+    tracks = [{"x": 1.0, "y": 2.0} for _ in range(10)]
+    _, leaves = quadtree_chunks(tracks, max_tracks=3, max_depth=4)
+    assert [(len(key), len(idx)) for key, _, idx in leaves] == [(4, 10)]
+
+
+def test_write_manifest_and_viewport_loading(tmp_path):
+    tracks = make_tracks(500, seed=1)
+    (tmp_path / "chunk_stale.json").write_text("[]")
+    manifest = write_chunked_output(tracks, tmp_path, tile_size=100, max_tracks=40)
+
+    assert not (tmp_path / "chunk_stale.json").exists()
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+    assert sum(c["count"] for c in manifest["chunks"]) == manifest["count"] == 500
+    for chunk in manifest["chunks"]:
+        assert (tmp_path / chunk["file"]).stat().st_size == chunk["bytes"]
+
+    assert sorted(t["id"] for t in load_chunked_output(tmp_path)) == sorted(t["id"] for t in tracks)
+
+    viewport = (0, 0, 1000, 800)
+    visible = {t["id"] for t in tracks if t["x"] + 100 >= 0 and t["x"] <= 1000 and t["y"] + 100 >= 0 and t["y"] <= 800}
+    loaded = load_chunked_output(tmp_path, viewport)
+    assert visible <= {t["id"] for t in loaded}
+    assert len(loaded) < len(tracks)
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import cli
+from instrument import metrics
+from settings import load_secrets
+from youtube import YouTubeCache
+from tests.synthetic import scan_records
+
+HEAVY = ["numpy", "requests", "tqdm", "mutagen", "matplotlib", "plotly", "youtubesearchpython"]
+
+
+def test_help_imports_no_heavy_modules():
+    code = (
+        f"import sys; sys.path.insert(0, {backend_dir!r}); import cli\n"
+        "try:\n    cli.main(['prepare', '--help'])\nexcept SystemExit:\n    pass\n"
+        f"print([m for m in {HEAVY!r} if m in sys.modules])"
+    )
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert out.strip().splitlines()[-1] == "[]"
+
+
+def test_prepare_metadata_imports_without_plotting_or_secrets():
+    code = (
+        f"import sys; sys.path.insert(0, {backend_dir!r}); import prepare_metadata\n"
+        "print([m for m in ['matplotlib', 'plotly', 'youtubesearchpython', 'settings'] if m in sys.modules],"
+        " __import__('settings').load_config.cache_info().currsize)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert out.strip() == "['settings'] 0"      # config.json not even read yet
+
+
+def test_prepare_metadata_script_uses_the_cli_options():
+    script = os.path.join(backend_dir, "prepare_metadata.py")
+    run = subprocess.run([sys.executable, script, "--layout=similarity", "--no-such-flag"], capture_output=True, text=True)
+    assert run.returncode == 2 and "unrecognized arguments: --no-such-flag" in run.stderr
+    out = subprocess.run([sys.executable, script, "--help"], check=True, capture_output=True, text=True).stdout
+    assert "--neighbours-k" in out and "--artwork-cache" in out
+
+
+def test_missing_secrets_are_empty(tmp_path):
+    assert load_secrets(tmp_path / "secrets.json") == {}
+
+
+def test_prepare_subcommand(tmp_path):
+    tracks = list(scan_records(60, n_genres=6))
+    library = tmp_path / "library.json"
+    library.write_text(json.dumps(tracks), encoding="utf-8")
+    with YouTubeCache(tmp_path / "youtube.sqlite") as cache:
+        for track in tracks:
+            cache.put(track, None)
+    metrics.reset()
+
+    cli.main(["prepare", "--input", str(library), "--output", str(tmp_path / "prepared.json"),
+              "--youtube-cache", str(tmp_path / "youtube.sqlite"), "--lod", "--report", str(tmp_path / "report.json")])
+
+    prepared = json.loads((tmp_path / "prepared.json").read_text(encoding="utf-8"))
+    assert len(prepared) == 60
+    assert (tmp_path / "lod.json").exists()
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["stages"]["youtube"]["cache_hit_rate"] == 1.0
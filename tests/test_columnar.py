@@ -0,0 +1,69 @@
+import gzip
+import os
+import sys
+
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from columnar import buy_url, decode_columnar, encode_columnar, write_columnar_output
+
+
+def make_track(i, **overrides):
+    track = {
+        "id": f"{i:032x}",
+        "title": f"Title {i}",
+        "artist": f"Artist {i % 3}",
+        "album": "Album" if i % 2 else None,
+        "genre": ["Techno", "House, Garage"][i % 2],
+        "decade": "unknown",
+        "date": None,
+        "tracknumber": None,
+        "path": f"/music/{i}.mp3",
+        "x": round(i * 110.37, 2),
+        "y": round(-i * 95.26, 2),
+        "colour": "#e6194b",
+        "preview_url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+    }
+    track["buy_url"] = buy_url(track)
+    track.update(overrides)
+    return track
+
+
+def test_round_trip_is_lossless():
+    tracks = [make_track(i) for i in range(300)]
+    tracks[5]["preview_url"] = None
+    tracks[6]["preview_url"] = "https://youtu.be/abc"
+    tracks[7]["buy_url"] = "https://example.bandcamp.com/track/x"
+    tracks[8]["artist"] = None
+    tracks[8]["buy_url"] = buy_url(tracks[8])
+    assert decode_columnar(encode_columnar(tracks)) == tracks
+
+
+def test_artwork_column_is_optional():
+    tracks = [make_track(i) for i in range(10)]
+    for i in (2, 3, 7):
+        tracks[i]["artwork"] = f"{i % 2:040x}"
+    assert decode_columnar(encode_columnar(tracks)) == tracks
+    assert "artwork" not in decode_columnar(encode_columnar([make_track(0)]))[0]
+
+
+def test_non_md5_ids_are_kept_as_strings():
+    tracks = [make_track(0, id="custom-id"), make_track(1)]
+    assert decode_columnar(encode_columnar(tracks)) == tracks
+
+
+def test_empty_and_bad_input():
+    assert decode_columnar(encode_columnar([])) == []
+    with pytest.raises(ValueError):
+        decode_columnar(b"[]")
+
+
+def test_write_precompressed_variants(tmp_path):
+    tracks = [make_track(i) for i in range(50)]
+    sizes = write_columnar_output(tracks, tmp_path / "prepared.bin")
+    data = (tmp_path / "prepared.bin").read_bytes()
+    assert gzip.decompress((tmp_path / "prepared.bin.gz").read_bytes()) == data
+    assert sizes["prepared.bin"] == len(data)
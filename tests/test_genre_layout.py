@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import prepare_metadata
+from genre_layout import (
+    genre_similarity, layout_quality, overlapping_pairs, remove_overlaps, repulsion, similarity_layout,
+)
+from genres import GenreRegistry
+from instrument import metrics
+from youtube import YouTubeCache
+from tests.synthetic import scan_records
+
+
+def test_repulsion_matches_all_pairs():
+    rng = np.random.default_rng(3)
+    xy = rng.normal(size=(300, 2))
+    mass = rng.uniform(0.5, 3, 300)
+    delta = xy[:, None, :] - xy[None, :, :]
+    d2 = (delta ** 2).sum(axis=2)
+    np.fill_diagonal(d2, np.inf)
+    exact = ((mass[:, None] * mass[None, :] / d2)[..., None] * delta).sum(axis=1)
+
+    assert np.allclose(repulsion(xy, mass, theta=0.0), exact)
+    error = np.linalg.norm(repulsion(xy, mass) - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(error) < 0.05
+
+
+def test_genre_similarity_from_tags_and_playlists():
+    registry = GenreRegistry()
+    for tag in ["Techno, Minimal", "Techno", "Minimal", "House", "Jazz", "House, Deep House, Garage"]:
+        registry.add_track(tag)
+    genres = ["Techno", "Minimal", "House", "Jazz"]
+
+    i, j, w = genre_similarity(registry, genres)
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1)]          # Deep House and Garage are not islands
+    assert w.tolist() == [1.0]
+
+    playlists = [[{"genre": "House"}, {"genre": "jazz"}, {"genre": None}]]
+    i, j, w = genre_similarity(registry, genres, playlists)
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1), (2, 3)]
+
+
+def test_remove_overlaps_keeps_clear_circles_and_separates_the_rest():
+    rng = np.random.default_rng(0)
+    xy = rng.normal(size=(400, 2)) * 300
+    radii = rng.uniform(10, 120, 400)
+    out = remove_overlaps(xy, radii, 20)
+    assert len(overlapping_pairs(out, radii, 20)[0]) == 0
+    d = np.hypot(*(out[:, None, :] - out[None, :, :]).transpose(2, 0, 1))
+    np.fill_diagonal(d, np.inf)
+    assert (d - radii[:, None] - radii[None, :] >= 20 - 1e-3).all()
+
+    clear = np.array([[0.0, 0.0], [500.0, 0.0]])
+    assert np.allclose(remove_overlaps(clear, np.array([100.0, 100.0]), 20), clear)
+
+
+def test_layout_helpers_do_not_load_the_prepare_pipeline():
+    code = (f"import sys; sys.path.insert(0, {backend_dir!r}); import genre_layout\n"
+            "genre_layout.remove_overlaps([[0, 0], [0.1, 0]], [1.0, 1.0], 0.1)\n"
+            "print([m for m in ['prepare_metadata', 'requests', 'youtube'] if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_similarity_layout_places_similar_genres_closer_than_packing():
+    registry = prepare_metadata._genre_registry()
+    groups = prepare_metadata.get_genre_groups(list(scan_records(3000, n_genres=60, related_genres=True)), registry)
+    radii = [prepare_metadata.island_radius(len(t)) for t in groups.values()]
+    edges = genre_similarity(registry, list(groups))
+
+    centres = similarity_layout(radii, edges, (500, 500), 20)
+    assert centres == similarity_layout(radii, edges, (500, 500), 20)
+    quality = layout_quality(centres, radii, edges)
+    packed = layout_quality(prepare_metadata.island_centres(radii, (500, 500), 20), radii, edges)
+    assert quality["overlaps"] == 0
+    assert quality["similar_gap_ratio"] < 0.5 < packed["similar_gap_ratio"]
+    assert quality["neighbour_precision"] > packed["neighbour_precision"]
+
+
+def test_main_similarity_layout_reports_quality(tmp_path):
+    tracks = list(scan_records(300, n_genres=12))
+    (tmp_path / "library.json").write_text(json.dumps(tracks), encoding="utf-8")
+    playlists = tmp_path / "playlists"
+    playlists.mkdir()
+    (playlists / "set.json").write_text(json.dumps(tracks[:40]), encoding="utf-8")
+    with YouTubeCache(tmp_path / "youtube.sqlite") as cache:
+        for track in tracks:
+            cache.put(track, None)
+
+    metrics.reset()
+    prepare_metadata.main(tmp_path / "library.json", tmp_path / "prepared.json", tmp_path / "youtube.sqlite",
+                          island_layout="similarity", playlists_dir=playlists)
+    gauges = metrics.report()["stages"]["layout"]["gauges"]
+    assert gauges["overlaps"] == 0 and 0 < gauges["density"] <= 1
+
+    # A packed layout is only scored when a report asks for it
+    metrics.reset()
+    prepare_metadata.main(tmp_path / "library.json", tmp_path / "packed.json", tmp_path / "youtube.sqlite",
+                          island_layout="packed")
+    assert "gauges" not in metrics.report()["stages"]["layout"]
+    prepare_metadata.main(tmp_path / "library.json", tmp_path / "packed.json", tmp_path / "youtube.sqlite",
+                          island_layout="packed", layout_report=True)
+    assert "density" in metrics.report()["stages"]["layout"]["gauges"]
+
+    with pytest.raises(ValueError):
+        prepare_metadata.build_islands_db(prepare_metadata.get_genre_groups(tracks), island_layout="spiral")
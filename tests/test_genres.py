@@ -0,0 +1,61 @@
+import os
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from genres import FALLBACK_COLOUR, PRIMARY_COLOURS, GenreRegistry, split_genres
+
+
+def test_split_genres_always_returns_a_list():
+    assert split_genres("Techno, Minimal ,") == ["Techno", "Minimal"]
+    assert split_genres(None) == ["unknown"]
+    assert split_genres("") == ["unknown"]
+    assert split_genres(" , ") == ["unknown"]
+
+
+def test_interning_normalises_and_resolves_aliases():
+    registry = GenreRegistry(aliases={"DnB": "Drum & Bass"})
+    techno = registry.intern("Techno")
+    assert registry.intern("  techno ") == techno
+    assert registry.intern("dnb") == registry.intern("drum &  bass")
+    assert registry.names == ["Techno", "Drum & Bass"]
+    assert registry.lookup("TECHNO") == techno
+    assert registry.lookup("jazz") is None
+
+
+def test_membership_records_every_genre_primary_first():
+    registry = GenreRegistry()
+    assert registry.add_track("Techno, House") == [0, 1]
+    assert registry.add_track(None) == [2]
+    assert registry.add_track("house, techno, House") == [1, 0]
+
+    assert registry.primary_ids().tolist() == [0, 2, 1]
+    assert registry.genres_of(2).tolist() == [1, 0]
+    assert registry.tracks_with(0).tolist() == [0, 2]
+    assert registry.tracks_with(2).tolist() == [1]
+
+    registry.add_track("Techno")
+    assert registry.tracks_with(0).tolist() == [0, 2, 3]
+
+
+def test_colours_pinned_then_palette_in_name_order():
+    registry = GenreRegistry(colours={"techno": "#d81b60"})
+    for name in ["Techno", "Jazz", "Ambient"]:
+        registry.intern(name)
+    assert registry.colours == ["#d81b60", PRIMARY_COLOURS[1], PRIMARY_COLOURS[0]]
+    assert registry.colour(registry.lookup("ambient")) == PRIMARY_COLOURS[0]
+    assert registry.colour(registry.lookup("missing")) == FALLBACK_COLOUR
+
+
+def test_genre_groups_use_primary_genre():
+    from prepare_metadata import get_genre_groups
+
+    registry = GenreRegistry()
+    tracks = [{"genre": "Techno, House"}, {"genre": None}, {"genre": "techno"}, {}]
+    groups = get_genre_groups(tracks, registry)
+    assert list(groups) == ["Techno", "unknown"]
+    assert groups["Techno"] == [tracks[0], tracks[2]]
+    assert groups["unknown"] == [tracks[1], tracks[3]]
+    assert registry.tracks_with(registry.lookup("house")).tolist() == [0]
@@ -0,0 +1,104 @@
+import os
+import sys
+from collections import defaultdict
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from prepare_metadata import (
+    ISLAND_GAP, _dist, build_islands_db, generate_id, island_centres, load_layout, save_layout,
+)
+
+
+def library(sizes):
+    groups = defaultdict(list)
+    for genre, n in sizes.items():
+        groups[genre] = [{"path": f"/{genre}/{i}.mp3", "title": f"{genre} {i}"} for i in range(n)]
+    return groups
+
+
+def positions(islands):
+    return {generate_id(t): tuple(xy) for island in islands for t, xy in zip(island.tracks, island.tile_positions.tolist())}
+
+
+def relayout(groups, islands, tmp_path, **kwargs):
+    save_layout(islands, tmp_path / "layout.json")
+    return build_islands_db(groups, previous_layout=load_layout(tmp_path / "layout.json"), **kwargs)
+
+
+def assert_no_overlap(islands):
+    for i, a in enumerate(islands):
+        for b in islands[:i]:
+            assert _dist(a.centre, b.centre) >= a.radius + b.radius + ISLAND_GAP - 1e-6
+        assert len(set(a.slots)) == len(a.slots)
+
+
+def test_new_tracks_and_genres_leave_existing_tiles_in_place(tmp_path):
+    sizes = {"Techno": 30, "House": 12, "Jazz": 5, "Ambient": 1}
+    before = build_islands_db(library(sizes))
+
+    grown = library({**sizes, "Techno": 32, "Disco": 8})
+    after = relayout(grown, before, tmp_path)
+
+    old, new = positions(before), positions(after)
+    assert all(new[tid] == xy for tid, xy in old.items())
+    assert len(new) == len(old) + 2 + 8
+    assert [i.centre for i in after[:4]] == [tuple(i.centre) for i in before]
+    assert_no_overlap(after)
+
+
+def test_respelled_genres_keep_their_islands(tmp_path):
+    sizes = {"Techno": 30, "Deep House": 12, "Jazz": 5}
+    before = build_islands_db(library(sizes))
+
+    # Respelled and seen in another order: a fresh packing would move every island
+    groups = library(sizes)
+    respelled = defaultdict(list)
+    for old, new in (("Jazz", "Jazz"), ("Deep House", "DEEP  HOUSE"), ("Techno", "techno")):
+        respelled[new] = groups[old]
+    after = relayout(respelled, before, tmp_path, max_fragmentation=0.0)
+
+    assert [i.genre for i in after] == ["Jazz", "DEEP  HOUSE", "techno"]
+    assert positions(after) == positions(before)
+    assert [i.centre for i in after] == [tuple(i.centre) for i in reversed(before)]
+
+
+def test_removed_track_slot_is_reused(tmp_path):
+    before = build_islands_db(library({"Techno": 10, "House": 4}))
+
+    groups = library({"Techno": 10, "House": 4})
+    groups["Techno"].pop(3)
+    groups["Techno"].append({"path": "/new.mp3", "title": "new"})
+    after = relayout(groups, before, tmp_path)
+    assert after[0].slots == [0, 1, 2, 4, 5, 6, 7, 8, 9, 3]
+    assert positions(after)[generate_id(groups["Techno"][-1])] == tuple(before[0].tile_positions[3])
+
+
+def test_outgrown_island_moves_only_itself(tmp_path):
+    sizes = {"Techno": 7, "House": 7, "Jazz": 7, "Ambient": 7, "Dub": 7, "Soul": 7, "Funk": 7}
+    before = build_islands_db(library(sizes))
+
+    after = relayout(library({**sizes, "Techno": 40}), before, tmp_path, max_fragmentation=1.0)
+    assert after[0].centre != before[0].centre
+    assert [i.centre for i in after[1:]] == [tuple(i.centre) for i in before[1:]]
+    assert_no_overlap(after)
+
+
+def test_fragmented_layout_is_repacked(tmp_path):
+    sizes = {"Techno": 40, "House": 20, "Jazz": 5}
+    before = build_islands_db(library(sizes))
+
+    shrunk = library({"Techno": 2, "House": 20, "Jazz": 5})
+    after = relayout(shrunk, before, tmp_path)
+    assert [i.centre for i in after] == island_centres([i.radius for i in after], (0, 0), ISLAND_GAP)
+
+
+def test_placed_islands_are_packed_around():
+    placed = [((0.0, 0.0), 300.0), ((700.0, 0.0), 300.0)]
+    centres = island_centres([200.0, 200.0], (0, 0), 20, placed)
+    everything = [c for c, _ in placed] + centres
+    radii = [300.0, 300.0, 200.0, 200.0]
+    for i in range(4):
+        for j in range(i):
+            assert _dist(everything[i], everything[j]) >= radii[i] + radii[j] + 20 - 1e-6
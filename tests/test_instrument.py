@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import scan_library
+from instrument import Metrics, metrics
+from tests.synthetic import write_audio_library
+
+
+def test_stages_counters_and_slowest():
+    m = Metrics(slowest=3)
+    for _ in range(2):
+        with m.stage("layout"):
+            time.sleep(0.01)
+    for i in range(10):
+        m.observe("scan", f"file{i}", i / 10)
+    m.count("youtube", "cache_hits", 3)
+    m.count("youtube", "cache_misses")
+
+    report = m.report()
+    assert list(report["stages"]) == ["layout", "scan", "youtube"]
+    layout = report["stages"]["layout"]
+    assert layout["calls"] == 2 and layout["wall_s"] >= 0.02
+    assert [s["item"] for s in report["stages"]["scan"]["slowest"]] == ["file9", "file8", "file7"]
+    assert report["stages"]["youtube"]["cache_hit_rate"] == 0.75
+    json.dumps(report)
+
+
+def test_profile_and_trace_only_the_chosen_stage(tmp_path):
+    m = Metrics()
+    m.configure(profile="layout", trace_memory="layout", profile_dir=tmp_path)
+    with m.stage("layout"):
+        blocks = [bytearray(1024) for _ in range(1000)]
+    with m.stage("write"):
+        pass
+
+    stages = m.report()["stages"]
+    assert stages["layout"]["profile"] and (tmp_path / "layout.prof").exists()
+    assert stages["layout"]["memory"]["peak_mb"] >= 0.9
+    assert "profile" not in stages["write"] and "memory" not in stages["write"]
+    del blocks
+
+
+def test_scan_library_report(tmp_path):
+    write_audio_library(tmp_path / "music", 12, n_genres=4)
+    (tmp_path / "music" / "broken.mp3").write_bytes(b"not audio")
+    metrics.reset()
+
+    scan_library.scan_library(music_dir=tmp_path / "music", output_path=tmp_path / "out.json")
+    report = metrics.write_report(tmp_path / "report.json")
+
+    assert json.loads((tmp_path / "report.json").read_text(encoding="utf-8")) == report
+    scan = report["stages"]["scan"]
+    assert scan["calls"] == 1
+    assert scan["counters"]["files"] == 13
+    assert scan["counters"]["tracks"] == 12
+    assert len(scan["slowest"]) == 10
+    assert report["stages"]["write"]["calls"] == 1
@@ -0,0 +1,88 @@
+import math
+import os
+import random
+import sys
+
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from prepare_metadata import (
+    _circle_intersections, _dist, all_tile_positions, island_centres, island_radius, island_tile_positions,
+)
+
+
+def legacy_island_centres(radii, centre, island_gap):
+    """The original packing: every single and pair candidate, checked against every island."""
+    def valid(cand, r_new, centres, radii_so_far):
+        return all(_dist(cand, c) >= r_new + r_old + island_gap - 1e-6
+                   for c, r_old in zip(centres, radii_so_far))
+
+    if not radii:
+        return []
+    centres = [centre]
+    for i in range(1, len(radii)):
+        r_new = radii[i]
+        best_pos, best_dist = None, float("inf")
+        aug = [r + r_new + island_gap for r in radii[:i]]
+        candidates = []
+        for (cx, cy), aug_r in zip(centres, aug):
+            vx, vy = centre[0] - cx, centre[1] - cy
+            v_len = math.hypot(vx, vy)
+            if v_len != 0:
+                candidates.append((cx + vx * aug_r / v_len, cy + vy * aug_r / v_len))
+        for j in range(len(centres)):
+            for k in range(j + 1, len(centres)):
+                candidates.extend(_circle_intersections(centres[j], aug[j], centres[k], aug[k]))
+        for cand in candidates:
+            if valid(cand, r_new, centres, radii[:i]):
+                d = _dist(cand, centre)
+                if d < best_dist:
+                    best_dist, best_pos = d, cand
+        if best_pos is None:
+            max_r = max(_dist(c, centre) + radii[j] for j, c in enumerate(centres))
+            best_pos = (centre[0] + max_r + r_new + island_gap, centre[1])
+        centres.append(best_pos)
+    return centres
+
+
+def random_radii(n, seed):
+    rng = random.Random(seed)
+    # Track counts per genre are heavy-tailed: lots of tiny genres, a few huge ones
+    return [island_radius(max(1, int(rng.paretovariate(1.2)))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("n, seed", [(1, 0), (2, 0), (12, 1), (40, 2), (90, 3)])
+def test_matches_legacy_packing(n, seed):
+    radii = random_radii(n, seed)
+    assert island_centres(radii, (0, 0), 20) == legacy_island_centres(radii, (0, 0), 20)
+
+
+def test_islands_never_overlap():
+    radii = random_radii(300, 7)
+    centres = island_centres(radii, (500, 500), 20)
+    for i in range(len(radii)):
+        for j in range(i):
+            assert _dist(centres[i], centres[j]) >= radii[i] + radii[j] + 20 - 1e-6
+
+
+def test_empty_input():
+    assert island_centres([], (0, 0), 20) == []
+
+
+def test_all_tile_positions_match_per_island_walk():
+    counts = [1, 2, 7, 8, 19, 20, 500, 3, 1000]
+    centres = [(i * 1234.5, -i * 321.25) for i in range(len(counts))]
+    positions = all_tile_positions(counts, centres, 100, 10)
+
+    expected = [xy for n, c in zip(counts, centres) for xy in island_tile_positions(n, c, 100, 10)]
+    assert positions.shape == (sum(counts), 2)
+    assert [tuple(xy) for xy in positions.tolist()] == expected
+
+
+def test_all_tile_positions_edge_cases():
+    assert all_tile_positions([], [], 100, 10).shape == (0, 2)
+    with pytest.raises(ValueError):
+        all_tile_positions([3, 0], [(0, 0), (1, 1)], 100, 10)
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from lod import build_lod, downsample_tiles
+from prepare_metadata import Island, all_tile_positions, island_radius
+
+
+def make_islands(counts):
+    centres = [(i * 5000.0, 0.0) for i in range(len(counts))]
+    positions = all_tile_positions(counts, centres, 100, 10)
+    bounds = np.cumsum([0] + counts)
+    return [
+        Island(island_radius(n), positions[a:b], c, "#e6194b", [{}] * n, f"genre {i}")
+        for i, (n, c, a, b) in enumerate(zip(counts, centres, bounds[:-1], bounds[1:]))
+    ]
+
+
+def test_downsample_keeps_every_tile_accounted_for():
+    positions = all_tile_positions([500], [(0.0, 0.0)], 100, 10)
+    reps = downsample_tiles(positions, 440)
+    assert reps[:, 2].sum() == 500
+    assert len(reps) < 500 / 4
+    assert tuple(reps[0, :2]) == (0.0, 0.0)       # centre tile comes first
+
+
+def test_build_lod_levels_shrink_and_summarise():
+    islands = make_islands([1, 37, 1000])
+    lod = build_lod(islands, pitch=110, factors=[2, 8])
+
+    assert [s["count"] for s in lod["islands"]] == [1, 37, 1000]
+    assert lod["islands"][0]["centroid"] == [0.0, 0.0]
+
+    sizes = [[len(tiles) for tiles in level["tiles"]] for level in lod["levels"]]
+    assert sizes[0][2] > sizes[1][2] >= 1
+    for level in lod["levels"]:
+        assert [sum(row[2] for row in tiles) for tiles in level["tiles"]] == [1, 37, 1000]
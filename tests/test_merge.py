@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import cli
+from merge import assign_ids, local_path, merge_sources, normalize_path
+from prepare_metadata import generate_id
+from scan_library import parse_rekordbox_xml
+from tests.synthetic import scan_records, write_rekordbox_xml
+
+
+def test_local_path_decodes_file_urls():
+    assert local_path("file://localhost/F:/DJ%20MUSIC/Caf%C3%A9.aiff") == "F:/DJ MUSIC/Café.aiff"
+    assert local_path("file:///Users/me/a%23b.mp3") == "/Users/me/a#b.mp3"
+    assert local_path("file://nas/music/a.mp3") == "//nas/music/a.mp3"
+    assert local_path("F:\\DJ MUSIC\\a.aiff") == "F:/DJ MUSIC/a.aiff"
+    assert local_path("/music/100%25.mp3") == "/music/100%25.mp3"     # only URLs are percent-decoded
+    assert local_path(None) is None
+
+
+def test_normalize_path_folds_case_and_unicode_forms():
+    nfd = "F:/DJ MUSIC/Cafe\u0301.AIFF"
+    assert normalize_path(nfd) == normalize_path("file://localhost/f:/dj%20music/caf%C3%A9.aiff")
+    assert normalize_path("F:\\DJ MUSIC\\Café.aiff") == "f:/dj music/café.aiff"
+
+
+def test_scan_and_rekordbox_join_by_path(tmp_path):
+    scan = list(scan_records(50, n_genres=5))
+    rekordbox = parse_rekordbox_xml(write_rekordbox_xml(tmp_path / "export.xml", 50, n_genres=5))
+    tracks, report = merge_sources({"scan": scan, "rekordbox": rekordbox})
+
+    assert len(tracks) == 50 and report["sources"]["rekordbox"]["matched_by_path"] == 50
+    assert report["unmatched"] == {"scan": [], "rekordbox": []}
+    first = tracks[0]
+    assert first["path"] == scan[0]["path"] and first["date"] == scan[0]["date"]   # scan fields win
+    assert first["label"] == rekordbox[0]["label"] and first["sources"] == ["scan", "rekordbox"]
+    # A plain folder scan keeps the ids it had before merging
+    assert first["id"] == generate_id(scan[0]) == generate_id(first)
+
+
+def test_moved_files_join_by_artist_and_title():
+    scan = [{"path": "/new/a.mp3", "artist": "Röyksopp", "title": "Eple", "date": "2001"},
+            {"path": "/new/b.mp3", "artist": "Daft Punk", "title": "Da Funk", "date": None}]
+    rekordbox = [{"file_path": "file://localhost/old/b.mp3", "artist": "daft punk", "title": "Da Funk!",
+                  "label": "Virgin"},
+                 {"file_path": "file://localhost/old/c.mp3", "artist": "Moby", "title": "Porcelain"}]
+    tracks, report = merge_sources({"scan": scan, "rekordbox": rekordbox})
+
+    assert [t["path"] for t in tracks] == ["/new/a.mp3", "/new/b.mp3", "/old/c.mp3"]
+    assert tracks[1]["label"] == "Virgin"
+    assert report["sources"]["rekordbox"]["matched_by_artist_title"] == 1
+    assert report["unmatched"] == {"scan": ["/new/a.mp3"], "rekordbox": ["/old/c.mp3"]}
+
+
+def test_duplicates_are_folded_and_reported():
+    scan = [{"path": "/m/a.mp3", "artist": "A", "title": "One", "album": None},
+            {"path": "/M/A.MP3", "artist": "A", "title": "One", "album": "Album"},
+            {"path": "/m/copy of a.mp3", "artist": "A", "title": "One"}]
+    tracks, report = merge_sources({"scan": scan})
+
+    assert len(tracks) == 2 and tracks[0]["album"] == "Album"
+    assert report["duplicates"] == [{"source": "scan", "track": "/M/A.MP3", "of": "/m/a.mp3"}]
+    assert report["same_song"] == [["/m/a.mp3", "/m/copy of a.mp3"]]
+
+
+def test_untagged_tracks_only_join_by_path():
+    scan = [{"path": f"/m/{i}.mp3", "artist": None, "title": None} for i in range(20000)]
+    rekordbox = [{"path": f"/other/{i}.mp3", "artist": "", "title": None} for i in range(20000)]
+    rekordbox.append({"path": "/m/7.mp3", "artist": None, "title": None})
+    rekordbox.append({"path": "/x/half.mp3", "artist": "A", "title": None})
+    tracks, report = merge_sources({"scan": scan, "rekordbox": rekordbox})
+
+    counts = report["sources"]["rekordbox"]
+    assert counts["matched_by_path"] == 1 and counts["matched_by_artist_title"] == 0
+    assert counts["added"] == 20001 and len(tracks) == 40001
+    assert report["same_song"] == []
+
+
+def test_ids_are_unique_and_stable():
+    tracks = [{"title": "Intro", "artist": "A"}, {"title": "Intro", "artist": "A"}, {"title": "Intro", "artist": "B"},
+              {"path": "/m/x.mp3", "title": "Intro"}]
+    assert assign_ids(tracks) == 1
+    ids = [t["id"] for t in tracks]
+    assert len(set(ids)) == 4
+    again = [{k: v for k, v in t.items() if k != "id"} for t in tracks]
+    assign_ids(again)
+    assert [t["id"] for t in again] == ids
+
+
+def test_merge_subcommand(tmp_path):
+    scan = list(scan_records(40, n_genres=4))[:30]
+    (tmp_path / "scan.json").write_text(json.dumps(scan), encoding="utf-8")
+    write_rekordbox_xml(tmp_path / "export.xml", 40, n_genres=4)
+    cli.main(["import-rekordbox", str(tmp_path / "export.xml"), "--output", str(tmp_path / "rekordbox.json")])
+
+    cli.main(["merge", str(tmp_path / "scan.json"), str(tmp_path / "rekordbox.json"),
+              "--output", str(tmp_path / "merged.json"), "--merge-report", str(tmp_path / "report.json")])
+
+    merged = json.loads((tmp_path / "merged.json").read_text(encoding="utf-8"))
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert len(merged) == 40 and len({t["id"] for t in merged}) == 40
+    assert len(report["unmatched"]["rekordbox"]) == 10 and report["unmatched"]["scan"] == []
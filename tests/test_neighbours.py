@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import prepare_metadata
+from neighbours import NeighbourIndex, knn_grid
+from youtube import YouTubeCache
+from tests.synthetic import scan_records
+
+
+def brute_force(xy, k):
+    d2 = ((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2)
+    np.fill_diagonal(d2, np.inf)
+    return np.sqrt(np.sort(d2, axis=1)[:, :k])
+
+
+def test_knn_grid_is_exact():
+    rng = np.random.default_rng(1)
+    clustered = np.vstack([rng.random((400, 2)) * 50, rng.random((5, 2)) * 50 + 5000])
+    for xy in (rng.random((1500, 2)) * 1000, clustered, np.round(rng.random((800, 2)) * 10)):
+        indices, distances = knn_grid(xy, 6)
+        assert np.allclose(distances, brute_force(xy, 6), atol=1e-4)
+        assert np.allclose(np.sqrt(((xy[indices] - xy[:, None, :]) ** 2).sum(axis=2)), distances, atol=1e-4)
+        assert not (indices == np.arange(len(xy))[:, None]).any()
+
+
+def test_knn_grid_is_fast_on_lines_and_far_clusters():
+    rng = np.random.default_rng(2)
+    line = np.column_stack([np.arange(3000.0), np.zeros(3000)])
+    far = np.vstack([rng.normal(size=(2000, 2)), rng.normal(size=(2000, 2)) + 1e6])
+    for xy in (line, far):
+        start = time.perf_counter()
+        _, distances = knn_grid(xy, 8)
+        assert time.perf_counter() - start < 1.5
+        assert np.allclose(distances, brute_force(xy, 8), atol=1e-3)
+
+
+def test_knn_grid_small_inputs():
+    assert knn_grid(np.zeros((1, 2)), 8)[0].shape == (1, 0)
+    indices, _ = knn_grid(np.array([[0.0, 0.0], [1.0, 0.0], [5.0, 0.0]]), 8)
+    assert indices.tolist() == [[1, 2], [0, 2], [1, 0]]
+
+
+def test_index_round_trip_and_related():
+    tracks = [prepare_metadata.prepare_track(t, i * 110.0, 0.0, "#fff", None)
+              for i, t in enumerate(scan_records(30))]
+    index = NeighbourIndex.from_tracks(tracks, 4)
+    decoded = NeighbourIndex.decode(index.encode())
+    assert decoded.ids == index.ids
+    assert decoded.related(tracks[10]["id"]) == [tracks[i]["id"] for i in (9, 11, 8, 12)]
+    assert decoded.related(tracks[0]["id"], 2) == [tracks[1]["id"], tracks[2]["id"]]
+    with pytest.raises(KeyError):
+        decoded.related("0" * 32)
+
+
+def test_main_writes_neighbours(tmp_path):
+    tracks = list(scan_records(200, n_genres=8))
+    library = tmp_path / "library.json"
+    library.write_text(json.dumps(tracks), encoding="utf-8")
+    with YouTubeCache(tmp_path / "youtube.sqlite") as cache:
+        for track in tracks:
+            cache.put(track, None)
+
+    prepare_metadata.main(library, tmp_path / "prepared.json", tmp_path / "youtube.sqlite",
+                          neighbours_path=tmp_path / "neighbours.bin", neighbours_k=5)
+
+    prepared = json.loads((tmp_path / "prepared.json").read_text(encoding="utf-8"))
+    index = NeighbourIndex.load(tmp_path / "neighbours.bin")
+    assert index.ids == [t["id"] for t in prepared]
+    xy = np.array([(t["x"], t["y"]) for t in prepared])
+    assert np.allclose(np.sqrt(((xy[index.neighbours] - xy[:, None, :]) ** 2).sum(axis=2)), brute_force(xy, 5))
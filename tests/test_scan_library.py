@@ -0,0 +1,274 @@
+import os
+import sys
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import scan_library
+from scan_library import rescan_music_folder
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Replace tag reading with a stub that records which files were opened."""
+    calls = []
+
+    def fake_extract_metadata(file_path):
+        calls.append(file_path.name)
+        return {"path": str(file_path), "title": file_path.read_text()}
+
+    monkeypatch.setattr(scan_library, "extract_metadata", fake_extract_metadata)
+    return calls
+
+
+def test_rescan_only_reads_new_and_changed_files(tmp_path, opened):
+    music_dir = tmp_path / "music"
+    (music_dir / "sub").mkdir(parents=True)
+    (music_dir / "a.mp3").write_text("a")
+    (music_dir / "sub" / "b.flac").write_text("b")
+    (music_dir / "notes.txt").write_text("not audio")
+    manifest_path = tmp_path / "manifest.json"
+
+    tracks, changes, _ = rescan_music_folder(music_dir, manifest_path)
+    assert sorted(opened) == ["a.mp3", "b.flac"]
+    assert [t["title"] for t in tracks] == ["a", "b"]
+    assert changes == {"added": 2, "changed": 0, "removed": 0, "unchanged": 0}
+
+    opened.clear()
+    tracks, changes, _ = rescan_music_folder(music_dir, manifest_path)
+    assert opened == []
+    assert [t["title"] for t in tracks] == ["a", "b"]
+    assert changes == {"added": 0, "changed": 0, "removed": 0, "unchanged": 2}
+
+    (music_dir / "a.mp3").write_text("a, retagged")
+    (music_dir / "sub" / "b.flac").unlink()
+    (music_dir / "c.aiff").write_text("c")
+    tracks, changes, _ = rescan_music_folder(music_dir, manifest_path)
+    assert sorted(opened) == ["a.mp3", "c.aiff"]
+    assert [t["title"] for t in tracks] == ["a, retagged", "c"]
+    assert changes == {"added": 1, "changed": 1, "removed": 1, "unchanged": 0}
+
+
+def test_rescan_remembers_unreadable_files(tmp_path, monkeypatch):
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    (music_dir / "broken.mp3").write_text("x")
+    calls = []
+
+    def failing_extract_metadata(file_path):
+        calls.append(file_path.name)
+        raise ValueError("can't sync to MPEG frame")
+
+    monkeypatch.setattr(scan_library, "extract_metadata", failing_extract_metadata)
+    manifest_path = tmp_path / "manifest.json"
+
+    assert rescan_music_folder(music_dir, manifest_path)[0] == []
+    assert rescan_music_folder(music_dir, manifest_path)[0] == []
+    assert calls == ["broken.mp3"]
+
+
+def test_dangling_symlinks_are_skipped_and_reported(tmp_path, opened, capsys):
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    (music_dir / "a.mp3").write_text("a")
+    (music_dir / "broken.mp3").symlink_to(tmp_path / "gone.mp3")
+
+    assert [t["title"] for t in scan_library.scan_music_folder(music_dir)] == ["a"]
+    assert "broken.mp3: FileNotFoundError" in capsys.readouterr().out
+    assert [t["title"] for t in scan_library.iter_music_folder(music_dir)] == ["a"]
+    tracks, changes, errors = rescan_music_folder(music_dir, tmp_path / "manifest.json")
+    assert [t["title"] for t in tracks] == ["a"] and changes["added"] == 1
+    assert [os.path.basename(path) for path, _ in errors] == ["broken.mp3"]
+    assert opened == ["a.mp3"] * 3
+
+
+def test_manifest_for_another_root_is_ignored(tmp_path, opened):
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.mp3").write_text(name)
+    manifest_path = tmp_path / "manifest.json"
+
+    rescan_music_folder(tmp_path / "one", manifest_path)
+    _, changes, _ = rescan_music_folder(tmp_path / "two", manifest_path)
+    assert changes["added"] == 1 and changes["removed"] == 0
+
+
+def _write_tagged_mp3(path, **tags):
+    from mutagen.easyid3 import EasyID3
+
+    # Four silent MPEG-1 Layer III frames (128 kbps, 44.1 kHz) are enough for mutagen to sync
+    path.write_bytes((b"\xff\xfb\x90\x00" + b"\x00" * 413) * 4)
+    id3 = EasyID3()
+    for key, value in tags.items():
+        id3[key] = value
+    id3.save(path)
+
+
+@pytest.mark.parametrize("workers,executor", [(1, "thread"), (4, "thread"), (2, "process")])
+def test_read_metadata_keeps_order_and_collects_errors(tmp_path, workers, executor):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"{i:02d}.mp3"
+        if i % 5 == 3:
+            path.write_bytes(b"not an mp3")
+        else:
+            _write_tagged_mp3(path, title=f"Track {i}", artist="Artist", genre="Techno")
+        paths.append(path)
+
+    results, errors = scan_library.read_metadata(paths, workers=workers, executor=executor)
+
+    assert [r and r["title"] for r in results] == [
+        None if i % 5 == 3 else f"Track {i}" for i in range(12)
+    ]
+    assert [path for path, _ in errors] == [str(paths[3]), str(paths[8])]
+    assert all("HeaderNotFoundError" in message for _, message in errors)
+
+
+def test_extract_metadata_opens_each_file_once(tmp_path, monkeypatch):
+    import builtins
+    from tests.synthetic import write_audio_library
+
+    write_audio_library(tmp_path, 4, aiff_share=0.5)
+    paths = sorted(tmp_path.rglob("*.*"))
+    real_open, opens = builtins.open, []
+    monkeypatch.setattr(builtins, "open", lambda file, *a, **k: opens.append(str(file)) or real_open(file, *a, **k))
+
+    results = [scan_library.extract_metadata(path) for path in paths]
+
+    assert opens == [str(path) for path in paths]
+    aiff, mp3 = results[0], results[1]
+    assert aiff["path"].endswith(".aiff") and aiff["title"] == "Track 0 (Original Mix)"
+    assert aiff["sample_rate"] == 44100 and aiff["bitrate"] == 1411 and aiff["length"] == 0.01
+    assert mp3["title"] == "Track 1 (Original Mix)" and mp3["bitrate"] == 128 and mp3["length"] > 0
+    assert all(100 <= r["bpm"] <= 140 for r in results)
+
+
+def test_native_tag_formats_map_to_the_same_fields():
+    from mutagen.flac import VCFLACDict
+    from mutagen.id3 import ID3, TBPM, TCON, TRCK
+    from mutagen.mp4 import MP4Tags
+
+    id3 = ID3()
+    id3.add(TCON(encoding=3, text="(17)"))
+    id3.add(TRCK(encoding=3, text="3/12"))
+    id3.add(TBPM(encoding=3, text="128"))
+    mp4 = MP4Tags()
+    mp4["\xa9gen"], mp4["trkn"], mp4["tmpo"] = ["Rock"], [(3, 12)], [128]
+    vorbis = VCFLACDict()
+    vorbis["GENRE"], vorbis["TRACKNUMBER"], vorbis["BPM"] = "Rock", "3/12", "128"
+
+    for tags in (id3, mp4, vorbis):
+        values = scan_library._tag_values(tags)
+        assert (values["genre"], values["tracknumber"], values["bpm"], values["title"]) == ("Rock", "3/12", "128", None)
+    assert scan_library._bpm("127,5") == 127.5 and scan_library._bpm("n/a") is None
+
+
+NESTED_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0.0">
+  <COLLECTION Entries="4">
+    <TRACK TrackID="1" Name="One" Artist="A" Genre="Techno" Location="file://localhost/a.mp3"><TEMPO Bpm="130"/></TRACK>
+    <TRACK TrackID="2" Name="Two" Artist="B" Genre="House" Location="file://localhost/b.mp3"/>
+    <TRACK TrackID="3" Name="Three" Artist="C" Genre="Jazz" Location="file://localhost/c.mp3"/>
+    <TRACK TrackID="4" Name="Four" Artist="D" Genre="Dub" Location="file://localhost/d.mp3"/>
+  </COLLECTION>
+  <PLAYLISTS>
+    <NODE Type="0" Name="ROOT" Count="2">
+      <NODE Type="0" Name="Sets" Count="1">
+        <NODE Name="Warmup" Type="1" KeyType="0" Entries="3">
+          <TRACK Key="3"/><TRACK Key="1"/><TRACK Key="99"/>
+        </NODE>
+      </NODE>
+      <NODE Name="Peak" Type="1" KeyType="0" Entries="2">
+        <TRACK Key="4"/><TRACK Key="2"/>
+      </NODE>
+    </NODE>
+  </PLAYLISTS>
+</DJ_PLAYLISTS>
+"""
+
+
+@pytest.fixture
+def nested_xml(tmp_path):
+    path = tmp_path / "rekordbox.xml"
+    path.write_text(NESTED_XML, encoding="utf-8")
+    return path
+
+
+def test_iter_rekordbox_tracks_streams_collection(nested_xml):
+    tracks = list(scan_library.iter_rekordbox_tracks(nested_xml))
+    assert [t["track_id"] for t in tracks] == ["1", "2", "3", "4"]
+    assert tracks[0] == {
+        "title": "One", "artist": "A", "album": None, "genre": "Techno",
+        "label": None, "track_id": "1", "file_path": "file://localhost/a.mp3",
+    }
+
+
+@pytest.mark.parametrize("playlist,expected", [("Warmup", ["3", "1"]), ("Peak", ["4", "2"]), ("Missing", [])])
+def test_iter_rekordbox_tracks_playlist_order(nested_xml, playlist, expected):
+    tracks = scan_library.iter_rekordbox_tracks(nested_xml, playlist)
+    assert [t["track_id"] for t in tracks] == expected
+
+
+def test_parse_rekordbox_xml_demo_export():
+    demo = os.path.join(os.path.dirname(__file__), "..", "data", "demo_rekordbox.xml")
+    assert len(scan_library.parse_rekordbox_xml(demo)) == 25
+    assert [t["track_id"] for t in scan_library.parse_rekordbox_xml(demo, "5star")] == [
+        "222328904", "87710127", "239649368", "100644319",
+        "86186288", "160187906", "76709359", "16684196",
+    ]
+
+
+def test_playlist_index_paths_and_membership(nested_xml):
+    index = scan_library.build_playlist_index(nested_xml)
+    assert index.playlists == {"Sets/Warmup": ["3", "1", "99"], "Peak": ["4", "2"]}
+    assert index.membership["1"] == ["Sets/Warmup"]
+    assert index.membership["4"] == ["Peak"]
+    assert index.resolve("Warmup") == "Sets/Warmup"
+    assert index.resolve("Sets") is None
+
+
+def test_extract_playlists_in_one_pass(nested_xml, monkeypatch):
+    passes = []
+    original = scan_library._collect_collection_tracks
+
+    def counting(*args, **kwargs):
+        passes.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(scan_library, "_collect_collection_tracks", counting)
+    playlists = scan_library.extract_playlists(nested_xml)
+
+    assert len(passes) == 1
+    assert {path: [t["title"] for t in tracks] for path, tracks in playlists.items()} == {
+        "Sets/Warmup": ["Three", "One"],
+        "Peak": ["Four", "Two"],
+    }
+
+
+def test_playlist_index_is_cached_by_export_hash(nested_xml, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    first = scan_library.load_playlist_index(nested_xml, cache_dir)
+    assert len(list(cache_dir.glob("playlists_*.json"))) == 1
+
+    monkeypatch.setattr(scan_library, "build_playlist_index", lambda path: pytest.fail("index rebuilt"))
+    assert scan_library.load_playlist_index(nested_xml, cache_dir).playlists == first.playlists
+
+
+def test_scan_library_writes_every_playlist(nested_xml, tmp_path):
+    out_dir = tmp_path / "playlists"
+    scan_library.scan_library(
+        rekordbox_xml_path=nested_xml,
+        playlist_name=scan_library.ALL_PLAYLISTS,
+        output_path=out_dir,
+        index_cache_dir=tmp_path / "cache",
+    )
+    assert sorted(p.name for p in out_dir.iterdir()) == ["Peak.json", "Sets_Warmup.json"]
+
+
+def test_playlist_file_names_never_clash():
+    names = scan_library._playlist_file_names(["Techno/Peak", "Techno Peak", "techno_peak", "Warmup"])
+    assert names["Techno/Peak"] == "Techno_Peak.json" and names["Warmup"] == "Warmup.json"
+    assert len({name.casefold() for name in names.values()}) == 4
+    assert names == scan_library._playlist_file_names(["Techno/Peak", "Techno Peak", "techno_peak", "Warmup"])
@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import prepare_metadata
+from search import SearchIndex, decode_postings, encode_postings, tokenize
+from youtube import YouTubeCache
+from tests.synthetic import scan_records
+
+TRACKS = [
+    {"id": "0" * 32, "artist": "Beyoncé", "title": "Halo (Remix)", "album": "I Am... Sasha Fierce"},
+    {"id": "1" * 32, "artist": "Daft Punk", "title": "One More Time", "album": "Discovery"},
+    {"id": "2" * 32, "artist": "Röyksopp", "title": "Remind Me", "album": "Melody A.M."},
+    {"id": "3" * 32, "artist": "Halogen", "title": "Mixtape", "album": None},
+    {"id": "4" * 32, "artist": "Daft Punk", "title": "Digital Love", "album": "Discovery"},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex.build(TRACKS)
+
+
+def test_tokenize_folds_case_and_diacritics():
+    assert tokenize("Beyoncé – Halo (Remix)") == ["beyonce", "halo", "remix"]
+    assert tokenize("RÖYKSOPP") == ["royksopp"]
+    assert tokenize(None) == []
+
+
+def test_postings_round_trip():
+    lists = [[0, 1, 2], [5, 300, 70000], [], [2 ** 31]]
+    blob, offsets = encode_postings(lists)
+    blob = np.frombuffer(blob, dtype=np.uint8)
+    for i, values in enumerate(lists):
+        assert decode_postings(blob, offsets, i, i + 1).tolist() == values
+    assert decode_postings(blob, offsets, 0, len(lists)).tolist() == sum(lists, [])
+
+
+def test_prefix_queries_match_word_starts(index):
+    assert index.search("b") == ["0" * 32]
+    assert index.search("dis") == ["1" * 32, "4" * 32]
+    assert index.search("royk") == ["2" * 32]
+
+
+def test_infix_queries_match_inside_words(index):
+    assert set(index.search("mix")) == {"0" * 32, "3" * 32}
+    assert index.search("mix")[0] == "3" * 32      # word start ranks above the inside of a word
+
+
+def test_every_word_must_match(index):
+    assert index.search("daft love") == ["4" * 32]
+    assert index.search("daft halo") == []
+
+
+def test_exact_terms_rank_first(index):
+    assert index.search("halo") == ["0" * 32, "3" * 32]
+
+
+def test_limit(index):
+    assert len(index.search("d", limit=1)) == 1
+
+
+def test_encode_decode_round_trip(index):
+    loaded = SearchIndex.decode(index.encode())
+    assert loaded.ids == index.ids
+    for query in ["b", "dis", "mix", "daft love", "halo", "zzz"]:
+        assert loaded.search(query) == index.search(query)
+    with pytest.raises(ValueError):
+        SearchIndex.decode(b"not an index")
+
+
+def test_main_writes_search_index(tmp_path):
+    tracks = list(scan_records(200, n_genres=8))
+    library = tmp_path / "library.json"
+    library.write_text(json.dumps(tracks), encoding="utf-8")
+    with YouTubeCache(tmp_path / "youtube.sqlite") as cache:
+        for track in tracks:
+            cache.put(track, None)
+
+    prepare_metadata.main(library, tmp_path / "prepared.json", tmp_path / "youtube.sqlite",
+                          search_path=tmp_path / "search.bin")
+
+    prepared = json.loads((tmp_path / "prepared.json").read_text(encoding="utf-8"))
+    index = SearchIndex.load(tmp_path / "search.bin")
+    assert index.ids == [t["id"] for t in prepared]
+    track = prepared[17]
+    assert track["id"] in index.search(f"{track['artist']} {track['title']}", limit=len(prepared))
@@ -0,0 +1,116 @@
+import gzip
+import http.client
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from chunks import write_chunked_output
+from instrument import metrics
+from prepare_metadata import build_islands_db, get_genre_groups, prepare_track
+from server import TrackStore, lod_factor, make_server, open_database, read_meta
+from tests.synthetic import scan_records
+
+TILE = 100
+
+
+@pytest.fixture(scope="module")
+def prepared(tmp_path_factory):
+    islands = build_islands_db(get_genre_groups(list(scan_records(600, n_genres=10))))
+    tracks = [
+        prepare_track(track, x, y, island.colour, None)
+        for island in islands
+        for track, (x, y) in zip(island.tracks, island.tile_positions.tolist())
+    ]
+    path = tmp_path_factory.mktemp("server") / "prepared.json"
+    path.write_text(json.dumps(tracks), encoding="utf-8")
+    return path, tracks
+
+
+@pytest.fixture(scope="module")
+def server(prepared, tmp_path_factory):
+    store = TrackStore(open_database(prepared[0], tmp_path_factory.mktemp("db") / "tracks.sqlite"))
+    server = make_server(store, port=0, cache_entries=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, headers=None):
+    conn = http.client.HTTPConnection(*server.server_address)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def in_view(tracks, x0, y0, x1, y1):
+    return [t for t in tracks if t["x"] + TILE >= x0 and t["x"] <= x1 and t["y"] + TILE >= y0 and t["y"] <= y1]
+
+
+def test_viewport_returns_tracks_whose_tiles_meet_the_box(server, prepared):
+    tracks = prepared[1]
+    response, body = get(server, "/tracks?bbox=-300,-250,400,350")
+    assert response.status == 200
+    result = json.loads(body)
+    expected = in_view(tracks, -300, -250, 400, 350)
+    assert [t["id"] for t in result["tracks"]] == [t["id"] for t in expected]
+    assert result["count"] == len(expected) and result["cell"] is None
+
+
+def test_zoomed_out_viewport_returns_one_track_per_cell(server, prepared):
+    assert lod_factor(1.0) is None and lod_factor(0.5) == 2 and lod_factor(0.2) == 4 and lod_factor(0.01) == 16
+    result = json.loads(get(server, "/tracks?bbox=-5000,-5000,5000,5000&zoom=0.2")[1])
+    assert result["cell"] == 4 * (TILE + 10)
+    assert sum(result["counts"]) == result["count"] == len(prepared[1])
+    assert len(result["tracks"]) == len(result["counts"]) < len(prepared[1])
+
+
+def test_track_by_id_and_errors(server, prepared):
+    track = prepared[1][42]
+    response, body = get(server, f"/tracks/{track['id']}")
+    assert response.status == 200 and json.loads(body) == track
+    assert get(server, "/tracks/" + "0" * 32)[0].status == 404
+    assert get(server, "/nope")[0].status == 404
+    assert get(server, "/tracks?bbox=1,2,3")[0].status == 400
+    assert get(server, "/tracks?bbox=0,0,10,10&zoom=-1")[0].status == 400
+
+
+def test_etag_gzip_and_lru(server):
+    metrics.reset()
+    path = "/tracks?bbox=-1000,-1000,1000,1000"
+    first, plain = get(server, path)
+    etag = first.getheader("ETag")
+    again, zipped = get(server, path, {"Accept-Encoding": "gzip"})
+    assert again.getheader("Content-Encoding") == "gzip" and gzip.decompress(zipped) == plain
+    assert again.getheader("ETag") == etag
+
+    unchanged, body = get(server, path, {"If-None-Match": etag})
+    assert unchanged.status == 304 and body == b""
+    assert get(server, "/tracks?bbox=-1000,-1000,1000,1001", {"If-None-Match": etag})[0].status == 200
+
+    counters = metrics.report()["stages"]["serve"]["counters"]
+    assert counters["cache_hits"] == 1 and counters["cache_misses"] == 2 and counters["not_modified"] == 1
+    assert len(server.cache) <= 4
+
+
+def test_database_is_rebuilt_when_the_library_changes(prepared, tmp_path):
+    tracks = prepared[1]
+    db = tmp_path / "tracks.sqlite"
+    chunk_dir = tmp_path / "chunks"
+    write_chunked_output(tracks, chunk_dir, TILE, max_tracks=100)
+    open_database(chunk_dir, db)
+    digest = read_meta(db)["digest"]
+    assert read_meta(db)["count"] == len(tracks)
+
+    write_chunked_output(tracks[:50], chunk_dir, TILE, max_tracks=100)
+    open_database(chunk_dir, db)
+    assert read_meta(db)["digest"] != digest and read_meta(db)["count"] == 50
@@ -0,0 +1,92 @@
+import json
+import os
+import random
+import sys
+import time
+
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import prepare_metadata
+import scan_library
+from ndjson import iter_ndjson, write_ndjson
+
+
+def test_ndjson_round_trip_and_truncated_tail(tmp_path):
+    path = tmp_path / "tracks.ndjson"
+    records = [{"title": f"T{i}", "genre": "Jazz"} for i in range(5)]
+    assert write_ndjson(iter(records), path) == 5
+    assert list(iter_ndjson(path)) == records
+
+    # A writer that died mid-record leaves a partial last line behind
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"title": "T5", "gen')
+    assert list(iter_ndjson(path)) == records
+
+
+def test_iter_metadata_yields_in_input_order(monkeypatch):
+    rng = random.Random(3)
+
+    def slow_extract(file_path):
+        time.sleep(rng.random() / 200)
+        if file_path == "bad":
+            raise ValueError("broken tags")
+        return {"path": file_path}
+
+    monkeypatch.setattr(scan_library, "extract_metadata", slow_extract)
+    paths = [f"f{i}" for i in range(40)] + ["bad", "last"]
+    out = list(scan_library.iter_metadata(iter(paths), workers=4))
+    assert [p for p, _, _ in out] == paths
+    assert out[-2] == ("bad", None, "ValueError: broken tags")
+    assert out[-1][1] == {"path": "last"}
+
+
+def test_scan_library_streams_ndjson(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_library, "extract_metadata", lambda p: {"path": str(p), "title": p.stem})
+    music = tmp_path / "music"
+    music.mkdir()
+    for name in ["b.mp3", "a.flac", "c.txt"]:
+        (music / name).write_text("x")
+
+    scan_library.scan_library(music_dir=music, output_path=tmp_path / "out.ndjson")
+    assert [t["title"] for t in iter_ndjson(tmp_path / "out.ndjson")] == ["a", "b"]
+
+
+@pytest.mark.parametrize("island_layout", ["packed", "similarity"])
+def test_prepare_stream_matches_in_memory_main(tmp_path, monkeypatch, island_layout):
+    rng = random.Random(0)
+    genres = ["Techno", "House, Garage", "Jazz", None, "techno", "Ambient"]
+    tracks = [{"title": f"Track {i}", "artist": f"Artist {i % 7}", "path": f"/m/{i}.mp3",
+               "genre": rng.choice(genres)} for i in range(300)]
+    write_ndjson(tracks, tmp_path / "in.ndjson")
+    (tmp_path / "in.json").write_text(json.dumps(tracks))
+
+    monkeypatch.setattr(prepare_metadata, "resolve_youtube_urls", lambda tracks, *a, **k: [None] * len(tracks))
+    prepare_metadata.main(tmp_path / "in.json", tmp_path / "out.json", youtube_cache_path=None,
+                          island_layout=island_layout)
+    count = prepare_metadata.prepare_stream(tmp_path / "in.ndjson", tmp_path / "out.ndjson",
+                                            resolve_previews=False, batch_size=64, island_layout=island_layout)
+
+    expected = json.loads((tmp_path / "out.json").read_text())
+    streamed = list(iter_ndjson(tmp_path / "out.ndjson"))
+    assert count == len(streamed) == 300
+    assert [t["title"] for t in streamed] == [t["title"] for t in tracks]
+    assert sorted(streamed, key=lambda t: t["id"]) == sorted(expected, key=lambda t: t["id"])
+
+
+def test_prepare_stream_shares_one_session_across_batches(tmp_path, monkeypatch):
+    tracks = [{"title": f"Track {i}", "artist": "A", "path": f"/m/{i}.mp3", "genre": "Techno"} for i in range(50)]
+    write_ndjson(tracks, tmp_path / "in.ndjson")
+    calls = []
+
+    def resolve(batch, cache, **options):
+        calls.append((options["session"], options["limiter"]))
+        return [None] * len(batch)
+
+    monkeypatch.setattr(prepare_metadata, "resolve_youtube_urls", resolve)
+    prepare_metadata.prepare_stream(tmp_path / "in.ndjson", tmp_path / "out.ndjson", youtube_cache_path=None,
+                                    batch_size=16)
+    assert len(calls) == 4 and len(set(calls)) == 1
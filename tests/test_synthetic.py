@@ -0,0 +1,46 @@
+import os
+import sys
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from scan_library import parse_rekordbox_xml, scan_music_folder
+from tests.synthetic import genre_names, scan_records, write_audio_library, write_rekordbox_xml
+
+
+def test_scan_records_are_deterministic_and_multi_genre():
+    tracks = list(scan_records(500, n_genres=30, seed=7))
+    assert tracks == list(scan_records(500, n_genres=30, seed=7))
+    assert set(tracks[0]) == {"title", "artist", "album", "genre", "date", "path"}
+    assert any("," in t["genre"] for t in tracks)
+    assert len({t["genre"].split(",")[0] for t in tracks}) > 10
+
+
+def test_related_genres_are_opt_in():
+    position = {name: i for i, name in enumerate(genre_names(30))}
+
+    def spread(related):
+        tracks = scan_records(2000, n_genres=30, related_genres=related)
+        genres = [[position[g] for g in t["genre"].split(", ")] for t in tracks]
+        return max(min(abs(g - first), 30 - abs(g - first)) for first, *rest in genres for g in rest)
+
+    assert spread(True) <= 3 < spread(False)
+
+
+def test_rekordbox_export_parses_with_playlists(tmp_path):
+    xml = write_rekordbox_xml(tmp_path / "export.xml", 300, n_genres=12, n_playlists=6, star_playlist_size=25)
+    tracks = parse_rekordbox_xml(xml)
+    assert len(tracks) == 300
+    assert tracks[0]["title"].startswith("Track 0 (")
+    assert len(parse_rekordbox_xml(xml, "5star")) == 25
+    # Set playlists sit up to three folders deep
+    assert 10 <= len(parse_rekordbox_xml(xml, "Set 5")) <= 60
+
+
+def test_audio_library_scans(tmp_path):
+    expected = list(scan_records(20, n_genres=5))
+    write_audio_library(tmp_path, 20, n_genres=5, files_per_folder=8)
+    scanned = sorted(scan_music_folder(tmp_path), key=lambda t: t["path"])
+    assert len(scanned) == 20
+    assert [t["genre"] for t in scanned] == [t["genre"] for t in expected]
@@ -0,0 +1,87 @@
+import os
+import sys
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import youtube
+from youtube import YouTubeCache, YouTubeLookupError, get_youtube_url, normalize_query_key
+
+TRACK = {"artist": "Beyoncé", "title": "Halo"}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Stub out the network search; tests push results (URL, None or an exception) onto the list."""
+    results = []
+    calls = []
+
+    def fake_search(track, *args):
+        calls.append(track)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(youtube, "_search_youtube", fake_search)
+    return results, calls
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with YouTubeCache(tmp_path / "youtube.sqlite", hit_ttl=100, miss_ttl=10) as cache:
+        yield cache
+
+
+def test_normalized_key_ignores_case_accents_and_punctuation():
+    assert normalize_query_key(TRACK) == normalize_query_key({"artist": "BEYONCE ", "title": "halo!"})
+    assert normalize_query_key(TRACK) != normalize_query_key({"artist": "Beyoncé", "title": "Halo (Live)"})
+
+
+def test_hits_and_misses_are_cached(cache, searches):
+    results, calls = searches
+    results.extend(["https://www.youtube.com/watch?v=bnVUHWCynig", None])
+    missing = {"artist": "Nobody", "title": "Nothing"}
+
+    for _ in range(3):
+        assert get_youtube_url(TRACK, cache) == "https://www.youtube.com/watch?v=bnVUHWCynig"
+        assert get_youtube_url(missing, cache) is None
+    assert len(calls) == 2
+
+
+def test_failures_are_not_cached(cache, searches):
+    results, calls = searches
+    results.extend([YouTubeLookupError("Failed to fetch search results."), "https://www.youtube.com/watch?v=x"])
+
+    assert get_youtube_url(TRACK, cache) is None
+    assert get_youtube_url(TRACK, cache) == "https://www.youtube.com/watch?v=x"
+    assert len(calls) == 2
+
+
+def test_hits_and_misses_expire_separately(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(youtube.time, "time", lambda: now[0])
+    missing = {"artist": "Nobody", "title": "Nothing"}
+    cache.put(TRACK, "https://www.youtube.com/watch?v=x")
+    cache.put(missing, None)
+
+    now[0] += 50
+    assert cache.get(TRACK) == (True, "https://www.youtube.com/watch?v=x")
+    assert cache.get(missing) == (False, None)
+    now[0] += 60
+    assert cache.get(TRACK) == (False, None)
+
+
+def test_pins_override_lookups(cache, searches, monkeypatch):
+    results, calls = searches
+    cache.pin(TRACK, "https://www.youtube.com/watch?v=pinned")
+    cache.put(TRACK, "https://www.youtube.com/watch?v=other")
+
+    monkeypatch.setattr(youtube.time, "time", lambda: 1e12)
+    assert get_youtube_url(TRACK, cache) == "https://www.youtube.com/watch?v=pinned"
+    assert calls == []
+
+    cache.unpin(TRACK)
+    assert cache.get(TRACK) == (False, None)
@@ -0,0 +1,63 @@
+import os
+import sys
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from youtube import YouTubeLookupError, extract_first_video_id, parse_initial_data
+from tests.youtube_stub import results_page
+
+
+def _chunks(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+PAGES = {
+    "plain": results_page(["dQw4w9WgXcQ", "9bZkp7q19f0"]),
+    "ads first": results_page(["kJQP7kiw5Fk"], padding=5000, preamble=20000, video_payload=4000),
+    "spaced json": results_page(["abc_DEF-123"]).replace('"videoRenderer":{"videoId":', '"videoRenderer": { "videoId" : '),
+}
+
+
+@pytest.mark.parametrize("name", PAGES)
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_fast_path_matches_full_parse(name, chunk_size):
+    page = PAGES[name]
+    video_id, _ = extract_first_video_id(_chunks(page.encode("utf-8"), chunk_size))
+    assert video_id is not None
+    assert video_id == parse_initial_data(page)
+
+
+def test_fast_path_stops_reading_after_first_video():
+    page = results_page(["dQw4w9WgXcQ"] * 50, video_payload=20000).encode("utf-8")
+    consumed = []
+
+    def chunks():
+        for chunk in _chunks(page, 4096):
+            consumed.append(chunk)
+            yield chunk
+
+    video_id, _ = extract_first_video_id(chunks())
+    assert video_id == "dQw4w9WgXcQ"
+    assert sum(map(len, consumed)) < len(page) // 10
+
+
+@pytest.mark.parametrize("page", [
+    results_page([]),                                                          # search without videos
+    results_page(["dQw4w9WgXcQ"]).replace('"videoId":"dQw4w9WgXcQ"', '"id":1'),  # renamed field
+    "<html>consent.youtube.com</html>",                                        # interstitial page
+])
+def test_unfamiliar_pages_fall_back_with_full_body(page):
+    data = page.encode("utf-8")
+    video_id, body = extract_first_video_id(_chunks(data, 5))
+    assert video_id is None
+    assert body == data
+
+
+def test_full_parse_rejects_pages_without_initial_data():
+    with pytest.raises(YouTubeLookupError):
+        parse_initial_data("<html>consent.youtube.com</html>")
+    with pytest.raises(YouTubeLookupError):
+        parse_initial_data('<script>var ytInitialData = {"contents": [{"videoRenderer": ;</script>')
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import pytest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from youtube import TokenBucket, YouTubeCache, get_youtube_url, make_session, resolve_youtube_urls
+from tests.youtube_stub import StubYouTube, results_page
+
+
+def _track(i):
+    return {"artist": f"Artist{i}", "title": f"Title{i}"}
+
+
+def _expected_url(track):
+    video_id = "".join(c for c in f"{track['artist']} {track['title']}" if c.isalnum())[:11]
+    return f"https://www.youtube.com/watch?v={video_id.ljust(11, '_')}"
+
+
+def test_get_youtube_url_against_stub():
+    with StubYouTube() as stub:
+        assert get_youtube_url(_track(1), base_url=stub.url) == _expected_url(_track(1))
+        assert stub.queries == ["Artist1 Title1"]
+
+
+def test_batch_resolves_in_order_and_dedupes(tmp_path):
+    tracks = [_track(i % 5) for i in range(20)] + [{"title": "No artist"}]
+    with StubYouTube(delay=0.02) as stub, YouTubeCache(tmp_path / "yt.sqlite") as cache:
+        urls = resolve_youtube_urls(tracks, cache, concurrency=4, rate=1000, base_url=stub.url)
+        assert urls == [_expected_url(t) for t in tracks[:-1]] + [None]
+        assert sorted(stub.queries) == sorted(f"Artist{i} Title{i}" for i in range(5))
+
+        # Second build is served entirely from the cache
+        assert resolve_youtube_urls(tracks, cache, base_url=stub.url) == urls
+        assert len(stub.queries) == 5
+
+
+def test_concurrency_cap_is_respected():
+    tracks = [_track(i) for i in range(24)]
+    with StubYouTube(delay=0.05) as stub:
+        resolve_youtube_urls(tracks, concurrency=3, rate=1000, base_url=stub.url)
+    assert stub.peak_active == 3
+
+
+def test_retries_on_429_and_5xx_then_gives_up():
+    responses = {
+        "Artist1 Title1": [(429, "slow down"), (503, "busy"), (200, results_page(["abcdefghijk"]))],
+        "Artist2 Title2": [(500, "broken")],
+        "Artist3 Title3": [(200, results_page([]))],
+    }
+    tracks = [_track(1), _track(2), _track(3)]
+    with StubYouTube(responses) as stub:
+        urls = resolve_youtube_urls(tracks, concurrency=2, rate=1000, retries=2, backoff=0.01, base_url=stub.url)
+    assert urls == ["https://www.youtube.com/watch?v=abcdefghijk", None, None]
+    assert stub.queries.count("Artist1 Title1") == 3
+    assert stub.queries.count("Artist2 Title2") == 3
+    assert stub.queries.count("Artist3 Title3") == 1
+
+
+def test_failed_lookups_are_not_cached(tmp_path):
+    with StubYouTube({"Artist1 Title1": [(503, "busy")]}) as stub, YouTubeCache(tmp_path / "yt.sqlite") as cache:
+        resolve_youtube_urls([_track(1)], cache, retries=0, base_url=stub.url)
+        assert cache.get(_track(1)) == (False, None)
+
+
+def test_a_broken_page_fails_one_lookup(tmp_path):
+    broken = '<script>var ytInitialData = {"contents": [{"videoRenderer": ;</script>'
+    with StubYouTube({"Artist1 Title1": [(200, broken)]}) as stub, YouTubeCache(tmp_path / "yt.sqlite") as cache:
+        urls = resolve_youtube_urls([_track(1), _track(2)], cache, retries=0, base_url=stub.url)
+        assert urls == [None, _expected_url(_track(2))]
+        assert cache.get(_track(1)) == (False, None)
+
+
+def test_batches_share_the_callers_session_and_limiter():
+    class CountingBucket(TokenBucket):
+        acquired = 0
+
+        def acquire(self):
+            CountingBucket.acquired += 1
+            super().acquire()
+
+    limiter = CountingBucket(rate=1000, burst=4)
+    with StubYouTube() as stub, make_session(4) as session:
+        for batch in ([_track(1), _track(2)], [_track(3)]):
+            urls = resolve_youtube_urls(batch, concurrency=4, base_url=stub.url, session=session, limiter=limiter)
+            assert urls == [_expected_url(t) for t in batch]
+        # Still open: the batches reused its pooled connection
+        assert session.get(stub.url, params={"search_query": "Artist4 Title4"}).ok
+        assert len(session.get_adapter(stub.url).poolmanager.pools) == 1
+    assert CountingBucket.acquired == 3
+
+
+def test_request_timeout():
+    with StubYouTube(delay=0.5) as stub:
+        start = time.monotonic()
+        assert resolve_youtube_urls([_track(1)], retries=0, timeout=0.1, base_url=stub.url) == [None]
+        assert time.monotonic() - start < 0.45
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 from the initial burst, the remaining 10 at 50/s
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.08)
@@ -0,0 +1,108 @@
+"""
+Local stand-in for youtube.com/results used by the YouTube tests and benchmarks.
+
+Pages mimic the real results markup: a `var ytInitialData = {...};</script>` blob whose
+primary contents hold videoRenderer items, padded with the kind of filler a real page has.
+"""
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def results_page(video_ids, padding: int = 0, preamble: int = 0, video_payload: int = 0) -> str:
+    """
+    Build a search results page listing `video_ids`.
+
+    `padding` bytes of filler renderers go before the first video, `preamble` bytes of other
+    scripts before ytInitialData, and each video carries `video_payload` bytes of extra fields
+    (thumbnails, descriptions, badges) the way real renderers do.
+    """
+    items = [{"adSlotRenderer": {"filler": "x" * padding}}] if padding else []
+    items += [
+        {"videoRenderer": {
+            "videoId": vid,
+            "title": {"runs": [{"text": f"Video {vid}"}]},
+            "lengthText": {"simpleText": "3:45"},
+            "detailedMetadataSnippets": [{"snippetText": {"runs": [{"text": "é" * (video_payload // 2)}]}}],
+        }}
+        for vid in video_ids
+    ]
+    data = {
+        "responseContext": {"serviceTrackingParams": [{"service": "GFEEDBACK", "params": [{"key": "e", "value": "1"}]}]},
+        "contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": [
+            {"itemSectionRenderer": {"contents": items}},
+            {"continuationItemRenderer": {"trigger": "CONTINUATION_TRIGGER_ON_ITEM_SHOWN"}},
+        ]}}}},
+    }
+    return (
+        f"<!DOCTYPE html><html><head><script>var ytcfg = {{\"x\": \"{'y' * preamble}\"}};</script></head><body>"
+        f"<script nonce=\"abc\">var ytInitialData = {json.dumps(data, separators=(',', ':'), ensure_ascii=False)};</script>"
+        "<script>window.ytAtR = '{}';</script></body></html>"
+    )
+
+
+class StubYouTube:
+    """
+    Threaded HTTP server answering /results?search_query=... from `responses`.
+
+    `responses` maps a query to a list of (status, body) tuples served in turn (the last one
+    repeats); unknown queries get a page whose single video id is derived from the query.
+    Records every query, plus the peak number of requests handled at once.
+    """
+    def __init__(self, responses=None, delay: float = 0.0):
+        self.responses = {q: list(r) for q, r in (responses or {}).items()}
+        self.delay = delay
+        self.queries = []
+        self.active = 0
+        self.peak_active = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get("search_query", [""])[0]
+                with stub.lock:
+                    stub.queries.append(query)
+                    stub.active += 1
+                    stub.peak_active = max(stub.peak_active, stub.active)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    status, body = stub.respond(query)
+                    payload = body.encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(payload)))
+                    if status == 429:
+                        self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/results"
+
+    def respond(self, query):
+        queued = self.responses.get(query)
+        if queued:
+            return queued.pop(0) if len(queued) > 1 else queued[0]
+        video_id = "".join(c for c in query if c.isalnum())[:11].ljust(11, "_")
+        return 200, results_page([video_id])
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()